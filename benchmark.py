@@ -0,0 +1,315 @@
+#!/usr/bin/python3
+
+#=======================================================
+#
+#	Request Injector benchmark harness
+#
+#	starts a local stand-in HTTP server, runs requestinjector.py scans against it for every combination of mode, engine, --threads and wordlist size,
+#	and writes one JSON line per scan, so runs from different versions can be compared
+#
+#	usage:
+#		python3 benchmark.py --modes path,arg --threads 1,10,50 --words 1000,10000 -o bench_output.txt
+#		python3 benchmark.py --latency 0.005 --jitter 0.01 --body_size 4096 --status_mix '{"404": 90, "200": 8, "500": 2}' --error_rate 0.01 --no_keepalive
+#		python3 benchmark.py --compare old_bench_output.txt
+#
+#	each line: {"label", "mode", "engine", "threads", "words", "run", "requests", "errors", "seconds", "rps", "p50", "p95", "p99", "max_rss_kb", "cpu_user", "cpu_system", "server": {...}}
+#		requests/errors are counted from the scan's --format jsonl output, latencies (seconds to response headers) from its elapsed field
+#		max_rss_kb and cpu_* come from the scan process's own resource usage (the server runs in this process and is not counted)
+#
+#	the server decides each response from a hash of --seed and the request path, so the same wordlist always gets the same statuses and errors, regardless of thread timing
+#	requires a POSIX system (os.wait4)
+#
+#=======================================================
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+
+#================================================
+#
+# Server Classes
+#
+#================================================
+
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+	"""answers every request according to the owning BenchServer's settings"""
+	disable_nagle_algorithm = True # headers and body are written separately, and Nagle + delayed ACK would otherwise add ~40ms to each keep-alive response
+
+	def decide(self) -> tuple:
+		"""returns (status, error, extra latency) for this path, from a hash so results do not depend on request order"""
+		h = hashlib.blake2b(f"{self.server.seed}:{self.path}".encode("utf-8", "replace"), digest_size=12).digest()
+		u1, u2, u3 = [int.from_bytes(h[i:i+4], "big") / 4294967296 for i in (0, 4, 8)]
+		status = self.server.statuses[-1][0]
+		for code, cumulative in self.server.statuses:
+			if u1 < cumulative:
+				status = code
+				break
+		return(status, u2 < self.server.error_rate, self.server.jitter * u3)
+
+	def respond(self, body=True):
+		status, error, jitter = self.decide()
+		delay = self.server.latency + jitter
+		if delay > 0:
+			time.sleep(delay)
+		if error:
+			# drop the connection without any response, which the scanner reports as a failed request
+			self.close_connection = True
+			return
+		self.send_response(status)
+		self.send_header("Content-Type", "text/html")
+		self.send_header("Content-Length", str(len(self.server.body)))
+		if not self.server.keepalive:
+			self.send_header("Connection", "close")
+			self.close_connection = True
+		self.end_headers()
+		if body:
+			self.wfile.write(self.server.body)
+
+	def do_GET(self):
+		self.respond()
+
+	def do_HEAD(self):
+		self.respond(body=False)
+
+	def do_POST(self):
+		length = int(self.headers.get("Content-Length") or 0)
+		if length:
+			self.rfile.read(length)
+		self.respond()
+
+	def log_message(self, *args):
+		pass
+
+
+
+class BenchServer(ThreadingHTTPServer):
+	"""local stand-in target with adjustable latency, body size, status mix, keep-alive behavior, and error injection"""
+	daemon_threads = True
+	request_queue_size = 1024 # keep a burst of new connections from being refused before the accept loop catches up
+
+	def __init__(self, latency=0.0, jitter=0.0, body_size=512, status_mix=None, error_rate=0.0, keepalive=True, seed=0, port=0):
+		self.latency = latency # fixed seconds added to every response
+		self.jitter = jitter # up to this many more seconds, chosen per path
+		self.body = b"x" * body_size
+		self.error_rate = error_rate # fraction of paths answered by dropping the connection
+		self.keepalive = keepalive
+		self.seed = seed
+		# {status: weight} becomes [(status, cumulative fraction)] for decide()
+		if not status_mix:
+			status_mix = {404: 1}
+		total = sum(status_mix.values())
+		self.statuses = []
+		cumulative = 0.0
+		for code, weight in sorted(status_mix.items()):
+			cumulative = cumulative + weight / total
+			self.statuses.append((int(code), cumulative))
+		# HTTP/1.0 responses close the connection after every request
+		handler = type("Handler", (BenchHandler,), {"protocol_version": "HTTP/1.1" if keepalive else "HTTP/1.0"})
+		ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), handler)
+		self.port = self.server_address[1]
+
+	def settings(self) -> dict:
+		return({"latency": self.latency, "jitter": self.jitter, "body_size": len(self.body), "status_mix": {str(k): round(v, 6) for k, v in self.statuses}, "error_rate": self.error_rate, "keepalive": self.keepalive, "seed": self.seed})
+
+	def start(self):
+		t = threading.Thread(target=self.serve_forever, daemon=True)
+		t.name = "BenchServer"
+		t.start()
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+
+
+#================================================
+#
+# Benchmark Classes
+#
+#================================================
+
+
+
+class Benchmark:
+	"""runs one requestinjector.py process per scan and measures it"""
+	def __init__(self, server, workdir, script=None, retries=1000000, extra_args=None, label=""):
+		self.server = server
+		self.workdir = Path(workdir)
+		self.script = script
+		if not self.script:
+			self.script = str(Path(__file__).resolve().parent / "requestinjector.py")
+		# a high retry count keeps injected errors from opening the circuit breaker, which would skip the rest of the scan
+		self.retries = retries
+		self.extra_args = extra_args or []
+		self.label = label
+
+	def wordlist(self, words) -> str:
+		"""creates (once) a wordlist of unique words"""
+		path = self.workdir / f"words-{words}.txt"
+		if not path.exists():
+			with open(path, "w") as f:
+				for n in range(words):
+					f.write(f"w{n:08d}\n")
+		return(str(path))
+
+	def command(self, mode, engine, threads, words, output) -> list:
+		url = f"http://127.0.0.1:{self.server.port}/bench/"
+		cmd = [sys.executable, self.script, "-u", url, "-w", self.wordlist(words), "-t", str(threads), "--engine", engine, "-r", str(self.retries), "--format", "jsonl", "-o", output]
+		if mode == "arg":
+			cmd = cmd + ["-M", "arg", "-T", "shotgun", "-K", "q"]
+		return(cmd + self.extra_args)
+
+	def percentile(self, values, p):
+		"""nearest-rank percentile of an already sorted list"""
+		if not values:
+			return(None)
+		k = max(0, math.ceil(p / 100 * len(values)) - 1)
+		return(values[k])
+
+	def run(self, mode, engine, threads, words, run=0) -> dict:
+		output = str(self.workdir / "scan.jsonl")
+		with open(self.workdir / "scan.stderr", "w") as err:
+			started = time.monotonic()
+			p = subprocess.Popen(self.command(mode, engine, threads, words, output), stdout=subprocess.DEVNULL, stderr=err)
+			# wait4() returns the resource usage of this one child, unlike getrusage(RUSAGE_CHILDREN) which accumulates every scan
+			pid, status, usage = os.wait4(p.pid, 0)
+			seconds = time.monotonic() - started
+			p.returncode = os.waitstatus_to_exitcode(status)
+		requests = 0
+		errors = 0
+		latencies = []
+		with open(output, "r") as f:
+			for line in f:
+				r = json.loads(line)
+				requests = requests + 1
+				if r["reason"] is not None:
+					errors = errors + 1
+				elif r["elapsed"] is not None:
+					latencies.append(r["elapsed"])
+		latencies.sort()
+		max_rss = usage.ru_maxrss
+		if sys.platform == "darwin":
+			max_rss = max_rss // 1024 # bytes on macOS, kilobytes elsewhere
+		return({"label": self.label, "mode": mode, "engine": engine, "threads": threads, "words": words, "run": run, "exit": p.returncode, "requests": requests, "errors": errors, "seconds": round(seconds, 4), "rps": round(requests / seconds, 2), "p50": self.percentile(latencies, 50), "p95": self.percentile(latencies, 95), "p99": self.percentile(latencies, 99), "max_rss_kb": max_rss, "cpu_user": round(usage.ru_utime, 4), "cpu_system": round(usage.ru_stime, 4), "server": self.server.settings()})
+
+
+
+def compare(old, new):
+	"""prints the req/s and p95 change of each scan in new against the matching scan in old"""
+	def key(r):
+		return((r["mode"], r["engine"], r["threads"], r["words"]))
+	baseline = {}
+	for r in old:
+		baseline.setdefault(key(r), []).append(r)
+	for r in new:
+		b = baseline.get(key(r))
+		if not b:
+			continue
+		rps = sum(x["rps"] for x in b) / len(b)
+		change = (r["rps"] - rps) / rps * 100 if rps else 0.0
+		sys.stderr.write(f"{r['mode']:4} {r['engine']:8} threads:{r['threads']:<4} words:{r['words']:<8} rps:{rps:.1f} -> {r['rps']:.1f} ({change:+.1f}%) p95:{b[0]['p95']} -> {r['p95']}\n")
+
+
+
+def readLines(path) -> list:
+	with open(path, "r") as f:
+		return([json.loads(line) for line in f if line.strip()])
+
+
+
+def gitLabel() -> str:
+	"""short commit hash of the tree being measured, if it is a git checkout"""
+	try:
+		return(subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True).stdout.strip())
+	except (OSError, subprocess.CalledProcessError):
+		return("")
+
+
+
+#================================================
+#
+# Entrypoint Functions
+#
+#================================================
+
+
+
+def bench_entrypoint():
+	"""this function handles argparse arguments"""
+	parser = argparse.ArgumentParser(description="RequestInjector benchmark: scan a local stand-in server over a matrix of settings and report throughput, latency, memory and CPU as JSON lines")
+	# scan matrix
+	mat = parser.add_argument_group("scan matrix")
+	mat.add_argument("--modes", dest="modes", default="path,arg", type=str, help="provide comma-separated modes to scan with (path|arg) (default path,arg)")
+	mat.add_argument("--engines", dest="engines", default="thread", type=str, help="provide comma-separated engines to scan with (thread|async|pipeline) (default thread)")
+	mat.add_argument("--threads", dest="threads", default="1,10,50", type=str, help="provide comma-separated -t/--threads values (default 1,10,50)")
+	mat.add_argument("--words", dest="words", default="1000,10000", type=str, help="provide comma-separated wordlist sizes (default 1000,10000)")
+	mat.add_argument("--repeat", dest="repeat", default=1, type=int, help="provide the number of times to run each scan (default 1)")
+	mat.add_argument("--scan_args", dest="scan_args", default="", type=str, help="provide extra requestinjector.py arguments added to every scan, as one string, ex. '--head_first --queue_size 1000'")
+	# server behavior
+	srv = parser.add_argument_group("server arguments")
+	srv.add_argument("--latency", dest="latency", default=0.0, type=float, help="provide seconds added to every response (default 0.0)")
+	srv.add_argument("--jitter", dest="jitter", default=0.0, type=float, help="provide up to this many more seconds added per path (default 0.0)")
+	srv.add_argument("--body_size", dest="body_size", default=512, type=int, help="provide the response body size in bytes (default 512)")
+	srv.add_argument("--status_mix", dest="status_mix", default={"404": 1}, type=json.loads, help="provide a dictionary of {status: weight}, ex. '{\"404\": 90, \"200\": 10}' (default all 404)")
+	srv.add_argument("--error_rate", dest="error_rate", default=0.0, type=float, help="provide the fraction of paths answered by dropping the connection (default 0.0)")
+	srv.add_argument("--no_keepalive", dest="no_keepalive", action="store_true", help="provide to close the connection after every response")
+	srv.add_argument("--seed", dest="seed", default=0, type=int, help="provide the seed that decides each path's status, error and jitter (default 0)")
+	# output
+	ota = parser.add_argument_group("output arguments")
+	ota.add_argument("-o", "--output", dest="output_file", default="", type=str, help="provide a file to append the JSON lines to instead of stdout")
+	ota.add_argument("--label", dest="label", default=None, type=str, help="provide a label stored in every line (default the git commit hash)")
+	ota.add_argument("--compare", dest="compare", default="", type=str, help="provide a previous output file, and print the req/s and p95 change of each matching scan to stderr")
+	args = vars(parser.parse_args())
+	label = args["label"]
+	if label is None:
+		label = gitLabel()
+	server = BenchServer(latency=args["latency"], jitter=args["jitter"], body_size=args["body_size"], status_mix={int(k): v for k, v in args["status_mix"].items()}, error_rate=args["error_rate"], keepalive=not args["no_keepalive"], seed=args["seed"])
+	server.start()
+	out = sys.stdout
+	if args["output_file"]:
+		out = open(args["output_file"], "a")
+	results = []
+	try:
+		with tempfile.TemporaryDirectory(prefix="ri-bench-") as workdir:
+			b = Benchmark(server, workdir, extra_args=args["scan_args"].split(), label=label)
+			for mode in args["modes"].split(","):
+				for engine in args["engines"].split(","):
+					for words in [int(w) for w in args["words"].split(",")]:
+						for threads in [int(t) for t in args["threads"].split(",")]:
+							for run in range(args["repeat"]):
+								r = b.run(mode, engine, threads, words, run)
+								results.append(r)
+								out.write(json.dumps(r) + "\n")
+								out.flush()
+	finally:
+		server.stop()
+		if out is not sys.stdout:
+			out.close()
+	if args["compare"]:
+		compare(readLines(args["compare"]), results)
+
+
+
+#================================================
+#
+# Execution Guard
+#
+#================================================
+
+
+
+if __name__ == "__main__":
+	bench_entrypoint()
@@ -69,31 +69,390 @@
 #			-H '{"Content-Type": "text/plain"}' \
 #			--color
 #
+#	arg mode (-M arg) using clusterbomb attacktype (-T clusterbomb):
+#		# NOTE - clusterbomb is similar to Burp Suite's cluster bomb mode; for each key specified, provide a wordlist (-w WORDLIST1,WORDLIST2,etc), and every combination of one word from each wordlist is requested
+#		# NOTE - combinations are generated on demand from the compiled wordlist cache (see --wordlist_cache), so the product of large wordlists is never held in memory
+#			requestinjector.py -u "http://example.com/somepath/a/b/c" \
+#			-M arg \
+#			-T clusterbomb \
+#			-K user,pass \
+#			-w /path/to/users.txt,/path/to/passwords.txt \
+#			-S statickey1=staticval1 \
+#			-t 10
+#
+#	body mode (-M body) using a body template (--body_template FILE):
+#		# NOTE - each -K key is injected wherever {{KEY}} appears in the template file, which is compiled once so every request only joins pre-encoded pieces; -T shotgun, trident and clusterbomb pick the values as in arg mode
+#		# NOTE - --body_encoding json escapes values for use inside JSON strings, url percent-encodes them for form bodies (default raw); set the matching Content-Type with -H
+#			requestinjector.py -u "http://example.com/api/login" \
+#			-M body \
+#			-T trident \
+#			-K user,pass \
+#			-w /path/to/users.txt,/path/to/passwords.txt \
+#			--body_template "/path/to/login.json" \
+#			--body_encoding json \
+#			-H '{"Content-Type": "application/json"}' \
+#			-t 10
+#
+#	multiple targets (--targets FILE, one URL per line, in place of or in addition to -u):
+#		# NOTE - the wordlist is read once and every word is sent to every target, interleaved so concurrent requests are spread across hosts
+#			requestinjector.py --targets "/path/to/urls.txt" \
+#			-w "/path/to/wordlist.txt" \
+#			-t 50 \
+#			--host_rate 10 \
+#			--pool_connections 100
+#
 #	output modes: full (default), --simple_output (just status code and full url), --color (same as simple_output but the status code is colorized)
+#	output formats: --format text (default, the modes above), jsonl, or csv (one record per result, including failures); -o/--output FILE writes to a file instead of stdout
+#	live metrics: --progress [SECONDS] = one-line progress/ETA on stderr; --metrics_file FILE / --metrics_port PORT = Prometheus text format, rewritten every interval / served at http://127.0.0.1:PORT/metrics
 #
 #	additional options:
 #		-d/--delay [FLOAT] = add a delay, per thread, as a float (default 0.0)
+#		--pool_connections [INT] = number of per-host keep-alive connection pools each thread keeps (default 10)
+#		--pool_maxsize [INT] = number of keep-alive connections each thread keeps open to a single host (default 10)
+#		--engine [thread|async|pipeline] = async drives -t concurrent requests from one asyncio event loop instead of one thread per request (requires aiohttp); pipeline (path mode) writes --pipeline_depth [INT] GET requests at a time to a raw keep-alive socket per host and thread, falling back to thread for redirects and hosts that mishandle pipelining (default thread)
+#		--queue_size [INT] = maximum items held in the word and result queues, the wordlist reader waits when full; memory stays around queue_size words + queue_size results (0 = unbounded) (default 10000)
+#		--wordlist_cache = compile wordlists once into a deduplicated binary cache read through mmap on later scans (rebuilt when the wordlist changes); --cache_dir DIR sets its location (default ~/.cache/requestinjector)
+#		--processes [INT] = split the wordlist across this many processes (a contiguous range of rows each), each with its own -t threads, merged into one output stream in completion order (default 1)
+#		--trust_length = report the Content-Length header instead of downloading large bodies; --max_body [INT] = stop reading bodies after this many bytes; --head_first = try HEAD before GET (results show sizetype:exact|header|truncated)
+#		--calibrate = request random words per URL first, then drop wildcard/soft-404 responses that match them; --calibrate_words [INT] (default 3); --fingerprint_bytes [INT] = body bytes compared (default 512)
+#		--rate [FLOAT] / --host_rate [FLOAT] = cap total / per-host requests per second across all threads and processes (default unlimited)
+#		--adaptive = AIMD in-flight limit (up to -t), halved when latency rises or 429/503/errors appear, grown while healthy; --latency_target [FLOAT] seconds (default 2x best observed)
+#		--timeout [FLOAT] = seconds before a request fails (default 3.0); --adaptive_timeout = learn connect and read timeouts per host from observed latency (smoothed + 4x variation, like TCP's RTO), between --timeout_min [FLOAT] and --timeout_max [FLOAT] (default 1.0 and 10.0)
+#		--dns_ttl [FLOAT] = seconds host name lookups are cached, every host is resolved once up front (default 300.0, 0 = off); --no_warmup = skip opening each thread's connections (and TLS handshakes, with a HEAD / request per host) before the Filler starts
+#		--cooldown [FLOAT] = seconds a host is skipped after failing -r/--retries times (shared by all threads and processes), before one probe request tests it again (default 30.0)
+#		--retry_failed [INT] = send failed requests again this many times, after a backoff of --retry_backoff [FLOAT] seconds doubled per attempt (with jitter, up to 30s) spent in a retry queue rather than a sleeping thread (default 0, 1.0); only the last failure counts towards -r/--retries
+#		--state FILE = save scan progress every few seconds (and on Ctrl-C); --resume = continue that scan, seeking the wordlists past every word already requested (same URLs, wordlists and mode options required)
+#		--method [METHOD] = body mode: HTTP method used to send the body (default POST); --body_encoding [raw|json|url] = how values are escaped in the body (default raw)
+#		--recurse [INT] = path mode: scan directories found during the scan (redirect to URL/, or 200/401/403 on URL/) with the same wordlist, down to this depth; --dedup = never request a URL+word twice (on with --recurse)
+#		--match_file FILE = report which body patterns (one per line, ID<TAB>pattern optional, re: prefix for regexes, literals matched in one pass as a compiled alternation) each response contains, as matches:ID,...; --match_first = stop reading the body at the first match
+#		--store FILE = record every scan's results in a SQLite database; --prioritize = path mode: request the words with the best hit rate (non-404) in earlier stored scans of the same hosts first; --diff [OLD,NEW|last] = print the URLs whose status changed between two stored scans, instead of scanning (status only, a change in length alone is not shown, and soft-404s dropped by --calibrate are never stored, so a URL that became one shows as removed)
+#		--coordinator [HOST:]PORT = split the scan into leases of --lease_size [INT] rows per host (default 1000) and hand them to agents started with --agent [HOST:]PORT -w WORDLIST, which stream their results back; an agent silent for --lease_timeout [FLOAT] seconds (default 30.0) loses its lease to the next one (HOST defaults to 127.0.0.1; both sides need the secret in --secret_file FILE or $REQUESTINJECTOR_SECRET; agents only take scan options from the coordinator, never files, so each needs its own wordlists with the same rows, and its own --body_template/--match_file; rates apply per agent; traffic is not encrypted, tunnel it across untrusted networks)
 #
-#	or import as a module (from requestinjector import RequestInjector)
+#	or import as a module (from requestinjector import RequestInjector), and iterate over Result objects instead of printing them:
+#		for r in RequestInjector(url=..., wordlist=[...], ...).iterResults(): r.status_code, r.url, r.asDict() ...
+#		(async for r in x.aiterResults() inside an event loop; breaking out of either loop cancels the scan)
 #
 #=======================================================
 
 import argparse
+import array
+import asyncio
+import bisect
+import contextvars
+import csv
+import hashlib
+import heapq
+import hmac
+import http.cookiejar
+import http.server
 import itertools
 import json
+import math
+import mmap
+import re
+import socket
+import sqlite3
+import ssl
+import multiprocessing
 import os
+import struct
 import sys
 import threading
 import queue
+import random
 import sys
 import time
-from contextlib import ExitStack
+import uuid
+from contextlib import ExitStack, closing
 from pathlib import Path
 import requests
-from urllib.parse import urlparse
+from urllib.parse import urlparse, quote_plus
 # suppress warning
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# optional, only needed for --engine async
+try:
+	import aiohttp
+except ImportError:
+	aiohttp = None
+
+
+
+#================================================
+#
+# Wordlist Classes
+#
+#================================================
+
+
+
+class CompiledWordlist:
+	"""a wordlist compiled once into a cached binary file (normalized words + an offset index) and read back through mmap, so repeat scans skip the per-line read/strip and can jump straight to word N"""
+	# file layout: header, then every word's bytes back to back, then count+1 native uint64 offsets into that blob
+	magic = b"RIWL1"
+	header = struct.Struct("<5sqQ32sQ") # magic, source mtime_ns, source size, source sha256, word count
+
+	def __init__(self, path, cache_dir=None, dedup=True):
+		self.path = os.path.abspath(path)
+		self.cache_dir = cache_dir
+		if not self.cache_dir:
+			self.cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "requestinjector")
+		# dedup drops blank and repeated words; trident keeps them so line N of each wordlist still lines up
+		self.dedup = dedup
+		# the cache is keyed on the source path (plus dedup setting), and validated against the source mtime, size, and hash
+		key = hashlib.sha256(f"{self.path}|{int(self.dedup)}".encode()).hexdigest()[:32]
+		self.cachefile = os.path.join(self.cache_dir, key + ".riwl")
+		if not self.isFresh():
+			self.compile()
+		self.open()
+
+	def readHeader(self):
+		"""returns the header tuple of the cache file, or None if it is missing or unreadable"""
+		try:
+			with open(self.cachefile, "rb") as f:
+				h = self.header.unpack(f.read(self.header.size))
+		except (OSError, struct.error):
+			return(None)
+		if h[0] != self.magic:
+			return(None)
+		return(h)
+
+	def hashSource(self) -> bytes:
+		"""sha256 of the source wordlist"""
+		h = hashlib.sha256()
+		with open(self.path, "rb") as f:
+			for chunk in iter(lambda: f.read(1048576), b""):
+				h.update(chunk)
+		return(h.digest())
+
+	def isFresh(self) -> bool:
+		"""checks the cache against the source file, only hashing the source when the mtime has changed (ex. the file was touched or copied)"""
+		h = self.readHeader()
+		if not h:
+			return(False)
+		st = os.stat(self.path)
+		if h[1] == st.st_mtime_ns and h[2] == st.st_size:
+			return(True)
+		if h[2] == st.st_size and h[3] == self.hashSource():
+			# same content, record the new mtime so the hash is not needed next time
+			with open(self.cachefile, "r+b") as f:
+				f.write(self.header.pack(self.magic, st.st_mtime_ns, h[2], h[3], h[4]))
+			return(True)
+		return(False)
+
+	def compile(self):
+		"""normalizes the source wordlist into the cache file, written to a temporary file first so a concurrent reader never sees a partial cache"""
+		os.makedirs(self.cache_dir, exist_ok=True)
+		st = os.stat(self.path)
+		digest = hashlib.sha256()
+		offsets = array.array("Q", [0])
+		seen = set()
+		tmp = f"{self.cachefile}.{os.getpid()}.{threading.get_ident()}.tmp"
+		with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+			dst.write(b"\0" * self.header.size) # placeholder, the count is not known yet
+			for line in src:
+				digest.update(line)
+				word = line.strip()
+				if self.dedup:
+					if not word or word in seen:
+						continue
+					seen.add(word)
+				dst.write(word)
+				offsets.append(offsets[-1] + len(word))
+			offsets.tofile(dst)
+			dst.seek(0)
+			dst.write(self.header.pack(self.magic, st.st_mtime_ns, st.st_size, digest.digest(), len(offsets) - 1))
+		os.replace(tmp, self.cachefile)
+
+	def open(self):
+		"""maps the cache file and locates the offset index at its end"""
+		self.file = open(self.cachefile, "rb")
+		self.count = self.header.unpack(self.file.read(self.header.size))[4]
+		self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		self.base = self.header.size
+		indexstart = len(self.mm) - (self.count + 1) * 8
+		self.offsets = memoryview(self.mm)[indexstart:].cast("Q")
+
+	def __len__(self) -> int:
+		return(self.count)
+
+	def __getitem__(self, n) -> str:
+		"""returns word n directly from the map"""
+		if n < 0:
+			n = n + self.count
+		if not 0 <= n < self.count:
+			raise IndexError("wordlist index out of range")
+		return(self.mm[self.base+self.offsets[n]:self.base+self.offsets[n+1]].decode("utf-8", "replace"))
+
+	def iterate(self, start=0):
+		"""yields words starting at word number start"""
+		mm = self.mm
+		offsets = self.offsets
+		base = self.base
+		for n in range(start, self.count):
+			yield(mm[base+offsets[n]:base+offsets[n+1]].decode("utf-8", "replace"))
+
+	def close(self):
+		self.offsets.release()
+		self.mm.close()
+		self.file.close()
+
+
+
+class PayloadSpace:
+	"""the cartesian product of several wordlists (the clusterbomb attacktype), never built in memory: combination i is decoded from i on demand, with the last wordlist varying fastest like itertools.product()
+	each wordlist is a CompiledWordlist, so reading any word is a lookup in its mmap offset index, and any index range can be handed to a shard or a resume point"""
+	def __init__(self, paths, cache_dir=None):
+		self.lists = []
+		for path in paths:
+			self.lists.append(CompiledWordlist(path, cache_dir=cache_dir))
+		self.sizes = [len(w) for w in self.lists]
+		self.count = math.prod(self.sizes)
+
+	def __len__(self) -> int:
+		return(self.count)
+
+	def __getitem__(self, i) -> tuple:
+		"""returns combination i as a tuple of one word per wordlist"""
+		if i < 0:
+			i = i + self.count
+		if not 0 <= i < self.count:
+			raise IndexError("payload index out of range")
+		words = []
+		for w, size in zip(reversed(self.lists), reversed(self.sizes)):
+			i, r = divmod(i, size)
+			words.append(w[r])
+		words.reverse()
+		return(tuple(words))
+
+	def close(self):
+		for w in self.lists:
+			w.close()
+
+	def __enter__(self):
+		return(self)
+
+	def __exit__(self, *args):
+		self.close()
+
+
+
+class ArgTemplate:
+	"""arg mode's inject keys and static args, compiled once into the pieces of a query string, so each payload only costs one join"""
+	def __init__(self, injectkeys, staticargs, strip=True):
+		# trident has always used its keys exactly as given, so it passes strip=False to keep its output unchanged
+		self.keys = [(k.strip() if strip else k) + "=" for k in injectkeys or []]
+		# static args are appended to the end of every query, empty values dropped
+		self.static = ""
+		if isinstance(staticargs, list):
+			self.static = "&".join([a for a in staticargs if len(a) > 0])
+
+	def render(self, values) -> str:
+		"""returns key1=value1&key2=value2...&static1=... for one value per key (extra keys or values are ignored, like zip())"""
+		l = [k + v for k, v in zip(self.keys, values)]
+		if self.static:
+			l.append(self.static)
+		return("&".join(l))
+
+	def fill(self, word) -> str:
+		"""every key gets the same word (the shotgun attacktype)"""
+		return(self.render([word] * len(self.keys)))
+
+
+
+class BodyTemplate:
+	"""a request body file compiled once into static byte segments and injection slots ({{key}} for each -K key), with the same fill()/render() interface as ArgTemplate so body mode reuses the arg mode Fillers
+	each value is encoded to bytes once, by the Filler, and every request for that item only joins (or streams) the already-encoded pieces"""
+	encodings = ["raw", "json", "url"]
+
+	def __init__(self, path, injectkeys, encoding="raw"):
+		self.keys = [k.strip() for k in injectkeys or [] if len(k.strip()) > 0]
+		self.encoding = encoding
+		with open(path, "rb") as f:
+			data = f.read()
+		self.segments = [] # static bytes around the slots, always one more than self.slots
+		self.slots = [] # index into self.keys of each slot, in body order
+		pos = 0
+		if self.keys:
+			pattern = re.compile(b"\\{\\{(" + b"|".join(re.escape(k.encode("utf-8")) for k in self.keys) + b")\\}\\}")
+			for m in pattern.finditer(data):
+				self.segments.append(data[pos:m.start()])
+				self.slots.append(self.keys.index(m.group(1).decode("utf-8")))
+				pos = m.end()
+		self.segments.append(data[pos:])
+
+	def encode(self, value) -> bytes:
+		"""raw inserts the value as UTF-8, json escapes it for use inside a JSON string, url percent-encodes it for a form body"""
+		if self.encoding == "json":
+			return(json.dumps(value)[1:-1].encode("utf-8"))
+		if self.encoding == "url":
+			return(quote_plus(value).encode("utf-8"))
+		return(value.encode("utf-8", "surrogateescape"))
+
+	def render(self, values, label=None) -> "BodyPayload":
+		"""returns the payload for one value per key (extra keys or values are ignored, like zip())"""
+		values = list(values)
+		encoded = [self.encode(v) for v in values]
+		parts = [self.segments[0]]
+		for slot, segment in zip(self.slots, self.segments[1:]):
+			if slot < len(encoded):
+				parts.append(encoded[slot])
+			parts.append(segment)
+		if label is None:
+			label = "&".join([k + "=" + v for k, v in zip(self.keys, values)])
+		return(BodyPayload(label, parts))
+
+	def fill(self, word) -> "BodyPayload":
+		"""every key gets the same word (the shotgun attacktype)"""
+		return(self.render([word] * len(self.keys), label=word))
+
+
+
+class BodyPayload(str):
+	"""a body mode queue item: the string itself is the label shown as the result's word, and parts holds the body as pre-encoded byte pieces"""
+	stream_threshold = 1048576 # bodies larger than this are streamed from the pieces instead of being joined into one bytes object
+
+	def __new__(cls, label, parts):
+		self = str.__new__(cls, label)
+		self.parts = parts
+		self.length = sum(len(x) for x in parts)
+		return(self)
+
+	def __reduce__(self):
+		return(BodyPayload, (str(self), self.parts))
+
+	def body(self, stream=True):
+		"""returns the request body, a BodyStream when it is large (and stream is allowed), otherwise bytes"""
+		if stream and self.length > self.stream_threshold:
+			return(BodyStream(self.parts, self.length))
+		return(b"".join(self.parts))
+
+
+
+class BodyStream:
+	"""file-like reader over a body's byte pieces, so http.client sends a large body block by block with a known Content-Length, without ever joining it"""
+	def __init__(self, parts, length):
+		self.parts = parts
+		self.length = length
+		self.index = 0 # current piece
+		self.offset = 0 # position within the current piece
+
+	def __len__(self) -> int:
+		return(self.length)
+
+	def read(self, n=-1) -> bytes:
+		if n is None or n < 0:
+			n = self.length
+		out = []
+		while n > 0 and self.index < len(self.parts):
+			piece = memoryview(self.parts[self.index])[self.offset:self.offset+n]
+			out.append(piece)
+			n -= len(piece)
+			self.offset += len(piece)
+			if self.offset >= len(self.parts[self.index]):
+				self.index += 1
+				self.offset = 0
+		return(b"".join(out))
 
 
 
@@ -118,6 +477,88 @@ class Filler(threading.Thread):
 		self.injectkeys = kwargs.get("injectkeys")
 		self.longest = kwargs.get("longest")
 		self.fillvalue = kwargs.get("fillvalue")
+		self.wordlist_cache = kwargs.get("wordlist_cache")
+		self.cache_dir = kwargs.get("cache_dir")
+		self.rows = kwargs.get("rows") # (start, end) word/row numbers to place, a --processes shard or an --agent lease (end None runs to the last row, None places every row)
+		self.offsets = kwargs.get("offsets") # byte offset of row rows[0] in each plain-text wordlist, so a shard seeks straight to its rows, see RequestInjector.shardRanges()
+		self.checkpoint = kwargs.get("checkpoint") # Checkpoint when using --state, records which words/rows have been placed
+		self.template = kwargs.get("template") # the precompiled BodyTemplate in body mode
+		self.priority = kwargs.get("priority") # words placed first with --prioritize, see ResultStore.priority()
+		self.cancel = kwargs.get("cancel") # Event set when a ResultStream consumer stops early, see cancelled()
+		self.startrow = 0 # first word/row number to read, later than the first row of the range when resuming
+		self.endrow = None # word/row number to stop before, None reads to the end
+		if self.rows:
+			self.startrow, self.endrow = self.rows
+		first = self.startrow
+		if self.checkpoint:
+			self.startrow = max(self.startrow, self.checkpoint.start())
+		self.stats = Stats()
+		if kwargs.get("metrics"):
+			kwargs.get("metrics").register(self.stats)
+		# rows of this range before startrow were completed by the resumed scan, see Reporter
+		self.stats.resumed = self.startrow - first
+
+	def makeTemplate(self, strip=True):
+		"""the compiled template payloads are built from, the BodyTemplate in body mode, otherwise an ArgTemplate"""
+		if self.template is not None:
+			return(self.template)
+		return(ArgTemplate(self.injectkeys, self.staticargs, strip=strip))
+
+	def cancelled(self) -> bool:
+		"""checks if the scan was cancelled, in which case no more words/rows are read"""
+		return(self.cancel is not None and self.cancel.is_set())
+
+	def inShard(self, n) -> bool:
+		"""checks if word/row number n belongs to this process's shard or lease (always true without --processes or --agent)"""
+		if not self.rows:
+			return(True)
+		return(self.rows[0] <= n and (self.rows[1] is None or n < self.rows[1]))
+
+	def seek(self, i):
+		"""(row number, byte offset) of the start of this Filler's rows in wordlist i, or None when it has to be read from the top"""
+		if not self.offsets:
+			return(None)
+		return((self.rows[0], self.offsets[i]))
+
+	def wanted(self, n) -> bool:
+		"""checks if word/row number n should be placed, i.e. it is in this shard and was not already completed by a resumed scan"""
+		if not self.inShard(n):
+			return(False)
+		if self.checkpoint and not self.checkpoint.wanted(n):
+			self.stats.resumed += 1
+			return(False)
+		return(True)
+
+	def place(self, n, item):
+		"""places word/row number n into the queue, along with its number so Workers can report it finished"""
+		if self.checkpoint:
+			self.checkpoint.placed(n)
+		self.queue.put((n, item))
+		self.stats.placed += 1
+
+	def readWords(self, fname, dedup=True, start=0, end=None, seek=None):
+		"""yields cleaned words from a wordlist file from word number start up to (not including) end, through the compiled mmap cache (CompiledWordlist) when wordlist_cache is set
+		seek is a (row number, byte offset) pair the plain-text file can be positioned at first, see seek()"""
+		if self.wordlist_cache:
+			w = CompiledWordlist(fname, cache_dir=self.cache_dir, dedup=dedup)
+			try:
+				# the offset index lets a shard or a resumed scan seek straight to word number start
+				for word in itertools.islice(w.iterate(start), None if end is None else max(0, end - start)):
+					if self.cancelled():
+						return
+					yield(word)
+			finally:
+				w.close()
+		else:
+			with open(fname, "r") as f:
+				first = 0
+				if seek is not None and seek[0] <= start:
+					f.seek(seek[1])
+					first = seek[0]
+				for line in itertools.islice(f, start - first, None if end is None else max(0, end - first)):
+					if self.cancelled():
+						return
+					yield(line.strip())
 
 
 
@@ -127,13 +568,32 @@ class PathFiller(Filler):
 		super().__init__(*args, **kwargs)
 
 	def run(self):
+		if self.priority:
+			self.runPrioritized()
+			return
 		# self.wordlist is a list, and this mode only accepts the first wordlist
-		with open(self.wordlist[0], "r") as f:
-			for line in f:
-				line = str(line).strip()
-				self.queue.put(line)
-#				print(f"\033[95m{self.name}\033[0m placed {line} into queuein") # purple
-		f.close()
+		for n, line in enumerate(self.readWords(self.wordlist[0], start=self.startrow, end=self.endrow, seek=self.seek(0)), self.startrow):
+			if not self.wanted(n):
+				continue
+			self.place(n, line)
+#			print(f"\033[95m{self.name}\033[0m placed {line} into queuein") # purple
+
+	def runPrioritized(self):
+		"""places the words of the wordlist that hit in earlier scans first, best first, then the rest in wordlist order
+		the wordlist is read twice, first only to find which of the prioritized words it contains, so memory stays at the size of the priority list"""
+		wanted = set(self.priority)
+		present = set()
+		for line in self.readWords(self.wordlist[0]):
+			if line in wanted:
+				present.add(line)
+		first = [line for line in self.priority if line in present]
+		rest = (line for line in self.readWords(self.wordlist[0]) if line not in present)
+		for n, line in enumerate(itertools.chain(first, rest)):
+			if self.cancelled():
+				return
+			if not self.wanted(n):
+				continue
+			self.place(n, line)
 
 
 
@@ -141,39 +601,17 @@ class ArgShotgunFiller(Filler):
 	"""fills the queue based on arg mode + shotgun attacktype requirements"""
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
-
-	def makeArg(self, word):
-		l = []
-		for i in self.injectkeys:
-			# make into key=value format
-			# TODO: encodings and obfuscations
-			i = i.strip() + "=" + word.strip()
-			l.append(i)
-		#
-		# append static args to the ones generated above
-		if isinstance(self.staticargs, list):
-			l = l + self.staticargs
-		return(l)
+		self.template = self.makeTemplate()
 
 	def run(self):
 #		print(f"\033[95m{self.name}\033[0m opening {self.wordlist}") # purple
 		# self.wordlist is a list, and this attacktype only accepts the first wordlist
-		with open(self.wordlist[0], "r") as f:
-			for line in f:
-				line = str(line).strip()
-				line = self.makeArg(line)
-				#
-				# build a new list not containing empty values
-				l = [i for i in line if len(i) > 0]
-				#
-				# take the list and turn it into a format ready to be pasted onto a URL
-				if len(l) > 1:
-					xxx = "&".join(l) # a query string ready to be appended
-				else:
-					xxx = "".join(l) # smash the list into an empty string or a string containing just the first element
-				self.queue.put(xxx)
-#				print(f"\033[95m{self.name}\033[0m placed {line} into queuein") # purple
-		f.close()
+		for n, line in enumerate(self.readWords(self.wordlist[0], start=self.startrow, end=self.endrow, seek=self.seek(0)), self.startrow):
+			if not self.wanted(n):
+				continue
+			# every key gets this word, followed by the static args, as a query string ready to be appended
+			self.place(n, self.template.fill(line))
+#			print(f"\033[95m{self.name}\033[0m placed {line} into queuein") # purple
 
 
 
@@ -181,68 +619,59 @@ class ArgTridentFiller(Filler):
 	"""fills the queue based on arg mode + trident attacktype requirements"""
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
+		self.template = self.makeTemplate(strip=False)
 
 	def run(self):
 		with ExitStack() as stack:
 			# open all files at once using the ExitStack context manager
-			files = [stack.enter_context(open(fname, "r")) for fname in self.wordlist]
+			# dedup is off so that row N of every wordlist still lines up
+			files = [stack.enter_context(closing(self.readWords(fname, dedup=False, start=self.startrow, end=self.endrow, seek=self.seek(i)))) for i, fname in enumerate(self.wordlist)]
 			# in each file, get a row at the same time, zip() them, and put the output into the queue
-			for (rows) in zip(*files):
-				# clean each item
-				rows = [r.strip() for r in rows]
-				# zip the keys and row items into a new tuple
-				x = [x for x in zip(self.injectkeys,rows)]
-				# turn the tuples into key=value pairs for using in a URL query
-				xx = ["=".join(a) for a in x]
-				#
-				# append static args to the ones generated above
-				if isinstance(self.staticargs, list):
-					xx = xx + self.staticargs
-				#
-				# build a new list not containing empty values
-				l = [i for i in xx if len(i) > 0]
-				#
-				# take the list and turn it into a format ready to be pasted onto a URL
-				if len(l) > 1:
-					xxx = "&".join(l) # a query string ready to be appended
-				else:
-					xxx = "".join(l) # smash the list into an empty string or a string containing just the first element
-				# place the key1=value1&key2=value2... string into the queue
-				self.queue.put(xxx)
+			for n, rows in enumerate(zip(*files), self.startrow):
+				if not self.wanted(n):
+					continue
+				# clean each item, pair it with its key, and place the key1=value1&key2=value2... string into the queue
+				self.place(n, self.template.render([r.strip() for r in rows]))
 
 
 class ArgTridentLongestFiller(Filler):
 	"""fills the queue based on arg mode + trident attacktype + --longest requirements"""
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
+		self.template = self.makeTemplate(strip=False)
 
 	def run(self):
 		with ExitStack() as stack:
 			# open all files at once using the ExitStack context manager
-			files = [stack.enter_context(open(fname, "r")) for fname in self.wordlist]
+			# dedup is off so that row N of every wordlist still lines up
+			files = [stack.enter_context(closing(self.readWords(fname, dedup=False, start=self.startrow, end=self.endrow, seek=self.seek(i)))) for i, fname in enumerate(self.wordlist)]
 			# in each file, get a row at the same time, itertools.zip_longest() them, and put the output into the queue
-			for (rows) in itertools.zip_longest(*files, fillvalue=self.fillvalue):
-				# clean each item
-				rows = [r.strip() for r in rows]
-				# zip the keys and row items into a new tuple
-				x = [x for x in zip(self.injectkeys,rows)]
-				# turn the tuples into key=value pairs for using in a URL query
-				xx = ["=".join(a) for a in x]
-				#
-				# append static args to the ones generated above
-				if isinstance(self.staticargs, list):
-					xx = xx + self.staticargs
-				#
-				# build a new list not containing empty values
-				l = [i for i in xx if len(i) > 0]
-				#
-				# take the list and turn it into a format ready to be pasted onto a URL
-				if len(l) > 1:
-					xxx = "&".join(l) # a query string ready to be appended
-				else:
-					xxx = "".join(l) # smash the list into an empty string or a string containing just the first element
-				# place the key1=value1&key2=value2... string into the queue
-				self.queue.put(xxx)
+			for n, rows in enumerate(itertools.zip_longest(*files, fillvalue=self.fillvalue), self.startrow):
+				if not self.wanted(n):
+					continue
+				# clean each item, pair it with its key, and place the key1=value1&key2=value2... string into the queue
+				self.place(n, self.template.render([r.strip() for r in rows]))
+
+
+
+class ArgClusterbombFiller(Filler):
+	"""fills the queue based on arg mode + clusterbomb attacktype requirements, every combination of one word from each wordlist"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.template = self.makeTemplate()
+
+	def run(self):
+		# combinations are numbered, so a shard or a resumed scan jumps straight to its first one instead of enumerating the ones before it
+		with PayloadSpace(self.wordlist, cache_dir=self.cache_dir) as space:
+			end = len(space)
+			if self.endrow is not None:
+				end = min(end, self.endrow)
+			for n in range(self.startrow, end):
+				if self.cancelled():
+					return
+				if not self.wanted(n):
+					continue
+				self.place(n, self.template.render(space[n]))
 
 
 
@@ -275,6 +704,8 @@ class ProcessUrl:
 			return(self.mutatePath(url, mode))
 		elif mode == "arg":
 			return(self.mutateArg(url, mode))
+		elif mode == "body":
+			return([url])
 
 	def mutatePath(self, url, mode) -> list:
 		"""produces a list of each URL variation based on trimming paths down to the base URL"""
@@ -308,259 +739,3573 @@ class ProcessUrl:
 		elif mode == "arg":
 			# nyi, prep URL fix actions here before sending to mutate
 			return(url)
+		elif mode == "body":
+			# the URL is requested as given, the words go into the body
+			return(url)
 
 	def __repr__(self) -> str:
 		return(self.url)
 
 
 
+class Calibrator:
+	"""requests random nonexistent words against each URL variation before the scan, and records what its "not found" responses look like, so Workers can drop matching soft-404 responses after reading only the first few body bytes"""
+	bucket_size = 64 # response sizes are compared in buckets of this many bytes
+	reflect_marks = (b"\x00RI:item\x00", b"\x00RI:word\x00") # stand in for the requested item and its random word wherever a "not found" page echoes them, see Worker.fingerprint()
+
+	def __init__(self, worker, urls, words=3, itemmaker=None):
+		self.worker = worker # an unstarted Worker of the scan's type, used for its session, prepareUrl(), and fingerprint()
+		self.urls = urls
+		self.words = words
+		self.itemmaker = itemmaker # turns a random word into a queue item (ex. a query string for arg mode)
+		if not self.itemmaker:
+			self.itemmaker = lambda word: word
+
+	def run(self) -> dict:
+		"""returns a dictionary of {prepared URL: set of fingerprints}"""
+		fingerprints = {}
+		w = self.worker
+		for url in self.urls:
+			url = w.prepareUrl(url)
+			fingerprints[url] = set()
+			for i in range(self.words):
+				word = uuid.uuid4().hex
+				item = self.itemmaker(word)
+				try:
+					# calibration requests count towards --rate/--host_rate like any other
+					started = w.throttle(urlparse(url).netloc)
+					r = w.sendRequest(w.requestUrl(url, item), item)
+					w.observe(started, r.status_code)
+					head = b""
+					if r.request.method != "HEAD":
+						head = w.readHead(r, w.fingerprint_bytes)
+						w.drain(r, len(head))
+					fingerprints[url].add(w.fingerprint(r.status_code, r, head, item, word))
+					r.close()
+				except Exception as e:
+					sys.stderr.write(f"EXCEPTION Calibrator: {url+item} REASON: {type(e).__name__}\n")
+			sys.stderr.write(f"INFO Calibrator: {url} has {len(fingerprints[url])} soft-404 fingerprint(s)\n")
+		return(fingerprints)
+
+
+
+class PatternSet:
+	"""the body patterns of a --match_file, compiled once: every literal into a single re alternation, so a body is searched for all of them in one pass of the C regex engine, and each regex (a line starting with re:) with re
+	a line may start with ID and a tab, otherwise the pattern itself is its ID"""
+	regex_window = 4096 # bytes of earlier chunks a regex is searched again with, so a match can span chunk boundaries
+
+	def __init__(self, path):
+		self.ids = [] # pattern ID by pattern number
+		self.regexes = [] # (pattern number, compiled regex)
+		literals = [] # (pattern number, bytes)
+		with open(path, "r", encoding="utf-8") as f:
+			for line in f:
+				line = line.rstrip("\r\n")
+				if len(line.strip()) == 0 or line.startswith("#"):
+					continue
+				pid, sep, pattern = line.partition("\t")
+				if not sep:
+					pattern = line
+				n = len(self.ids)
+				self.ids.append(pid)
+				if pattern.startswith("re:"):
+					self.regexes.append((n, re.compile(pattern[3:].encode("utf-8"))))
+				elif len(pattern) > 0:
+					literals.append((n, pattern.encode("utf-8")))
+		self.build(literals)
+
+	def build(self, literals):
+		"""compiles the literals into one alternation, so a search finds the longest literal starting at the first position any of them does
+		a literal inside a longer one that matched is never reported by the search itself, see contained()"""
+		self.literal = None
+		self.overlap = 0 # bytes of the previous chunk searched again, so a literal can span chunk boundaries
+		self.numbers = {} # literal bytes -> pattern numbers of the lines with that literal
+		self.contains = {} # literal bytes -> pattern numbers of every literal inside it, filled in by contained() as literals match
+		if not literals:
+			return
+		for n, literal in literals:
+			self.numbers.setdefault(literal, []).append(n)
+		self.trie = {}
+		for literal in self.numbers:
+			node = self.trie
+			for b in literal:
+				node = node.setdefault(b, {})
+			node[None] = literal # a literal ends here
+		self.literal = re.compile(self.trieRegex(self.trie))
+		self.overlap = max([len(l) for l in self.numbers]) - 1
+
+	def contained(self, literal) -> set:
+		"""pattern numbers of the literals found inside a matched literal (itself included), by walking the trie from each of its bytes"""
+		found = self.contains.get(literal)
+		if found is None:
+			found = set()
+			for start in range(len(literal)):
+				node = self.trie
+				for i in range(start, len(literal)):
+					node = node.get(literal[i])
+					if node is None:
+						break
+					if None in node:
+						found.update(self.numbers[node[None]])
+			self.contains[literal] = found
+		return(found)
+
+	def trieRegex(self, node) -> bytes:
+		"""the alternation of the literals below a trie node, nested by common prefix (ab(?:c|d) rather than abc|abd), so re follows one branch per byte instead of trying every literal at every position"""
+		branches = [re.escape(bytes([b])) + self.trieRegex(node[b]) for b in sorted([k for k in node if k is not None])]
+		if not branches:
+			return(b"")
+		if len(branches) == 1 and None not in node:
+			return(branches[0])
+		regex = b"(?:" + b"|".join(branches) + b")"
+		if None in node:
+			# a shorter literal ends here, the greedy ? still prefers the longer ones
+			regex += b"?"
+		return(regex)
+
+	def __len__(self) -> int:
+		return(len(self.ids))
+
+
+
+class PatternScanner:
+	"""matches one response body against a PatternSet, fed chunk by chunk as the body is read so it is never held in memory as a whole"""
+	def __init__(self, patterns, first=False):
+		self.patterns = patterns
+		self.first = first # stop at the first match, see stopped()
+		self.found = set()
+		self.pending = list(patterns.regexes) # regexes not matched yet
+		self.head = b"" # the last patterns.overlap bytes, see feed()
+		self.tail = b"" # the last patterns.regex_window bytes
+
+	def stopped(self) -> bool:
+		"""checks if the rest of the body can go unread"""
+		return(self.first and len(self.found) > 0)
+
+	def feed(self, chunk) -> bool:
+		"""scans the next chunk of the body, and returns stopped()"""
+		literal = self.patterns.literal
+		if literal is not None:
+			data = self.head + bytes(chunk)
+			# each search resumes one byte after the last match's start, which finds overlapping matches without a lookahead that would stop re skipping ahead on the literals' first bytes
+			m = literal.search(data)
+			while m is not None:
+				self.found.update(self.patterns.contained(m.group()))
+				if self.first:
+					break
+				m = literal.search(data, m.start() + 1)
+			self.head = data[max(0, len(data)-self.patterns.overlap):]
+		if self.pending and not self.stopped():
+			data = self.tail + bytes(chunk)
+			for n, regex in list(self.pending):
+				if regex.search(data):
+					self.found.add(n)
+					self.pending.remove((n, regex))
+			self.tail = data[-self.patterns.regex_window:]
+		return(self.stopped())
+
+	def ids(self) -> list:
+		"""IDs of the patterns found, in --match_file order, or None"""
+		if not self.found:
+			return(None)
+		return([self.patterns.ids[n] for n in sorted(self.found)])
+
+
+
 #================================================
 #
-# Worker Classes
+# Flow Control Classes
 #
 #================================================
 
 
 
-class Worker(threading.Thread):
-	"""parent class that retrieves an item from the input queue, makes a web request, and places the results into an output queue"""
-	def __init__(self, *args, **kwargs):
-		threading.Thread.__init__(self)
-		self.setDaemon(True)
-		self.name = threading.current_thread().name
-		self.queuein = kwargs.get("queuein")
-		self.queueout = kwargs.get("queueout")
-		self.urls = kwargs.get("urls")
-		self.proxy = kwargs.get("proxy")
-		self.headers = kwargs.get("headers")
-		if not self.headers:
-			self.headers = {}
-		self.header_default_useragent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:86.0) Gecko/20100101 Firefox/86.0"
-		self.header_default_accept = "text/html, application/xhtml+xml, application/xml;q=0.9, */*;q=0.8"
-		self.url_encode = kwargs.get("url_encode")
-		self.retries = kwargs.get("retries")
-		self.delay = kwargs.get("delay")
-		if len(self.headers) == 0:
-			self.headers = {'User-Agent':self.header_default_useragent, 'Accept':self.header_default_accept}
-		else:
-			if "User-Agent" not in self.headers:
-				self.headers["User-Agent"] = self.header_default_useragent
-			if "Accept" not in self.headers:
-				self.headers["Accept"] = self.header_default_accept
-		if not self.retries:
-			self.retries = 1
-		self.bad_domains = {} # tracks domains that raise requests.exceptions.ReadTimeout
+class TokenBucket:
+	"""thread-safe token bucket allowing rate requests per second, with bursts of up to capacity requests"""
+	def __init__(self, rate, capacity=None):
+		self.rate = float(rate)
+		self.capacity = capacity
+		if not self.capacity:
+			self.capacity = max(1.0, self.rate)
+		self.tokens = self.capacity
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
 
-	def badDomainChecker(self, domain):
-		"""tracks domains that raise requests.exceptions.ReadTimeout"""
-		if domain not in self.bad_domains.keys():
-			#sys.stderr.write(f"\033[91mINFO {self.name}: BAD DOMAIN ADDED: {domain}\033[0m\n") # red
-			self.bad_domains[domain] = 1
-		elif domain in self.bad_domains.keys():
-			#sys.stderr.write(f"\033[91mINFO {self.name}: BAD DOMAIN COUNT FOR: {domain} {self.bad_domains[domain]}\033[0m\n") # red
-			self.bad_domains[domain] += 1
+	def reserve(self) -> float:
+		"""takes a token and returns how many seconds the caller must wait before using it; waiting happens outside the lock, so this works for both threads and coroutines"""
+		with self.lock:
+			now = time.monotonic()
+			self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+			self.updated = now
+			# the balance may go negative, which queues callers up in order
+			self.tokens -= 1
+			if self.tokens >= 0:
+				return(0.0)
+			return(-self.tokens / self.rate)
 
-	def prepareUrl(self, url):
-		"""this will be inherited downstream for modification"""
-		return(url)
 
-	def makeRequest(self, url, item):
-		"""handles web request logic"""
-		try:
-			# set a flag that determines if the request gets made or not, depending on if a domain is responsive or not based on self.badDomainChecker() and self.bad_domains
-			execute = "yes"
-			domain = urlparse(url).netloc
-			# check if the domain is in a thread-internal "known bad / unresponsive" dictionary
-			if domain in self.bad_domains.keys():
-				if self.bad_domains[domain] >= self.retries:
-					execute = "no"
-			if execute == "yes":
-				# word (current queue item) is appended to the URL here
-				url = url+item
-				#print(f"\033[94m{self.name}\033[0m requesting website: {url}") # blue
-				# make the request, using given (or default) headers, allowing redirects, no TLS validation, given proxies, 3-second timeout, and streaming data
-				# stream=True means the response body content is not downloaded until the .content attribute is accessed, plus raw info (IP etc) can be accessed
-				# https://docs.python-requests.org/en/master/user/advanced/#body-content-workflow
-				r = requests.get(url, headers=self.headers, allow_redirects=True, verify=False, proxies=self.proxy, timeout=3, stream=True)
-				# handle response content
-				# future: send all content to another object for processing
-				ip = r.raw._fp.fp.raw._sock.getpeername() # socket into only accessible if stream=True and before .content attribute is called (note this will be the proxy IP/port if one is used)
-				sc = r.status_code
-				sz = len(r.content) # length of body content, which should (but will not always) match the Content-Length header
-				r.close() # ALWAYS close a streaming connection
-				#print(f"status_code:{sc} bytes:{sz} word:{item} ip:{ip[0]} port:{ip[1]} url:{url}")
-				return(f"status_code:{sc} bytes:{sz} word:{item} ip:{ip[0]} port:{ip[1]} url:{url}")
-			else:
-				return(f"EXCEPTION {self.name}: {url} REASON: requests.exceptions.ReadTimeout EXTRA: hit max internal allowed retries: ({self.retries})") # note this pseudo-exception will get displayed on stderr by Drainer
-		except Exception as e:
-			# if the domain generates an exception, increment its counter in the dictionary
-			self.badDomainChecker(domain)
-			return(f"EXCEPTION {self.name}: {url} REASON: requests.exceptions.ReadTimeout EXTRA: count: {self.bad_domains[domain]}, max allowed: {self.retries}") # note this exception will get displayed on stderr by Drainer
 
+class RateLimiter:
+	"""a global token bucket plus one token bucket per host, shared by every Worker (--rate, --host_rate)"""
+	def __init__(self, rate=0.0, host_rate=0.0):
+		self.bucket = None
+		if rate:
+			self.bucket = TokenBucket(rate)
+		self.host_rate = host_rate
+		self.host_buckets = {}
+		self.lock = threading.Lock()
 
-	def run(self):
-		"""invoke the request"""
+	def reserve(self, host) -> float:
+		"""returns how many seconds to wait before sending a request to host"""
+		wait = 0.0
+		if self.bucket is not None:
+			wait = self.bucket.reserve()
+		if self.host_rate:
+			b = self.host_buckets.get(host)
+			if b is None:
+				with self.lock:
+					b = self.host_buckets.setdefault(host, TokenBucket(self.host_rate))
+			wait = max(wait, b.reserve())
+		return(wait)
+
+
+
+class ConcurrencyController:
+	"""AIMD (additive increase, multiplicative decrease) limit on in-flight requests, shared by every Worker (--adaptive)"""
+	def __init__(self, maximum, latency_target=None):
+		self.maximum = maximum
+		self.limit = float(maximum) # current effective concurrency
+		self.inflight = 0
+		# latency counts as "rising" above latency_target seconds, or above twice the best smoothed latency seen when no target is given
+		self.latency_target = latency_target
+		self.ewma = None
+		self.best = None
+		self.successes = 0
+		self.last_decrease = 0.0
+		self.condition = threading.Condition()
+		self.waiters = [] # (event loop, future) of every acquireAsync() waiting for a slot, woken by release()
+
+	def acquire(self):
+		"""blocks the calling thread until an in-flight slot is free"""
+		with self.condition:
+			while self.inflight >= int(self.limit):
+				self.condition.wait()
+			self.inflight += 1
+
+	async def acquireAsync(self):
+		"""async version of acquire(), waits on a future that release() completes, so the event loop is never blocked"""
+		loop = asyncio.get_running_loop()
 		while True:
-			# get item to work on from first queue
-			item = self.queuein.get()
-#			print(f"\033[94m{self.name}\033[0m got item from queuein: {item}") # blue
-			# process that item for each URL variation
-			for url in self.urls:
-				# prepareUrl() will be different for each type (path, arg, etc) and is modified in the subclass
-				url = self.prepareUrl(url)
-#				print(f"\033[94m{self.name}\033[0m prepped {url}") # blue
-				if self.delay:
-					time.sleep(self.delay)
-				result = self.makeRequest(url, item)
-				# put the result of each url+item request into the second queue
-				self.queueout.put(result)
-#				s = f"\033[94m{self.name}\033[0m put item into queueout: {result}" # blue
-			# tell queuein the task is finished (for the queue.join() at the end)
-			self.queuein.task_done()
+			with self.condition:
+				if self.inflight < int(self.limit):
+					self.inflight += 1
+					return
+				waiter = loop.create_future()
+				self.waiters.append((loop, waiter))
+			await waiter
 
+	@staticmethod
+	def wake(waiter):
+		if not waiter.done():
+			waiter.set_result(None)
 
+	def release(self, latency, status):
+		"""frees a slot and adjusts the limit; status is None when the request failed outright"""
+		with self.condition:
+			self.inflight -= 1
+			if self.ewma is None:
+				self.ewma = latency
+				self.best = latency
+			else:
+				self.ewma = 0.9 * self.ewma + 0.1 * latency
+				# let the baseline drift up slowly, so a permanently slower target does not pin the limit down forever
+				self.best = min(self.ewma, self.best * 1.001)
+			target = self.latency_target or self.best * 2
+			if status is None or status in [429, 503] or self.ewma > target:
+				now = time.monotonic()
+				# back off at most once per smoothed round trip, so one burst of errors halves the limit once instead of collapsing it
+				if now - self.last_decrease > self.ewma:
+					self.limit = max(1.0, self.limit / 2)
+					self.last_decrease = now
+				self.successes = 0
+			else:
+				# grow by one slot after a full window of healthy responses
+				self.successes += 1
+				if self.successes >= int(self.limit) and self.limit < self.maximum:
+					self.limit += 1
+					self.successes = 0
+			self.condition.notify_all()
+			# every async waiter checks again, in its own loop's thread
+			for loop, waiter in self.waiters:
+				loop.call_soon_threadsafe(self.wake, waiter)
+			self.waiters = []
 
-class PathWorker(Worker):
-	"""performs web requests according to path mode requirements"""
-	def __init__(self, *args, **kwargs):
-		super().__init__(*args, **kwargs)
 
-	def prepareUrl(self, url):
-	# extra logic to double-check that the URL has a trailing slash, but ProcessUrl should handle this properly
-		if not url.endswith("/"):
-			url = url + "/"
-		return(url)
 
+class CircuitBreaker:
+	"""per-host circuit breaker shared by every Worker: closed (requests flow), open (requests are skipped right away), and half-open (after the cooldown, one probe request decides whether to close or re-open)"""
+	STATE_CLOSED = "closed"
+	STATE_OPEN = "open"
+	STATE_HALF_OPEN = "half-open"
 
+	def __init__(self, threshold=1, cooldown=30.0, shared=None, shared_lock=None):
+		self.threshold = threshold # failures before a host is opened (-r/--retries)
+		self.cooldown = cooldown # seconds an open host is skipped before a probe is allowed
+		self.hosts = {} # host --> {"state", "failures", "opened"}, only hosts that have failed are present
+		self.skipped = {} # host --> number of requests skipped while open
+		self.lock = threading.Lock()
+		# when using --processes, failure counts are also kept in a dictionary shared by every process, see sync()
+		self.shared = shared
+		self.shared_lock = shared_lock
+		self.last_sync = 0.0
 
-class ArgWorker(Worker):
-	"""performs web requests according to arg mode requirements"""
-	def __init__(self, *args, **kwargs):
-		super().__init__(*args, **kwargs)
+	def sync(self):
+		"""opens hosts that other processes (--processes) have given up on, checked at most once per second to keep the shared dictionary off the request hot path"""
+		now = time.monotonic()
+		if now - self.last_sync < 1.0:
+			return
+		self.last_sync = now
+		for host, failures in self.shared.items():
+			if failures >= self.threshold:
+				with self.lock:
+					h = self.hosts.setdefault(host, {"state": self.STATE_CLOSED, "failures": 0, "opened": 0.0})
+					if h["state"] == self.STATE_CLOSED:
+						h["state"] = self.STATE_OPEN
+						h["opened"] = now
+					h["failures"] = max(h["failures"], failures)
 
-	def prepareUrl(self, url):
-	# extra logic to double-check that the URL has no trailing slash
-		if url.endswith("/"):
-			url = url.rstrip("/")
-		if not url.endswith("?"):
-			url = url + "?"
-		return(url)
+	def allow(self, host) -> bool:
+		"""checks if a request to host may be sent; the caller that moves a host to half-open is its probe"""
+		if self.shared is not None:
+			self.sync()
+		# healthy hosts are never in self.hosts, so the common case takes no lock
+		if host not in self.hosts:
+			return(True)
+		with self.lock:
+			h = self.hosts.get(host)
+			if h is None or h["state"] == self.STATE_CLOSED:
+				return(True)
+			if h["state"] == self.STATE_OPEN and time.monotonic() - h["opened"] >= self.cooldown:
+				h["state"] = self.STATE_HALF_OPEN
+				return(True)
+			# open, or half-open with a probe already in flight
+			self.skipped[host] = self.skipped.get(host, 0) + 1
+			return(False)
 
+	def success(self, host):
+		"""a response was received, so the host is healthy again"""
+		if host not in self.hosts:
+			return
+		with self.lock:
+			self.hosts.pop(host, None)
+		if self.shared is not None:
+			with self.shared_lock:
+				self.shared.pop(host, None)
 
+	def failure(self, host) -> int:
+		"""records a failed request, opening the host once it reaches the threshold (or straight away if it was a failed probe), and returns its failure count"""
+		if self.shared is not None:
+			# failures are rare, so each one is written straight through to the shared dictionary
+			with self.shared_lock:
+				failures = self.shared.get(host, 0) + 1
+				self.shared[host] = failures
+		with self.lock:
+			h = self.hosts.setdefault(host, {"state": self.STATE_CLOSED, "failures": 0, "opened": 0.0})
+			h["failures"] += 1
+			if self.shared is not None:
+				h["failures"] = max(h["failures"], failures)
+			if h["state"] == self.STATE_HALF_OPEN or h["failures"] >= self.threshold:
+				h["state"] = self.STATE_OPEN
+				h["opened"] = time.monotonic()
+			return(h["failures"])
 
-#================================================
-#
-# Drainer Classes (Output Handlers)
-#
-#================================================
+	def skippedCount(self, host) -> int:
+		return(self.skipped.get(host, 0))
 
 
 
-class Drainer(threading.Thread):
-	"""provides output management"""
-	def __init__(self, queue, color=False, output_file="", simple_output=False):
-		threading.Thread.__init__(self)
-		self.setDaemon(True)
-		self.queue = queue
-		self.name = threading.current_thread().name
-		self.color = color
-		self.output_file = output_file
-		self.simple_output = simple_output
+class TimeoutEstimator:
+	"""per-host connect and read timeouts learned from observed latency (--adaptive_timeout), set the way TCP sets its retransmission timeout (RFC 6298): the smoothed latency plus four times its smoothed variation, kept between minimum and maximum
+	hosts without a sample yet get the fixed --timeout"""
+	def __init__(self, default=3.0, minimum=1.0, maximum=10.0):
+		self.default = default
+		self.minimum = minimum
+		self.maximum = maximum
+		self.estimates = {} # (host, "connect" or "read") --> (smoothed latency, smoothed variation)
+		self.backoff = {} # host --> multiplier, doubled by each timeout until the host answers again
+		self.lock = threading.Lock()
+
+	def observe(self, host, kind, sample):
+		"""folds one connect time, or time to response headers, into the host's estimate"""
+		with self.lock:
+			e = self.estimates.get((host, kind))
+			if e is None:
+				self.estimates[(host, kind)] = (sample, sample / 2)
+			else:
+				srtt, rttvar = e
+				rttvar = 0.75 * rttvar + 0.25 * abs(srtt - sample)
+				srtt = 0.875 * srtt + 0.125 * sample
+				self.estimates[(host, kind)] = (srtt, rttvar)
+			self.backoff.pop(host, None)
 
-	def printToTerminal(self, item):
-		"""handles sending full and condensed output to stdout/stderr"""
-		if "EXCEPTION" not in str(item) and "REASON" not in str(item) and "INFO" not in str(item):
-			if self.simple_output or self.color:
-				s = str(item).split()[0].split("status_code:")[1]
-				u = str(item).split("url:")[1]
-				# rejoin into a single string
-				item = s + " " + u
-			if self.color:
-				if str(item)[0].isdigit():
-					item = str(item).split()
-					if item[0][0] == "1":
-						item[0] = "\033[94m" + item[0] + "\033[0m" # blue + reset code
-					elif item[0][0] == "2":
-						item[0] = "\033[92m" + item[0] + "\033[0m" # green + reset code
-					elif item[0][0] == "3":
-						item[0] = "\033[93m" + item[0] + "\033[0m" # yellow + reset code
-					elif item[0][0] == "4":
-						item[0] = "\033[91m" + item[0] + "\033[0m" # red + reset code
-					elif item[0][0] == "5":
-						item[0] = "\033[95m" + item[0] + "\033[0m" # purple + reset code
-					# rejoin into a single string
-					item = " ".join(item)
-			print(item)
+	def expired(self, host):
+		"""a request to host timed out, so its timeouts are doubled (up to maximum) until it answers again, rather than a host that only slowed down timing out over and over into the circuit breaker"""
+		with self.lock:
+			self.backoff[host] = min(self.backoff.get(host, 1) * 2, 64)
+
+	def timeout(self, host, kind) -> float:
+		e = self.estimates.get((host, kind))
+		if e is None and kind == "connect":
+			# a handshake takes about one round trip, which is never longer than a whole response, so the read estimate stands in until a connect is timed
+			e = self.estimates.get((host, "read"))
+		if e is None:
+			rto = self.default
 		else:
-			sys.stderr.write(f"{item}\n")
+			rto = max(self.minimum, e[0] + 4 * e[1])
+		return(min(self.maximum, rto * self.backoff.get(host, 1)))
 
-	def run(self):
-		"""dispatches output handling"""
-		while True:
-			item = self.queue.get()
-#			print(f"\033[33m{self.name}\033[0m removed from queueout:\t{item}") # gold
-			if item is None:
-				break
-			self.printToTerminal(item)
-			self.queue.task_done()
+	def get(self, host) -> tuple:
+		"""the (connect, read) timeouts for the next request to host"""
+		return((self.timeout(host, "connect"), self.timeout(host, "read")))
+
+
+
+class RetryJob:
+	"""one failed URL+word request waiting in a RetryScheduler"""
+	__slots__ = ("url", "item", "ticket", "attempt")
+
+	def __init__(self, url, item, ticket, attempt):
+		self.url = url
+		self.item = item
+		self.ticket = ticket # the RetryScheduler.open() ticket of the queue item it belongs to
+		self.attempt = attempt # number of times it has been sent already
+
+
+
+class RetryScheduler:
+	"""failed requests waiting to be sent again (--retry_failed), in a heap ordered by when each falls due, shared by every Worker
+	a Worker never sleeps on a retry: between queue items it takes any retry that is due, and only waits on queuein until the next one is (see Worker.nextJob())
+	each queue item holds a ticket counting its requests still pending, and is only finished (marked done for --state, and task_done() for queuein.join()) once the last one is"""
+	cap = 30.0 # longest delay before a retry, in seconds
+
+	def __init__(self, attempts, backoff=1.0):
+		self.attempts = attempts # times a failed request is sent again
+		self.backoff = backoff # delay before the first retry, doubled for each later one
+		self.heap = [] # (due, sequence, RetryJob)
+		self.sequence = itertools.count() # breaks ties between jobs due at the same time, so RetryJobs are never compared
+		self.lock = threading.Lock()
+
+	def open(self, n) -> list:
+		"""a ticket for queue item n: [n, requests pending, every request was sent], the first pending request being the Worker's own pass over its URLs"""
+		return([n, 1, True])
+
+	def close(self, ticket) -> bool:
+		"""one of a ticket's requests is finished, returns True when it was the last one"""
+		with self.lock:
+			ticket[1] -= 1
+			return(ticket[1] == 0)
+
+	def delay(self, attempt) -> float:
+		"""exponential backoff with jitter: half the doubled delay is fixed and half random, so requests that failed together are not all sent again at once"""
+		d = min(self.cap, self.backoff * 2 ** attempt)
+		return(d / 2 + random.uniform(0, d / 2))
+
+	def schedule(self, url, item, ticket, attempt) -> bool:
+		"""queues a failed request to be sent again, returns False when it has no attempts left"""
+		if ticket is None or attempt >= self.attempts:
+			return(False)
+		job = RetryJob(url, item, ticket, attempt + 1)
+		with self.lock:
+			ticket[1] += 1
+			heapq.heappush(self.heap, (time.monotonic() + self.delay(attempt), next(self.sequence), job))
+		return(True)
+
+	def due(self, force=False) -> RetryJob:
+		"""removes and returns the earliest retry if it is due (or any retry with force), otherwise None"""
+		if not self.heap:
+			return(None)
+		with self.lock:
+			if self.heap and (force or self.heap[0][0] <= time.monotonic()):
+				return(heapq.heappop(self.heap)[2])
+		return(None)
+
+	def wait(self):
+		"""seconds until the earliest retry is due, or None when there are none"""
+		if not self.heap:
+			return(None)
+		try:
+			return(max(0.0, self.heap[0][0] - time.monotonic()))
+		except IndexError:
+			return(None)
+
+	def __len__(self) -> int:
+		return(len(self.heap))
 
 
 
 #================================================
 #
-# Primary Object
+# State Classes
 #
 #================================================
 
 
 
-class RequestInjector:
-	"""main handler to dispatch threaded objects"""
-	def __init__(self, url, wordlist, staticargs, injectkeys, longest, fillvalue, delay=0.0, mode="path", attacktype=None, threads=5, mutate=False, headers={}, proxy={}, retries=None, url_encode=False, simple_output=False, color=False):
-		self.wordlist = wordlist
-		self.mode = mode
-		self.attacktype = attacktype
-		self.staticargs = staticargs
-		self.injectkeys = injectkeys
-		self.longest = longest
-		self.fillvalue = fillvalue
-		self.delay = delay
-		self.threads = threads
-		self.mutate = mutate
-		# convert the url to a list of url(s)
-		# TODO - self.url depends on the mode, and ProcessUrl should be called in the handlers
-		self.url = ProcessUrl(url=url, mutate=self.mutate, mode=self.mode).output # list
-		self.headers = headers
-		self.proxy = proxy
-		self.retries = retries
-		self.url_encode = url_encode
-		self.simple_output = simple_output
-		self.color = color
+class Checkpoint:
+	"""tracks scan progress for --state/--resume, and periodically saves it to a JSON state file
+	every word/row number below self.next has been placed, and all of those not in self.inflight have been requested against every URL variant"""
+	def __init__(self, path, signature, interval=5.0):
+		self.path = path
+		self.signature = json.loads(json.dumps(signature)) # normalized the way it reads back from the file, so tuples compare equal to lists
+		self.interval = interval # seconds between saves
+		self.lock = threading.Lock()
+		self.next = 0
+		self.inflight = set()
+		self.replay = set() # numbers that were in flight when a resumed scan stopped, placed again before anything new
+		self.saved = time.monotonic()
 
-	def preflightChecks(self):
-		"""sanity checks for various mode requirements"""
-		# check that mode is approved
-		if not self.mode in ["path", "arg", "body"]:
-			print("Error: mode not one of: path, arg, body")
-			sys.exit(1)
-		# checks for path mode
-		if not self.wordlist and self.mode == "path":
-			print("Error: mode set to path, but no wordlist provided (-w/--wordlist WORDLIST)")
-			sys.exit(1)
-		# check that if --longest is used, --fillvalue VALUE is also specified
-		if self.longest and self.fillvalue == "":
+	def read(self) -> dict:
+		"""returns the saved state, or None if the file is missing or belongs to a different scan"""
+		try:
+			with open(self.path, "r") as f:
+				state = json.load(f)
+		except (OSError, ValueError):
+			return(None)
+		if state.get("signature") != self.signature:
+			return(None)
+		return(state)
+
+	def load(self):
+		"""picks up where the saved state left off"""
+		state = self.read()
+		if state:
+			self.next = state["next"]
+			self.replay = set(state["inflight"])
+			self.inflight = set(self.replay)
+
+	def start(self) -> int:
+		"""first word/row number a Filler needs to read"""
+		if self.replay:
+			return(min(self.replay))
+		return(self.next)
+
+	def wanted(self, n) -> bool:
+		return(n >= self.next or n in self.replay)
+
+	def placed(self, n):
+		"""called by the Filler before word/row number n is put into queuein"""
+		with self.lock:
+			self.inflight.add(n)
+			if n >= self.next:
+				self.next = n + 1
+
+	def done(self, n):
+		"""called by a Worker once word/row number n has been requested against every URL"""
+		with self.lock:
+			self.inflight.discard(n)
+			if time.monotonic() - self.saved >= self.interval:
+				self.write()
+
+	def save(self, finished=False):
+		with self.lock:
+			self.write(finished)
+
+	def write(self, finished=False):
+		"""writes the state to a temporary file and renames it over the old one, so a crash mid-write never leaves a broken state file (call with self.lock held)"""
+		state = {"signature": self.signature, "next": self.next, "inflight": sorted(self.inflight), "finished": finished, "updated": time.time()}
+		tmp = f"{self.path}.tmp"
+		with open(tmp, "w") as f:
+			json.dump(state, f)
+		os.replace(tmp, self.path)
+		self.saved = time.monotonic()
+
+
+
+class SeenSet:
+	"""every URL+word already requested, kept as 64-bit hashes rather than strings, and split into stripes with their own locks so Workers rarely wait on each other"""
+	stripes = 64
+
+	def __init__(self):
+		self.sets = [set() for i in range(self.stripes)]
+		self.locks = [threading.Lock() for i in range(self.stripes)]
+
+	def add(self, url) -> bool:
+		"""records url, returning False if it was already recorded"""
+		h = int.from_bytes(hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+		i = h % self.stripes
+		with self.locks[i]:
+			if h in self.sets[i]:
+				return(False)
+			self.sets[i].add(h)
+		return(True)
+
+	def __len__(self) -> int:
+		return(sum(len(x) for x in self.sets))
+
+
+
+class Recursion:
+	"""collects directories discovered during one pass over the wordlist, to be scanned with the same wordlist in the next pass, down to depth levels below the starting URLs"""
+	def __init__(self, depth, urls):
+		self.depth = depth
+		self.level = 0
+		self.lock = threading.Lock()
+		self.known = set(urls) # every base URL already scanned or waiting for the next pass
+		self.found = []
+
+	def discover(self, url) -> bool:
+		"""called by Workers for each directory-like response, returns True if url is new"""
+		if self.level >= self.depth or url in self.known:
+			return(False)
+		with self.lock:
+			if url in self.known:
+				return(False)
+			self.known.add(url)
+			self.found.append(url)
+		sys.stderr.write(f"INFO Recursion: found directory {url} (depth {self.level+1})\n")
+		return(True)
+
+	def nextLevel(self) -> list:
+		"""returns the directories found in the pass that just finished, and starts counting the next one"""
+		with self.lock:
+			urls = self.found
+			self.found = []
+			self.level += 1
+		return(urls)
+
+
+
+class DnsCache:
+	"""caches getaddrinfo() answers for ttl seconds, so each host is resolved once instead of once per connection
+	nothing global is replaced: each engine asks it directly, through DnsCacheAdapter (requests), DnsCacheResolver (aiohttp) and PipelineConnection"""
+	def __init__(self, ttl=300.0):
+		self.ttl = ttl
+		self.entries = {} # (host, port, family, type, proto, flags) -> (expiry time, answer)
+		self.lock = threading.Lock()
+
+	def cached(self, host, port, family=0, type=0, proto=0, flags=0):
+		"""the unexpired answer for these arguments, or None"""
+		entry = self.entries.get((host, port, family, type, proto, flags))
+		if entry is not None and entry[0] > time.monotonic():
+			return(list(entry[1]))
+		return(None)
+
+	def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+		answer = self.cached(host, port, family, type, proto, flags)
+		if answer is not None:
+			return(answer)
+		# failures are not cached, so a host that comes back is seen straight away
+		answer = socket.getaddrinfo(host, port, family, type, proto, flags)
+		with self.lock:
+			self.entries[(host, port, family, type, proto, flags)] = (time.monotonic() + self.ttl, answer)
+		return(list(answer))
+
+	def createConnection(self, address, timeout=None, source_address=None, socket_options=None):
+		"""socket.create_connection() (as urllib3 does it) with the lookup answered from the cache"""
+		host, port = address
+		if host.startswith("["):
+			host = host.strip("[]")
+		err = None
+		for family, socktype, proto, canonname, sa in self.getaddrinfo(host, port, urllib3.util.connection.allowed_gai_family(), socket.SOCK_STREAM):
+			sock = None
+			try:
+				sock = socket.socket(family, socktype, proto)
+				for opt in socket_options or []:
+					sock.setsockopt(*opt)
+				if timeout is not None:
+					sock.settimeout(timeout)
+				if source_address:
+					sock.bind(source_address)
+				sock.connect(sa)
+				return(sock)
+			except OSError as e:
+				err = e
+				if sock is not None:
+					sock.close()
+		if err is not None:
+			raise err
+		raise OSError("getaddrinfo returns an empty list")
+
+	def resolve(self, urls):
+		"""looks up every URL's host ahead of the scan, the way createConnection() and DnsCacheResolver will ask for it"""
+		for host, port in set([(urlparse(u).hostname, urlparse(u).port or (443 if urlparse(u).scheme == "https" else 80)) for u in urls]):
+			for family, flags in [(urllib3.util.connection.allowed_gai_family(), 0), (socket.AF_UNSPEC, socket.AI_ADDRCONFIG)]:
+				try:
+					self.getaddrinfo(host, port, family, socket.SOCK_STREAM, 0, flags)
+				except (OSError, UnicodeError):
+					pass # reported by the request that needs it
+
+
+
+class DnsCacheConnection(urllib3.connection.HTTPConnection):
+	"""urllib3 connection that resolves its host through a DnsCache, see DnsCacheAdapter"""
+	dns = None # set on the subclass DnsCacheAdapter makes for its DnsCache
+
+	def _new_conn(self):
+		try:
+			return(self.dns.createConnection((self._dns_host, self.port), self.timeout, source_address=self.source_address, socket_options=self.socket_options))
+		except socket.timeout as e:
+			raise urllib3.exceptions.ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+		except OSError as e:
+			raise urllib3.exceptions.NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+
+class DnsCacheHTTPSConnection(DnsCacheConnection, urllib3.connection.HTTPSConnection):
+	"""https version of DnsCacheConnection"""
+
+
+
+class DnsCacheAdapter(requests.adapters.HTTPAdapter):
+	"""requests adapter whose connection pools open their connections through a DnsCache (requests through a proxy resolve the proxy as usual)"""
+	def __init__(self, dns, **kwargs):
+		self.dns = dns
+		super().__init__(**kwargs)
+
+	def init_poolmanager(self, *args, **kwargs):
+		super().init_poolmanager(*args, **kwargs)
+		http = type("DnsCacheConnection", (DnsCacheConnection,), {"dns": self.dns})
+		https = type("DnsCacheHTTPSConnection", (DnsCacheHTTPSConnection,), {"dns": self.dns})
+		self.poolmanager.pool_classes_by_scheme = {
+			"http": type("HTTPConnectionPool", (urllib3.HTTPConnectionPool,), {"ConnectionCls": http}),
+			"https": type("HTTPSConnectionPool", (urllib3.HTTPSConnectionPool,), {"ConnectionCls": https}),
+		}
+
+
+
+if aiohttp is not None:
+	class DnsCacheResolver(aiohttp.abc.AbstractResolver):
+		"""aiohttp resolver answering from a DnsCache, looking up hosts it does not have in the loop's executor like aiohttp's ThreadedResolver"""
+		def __init__(self, dns):
+			self.dns = dns
+
+		async def resolve(self, host, port=0, family=socket.AF_UNSPEC) -> list:
+			answer = self.dns.cached(host, port, family, socket.SOCK_STREAM, 0, socket.AI_ADDRCONFIG)
+			if answer is None:
+				answer = await asyncio.get_running_loop().run_in_executor(None, self.dns.getaddrinfo, host, port, family, socket.SOCK_STREAM, 0, socket.AI_ADDRCONFIG)
+			hosts = []
+			for family, socktype, proto, canonname, address in answer:
+				if family == socket.AF_INET6 and len(address) < 3:
+					continue # IPv6 is not supported by this Python build
+				hosts.append(dict(hostname=host, host=address[0], port=address[1], family=family, proto=proto, flags=socket.AI_NUMERICHOST | socket.AI_NUMERICSERV))
+			return(hosts)
+
+		async def close(self):
+			pass
+
+
+
+class ResultStore:
+	"""SQLite database of scan results (--store): a row per scan, and a row per result with its target (scheme://host), URL, word and outcome
+	earlier scans give the word order of --prioritize (see priority()), and any two scans can be compared with --diff (see diff())"""
+	misses = (404,) # status codes that do not count as a hit, along with failed and skipped requests
+	schema = (
+		"CREATE TABLE IF NOT EXISTS scans (id INTEGER PRIMARY KEY, started REAL, finished REAL, mode TEXT, urls TEXT, wordlist TEXT)",
+		"CREATE TABLE IF NOT EXISTS results (scan INTEGER, target TEXT, url TEXT, word TEXT, status INTEGER, bytes INTEGER, sizetype TEXT, reason TEXT)",
+		"CREATE INDEX IF NOT EXISTS results_word ON results (word)",
+		"CREATE INDEX IF NOT EXISTS results_url ON results (scan, url)",
+		"CREATE INDEX IF NOT EXISTS results_target ON results (target, scan, word)",
+	)
+	batch_size = 1000 # results written per transaction
+	priority_limit = 100000 # most words priority() returns, so the list (held in memory by the Filler) stays bounded however large the store grows
+
+	def __init__(self, path):
+		self.path = path
+		# only the Drainer (or the iterResults() consumer) writes, under self.lock
+		self.db = sqlite3.connect(path, check_same_thread=False)
+		self.lock = threading.Lock()
+		with self.db:
+			for statement in self.schema:
+				self.db.execute(statement)
+		self.scan = None
+		self.pending = []
+
+	def begin(self, mode, urls, wordlist) -> int:
+		"""records the start of a scan, whose results add() stores"""
+		with self.lock, self.db:
+			self.scan = self.db.execute("INSERT INTO scans (started, mode, urls, wordlist) VALUES (?, ?, ?, ?)", (time.time(), mode, json.dumps(urls), json.dumps(wordlist))).lastrowid
+		return(self.scan)
+
+	def add(self, results):
+		"""stores results of the current scan, written one transaction per batch_size"""
+		rows = []
+		for r in results:
+			u = urlparse(r.url or "")
+			rows.append((self.scan, f"{u.scheme}://{u.netloc}", r.url, r.word, r.status_code, r.bytes, r.sizetype, r.reason))
+		with self.lock:
+			self.pending.extend(rows)
+			if len(self.pending) >= self.batch_size:
+				self.flush()
+
+	def flush(self):
+		with self.db:
+			self.db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+		self.pending = []
+
+	def close(self, finished=True):
+		"""writes the remaining results, and the end time of a scan that finished (a cancelled or interrupted scan keeps none)"""
+		with self.lock:
+			self.flush()
+			if self.scan is not None and finished:
+				with self.db:
+					self.db.execute("UPDATE scans SET finished = ? WHERE id = ?", (time.time(), self.scan))
+			self.db.close()
+
+	def priority(self, urls) -> list:
+		"""the words that hit in earlier scans of the same targets (scheme://host of urls), best first: by hit rate (scans where the word hit on any URL of those targets, over scans that requested it there), then by number of hits
+		at most priority_limit words are returned"""
+		targets = sorted(set([f"{urlparse(u).scheme}://{urlparse(u).netloc}" for u in urls]))
+		misses = ", ".join(str(sc) for sc in self.misses)
+		rows = self.db.execute(f"""SELECT word, SUM(hit) AS hits, COUNT(*) AS scans FROM
+			(SELECT scan, word, MAX(status IS NOT NULL AND status NOT IN ({misses})) AS hit FROM results WHERE target IN ({", ".join("?" * len(targets))}) GROUP BY scan, word)
+			GROUP BY word HAVING hits > 0 ORDER BY CAST(hits AS REAL) / scans DESC, hits DESC, word LIMIT ?""", targets + [self.priority_limit])
+		return([row[0] for row in rows])
+
+	def latest(self) -> tuple:
+		"""the IDs of the last finished scan and of the finished scan before it with the same URLs (None when there is none)"""
+		last = self.db.execute("SELECT id, urls FROM scans WHERE finished IS NOT NULL ORDER BY id DESC LIMIT 1").fetchone()
+		if last is None:
+			return((None, None))
+		before = self.db.execute("SELECT id FROM scans WHERE finished IS NOT NULL AND urls = ? AND id < ? ORDER BY id DESC LIMIT 1", (last[1], last[0])).fetchone()
+		return((before[0] if before else None, last[0]))
+
+	def exists(self, scan) -> bool:
+		return(self.db.execute("SELECT 1 FROM scans WHERE id = ?", (scan,)).fetchone() is not None)
+
+	def diff(self, old, new):
+		"""yields (change, url, old status, old bytes, new status, new bytes) for each URL whose status differs between two scans; change is added, removed or changed
+		bytes are reported but not compared, dynamic pages change length between any two scans"""
+		yield from self.db.execute("""SELECT CASE WHEN b.url IS NULL THEN 'removed' ELSE 'changed' END, a.url, a.status, a.bytes, b.status, b.bytes FROM results a LEFT JOIN results b ON b.scan = ? AND b.url = a.url
+			WHERE a.scan = ? AND (b.url IS NULL OR a.status IS NOT b.status)
+			UNION ALL
+			SELECT 'added', b.url, NULL, NULL, b.status, b.bytes FROM results b
+			WHERE b.scan = ? AND NOT EXISTS (SELECT 1 FROM results a WHERE a.scan = ? AND a.url = b.url)""", (new, old, new, old))
+
+
+
+#================================================
+#
+# Metrics Classes
+#
+#================================================
+
+
+
+class Stats:
+	"""counters for one thread (a Worker, the Filler, or the Drainer); only that thread writes to it, so the request path takes no lock, and Metrics sums every Stats when reporting
+	(the Coordinator's handler threads share one, and only write to it while holding the Coordinator's lock)"""
+	latency_bounds = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # histogram bucket upper bounds in seconds, the last bucket counts everything slower
+	__slots__ = ("requests", "errors", "retried", "skipped", "filtered", "matched", "duplicates", "items", "placed", "resumed", "written", "latency_sum", "latency_buckets", "statuses", "host_requests", "host_errors")
+
+	def __init__(self):
+		self.requests = 0 # responses received
+		self.errors = 0 # requests that raised an exception
+		self.retried = 0 # failed requests queued to be sent again, see RetryScheduler
+		self.skipped = 0 # requests not sent because the host's circuit was open
+		self.filtered = 0 # responses dropped as soft-404s
+		self.matched = 0 # responses matching at least one --match_file pattern
+		self.duplicates = 0 # URL+word pairs not requested because they already were, see SeenSet
+		self.items = 0 # queue items requested against every URL
+		self.placed = 0 # queue items placed by the Filler
+		self.resumed = 0 # queue items skipped by the Filler because a resumed scan already completed them
+		self.written = 0 # results written by the Drainer
+		self.latency_sum = 0.0
+		self.latency_buckets = [0] * (len(self.latency_bounds) + 1)
+		self.statuses = {}
+		self.host_requests = {}
+		self.host_errors = {}
+
+	def response(self, host, status, elapsed):
+		self.requests += 1
+		self.latency_sum += elapsed
+		self.latency_buckets[bisect.bisect_left(self.latency_bounds, elapsed)] += 1
+		self.statuses[status] = self.statuses.get(status, 0) + 1
+		self.host_requests[host] = self.host_requests.get(host, 0) + 1
+
+	def failure(self, host):
+		self.errors += 1
+		self.host_requests[host] = self.host_requests.get(host, 0) + 1
+		self.host_errors[host] = self.host_errors.get(host, 0) + 1
+
+
+
+class Metrics:
+	"""the Stats of every thread in this process, plus the queues being watched, summed into plain dictionaries by snapshot()"""
+	counters = ("requests", "errors", "retried", "skipped", "filtered", "matched", "duplicates", "items", "placed", "resumed", "written", "latency_sum")
+	tables = ("statuses", "host_requests", "host_errors")
+
+	def __init__(self):
+		self.lock = threading.Lock() # only taken when a thread registers, never per request
+		self.stats = []
+		self.queues = {}
+
+	def register(self, stats=None) -> Stats:
+		if stats is None:
+			stats = Stats()
+		with self.lock:
+			self.stats.append(stats)
+		return(stats)
+
+	def watch(self, name, q):
+		self.queues[name] = q
+
+	def snapshot(self) -> dict:
+		"""sums the counters without stopping the threads that update them (each value may be a moment old, which is fine for reporting)"""
+		snap = {c: 0 for c in self.counters}
+		snap["latency_buckets"] = [0] * (len(Stats.latency_bounds) + 1)
+		for t in self.tables:
+			snap[t] = {}
+		with self.lock:
+			stats = list(self.stats)
+		for st in stats:
+			for c in self.counters:
+				snap[c] += getattr(st, c)
+			for i, v in enumerate(st.latency_buckets):
+				snap["latency_buckets"][i] += v
+			for t in self.tables:
+				# dict() copies in one step, so a Worker adding a new key cannot break the iteration
+				for k, v in dict(getattr(st, t)).items():
+					snap[t][k] = snap[t].get(k, 0) + v
+		snap["queues"] = {}
+		for name, q in self.queues.items():
+			try:
+				snap["queues"][name] = q.qsize()
+			except NotImplementedError:
+				pass # multiprocessing queues on macOS
+		return(snap)
+
+	@staticmethod
+	def merge(snaps) -> dict:
+		"""adds up snapshots from several processes"""
+		total = None
+		for snap in snaps:
+			if total is None:
+				total = json.loads(json.dumps(snap)) # deep copy
+				continue
+			for c in Metrics.counters:
+				total[c] += snap[c]
+			total["latency_buckets"] = [a + b for a, b in zip(total["latency_buckets"], snap["latency_buckets"])]
+			for t in Metrics.tables + ("queues",):
+				for k, v in snap[t].items():
+					total[t][k] = total[t].get(k, 0) + v
+		return(total)
+
+
+
+class Reporter(threading.Thread):
+	"""periodically reports a Metrics snapshot: a one-line progress/ETA summary on stderr, a Prometheus text-format file, and/or a local HTTP endpoint
+	inside a --processes child it only pushes its snapshot into the shared dictionary, and the parent's Reporter adds every child's snapshot to its own"""
+	def __init__(self, metrics, interval=5.0, progress=False, metrics_file="", metrics_port=0, total=None, shared=None, shard=None):
+		threading.Thread.__init__(self)
+		self.setDaemon(True)
+		self.name = "Reporter"
+		self.metrics = metrics
+		self.interval = interval
+		self.progress = progress
+		self.metrics_file = metrics_file
+		self.metrics_port = metrics_port
+		self.total = total # function returning the number of wordlist rows, counted in this thread so the scan does not wait for it
+		self.rows = None
+		self.shared = shared # Manager dictionary of {shard index: snapshot}
+		self.shard = shard
+		self.started = time.monotonic()
+		self.last = (self.started, 0) # time and request count of the previous report, for the current rate
+		self.stopped = threading.Event()
+		self.server = None
+
+	def gather(self) -> dict:
+		snap = self.metrics.snapshot()
+		if self.shared is not None and self.shard is None:
+			snap = Metrics.merge([snap] + list(self.shared.values()))
+		return(snap)
+
+	def duration(self, seconds) -> str:
+		seconds = int(seconds)
+		return(f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}")
+
+	def percentile(self, snap, p) -> str:
+		"""upper bound of the histogram bucket holding the p-th percentile latency"""
+		count = sum(snap["latency_buckets"])
+		if not count:
+			return("-")
+		seen = 0
+		for bound, n in zip(Stats.latency_bounds + (None,), snap["latency_buckets"]):
+			seen += n
+			if seen >= count * p / 100:
+				if bound is None:
+					return(f">{Stats.latency_bounds[-1]}s")
+				return(f"<{bound}s")
+
+	def line(self, snap, now, final=False) -> str:
+		"""one-line progress summary"""
+		elapsed = now - self.started
+		# the rate since the previous report, or over the whole scan for the final one
+		if final:
+			rate = (snap["requests"] + snap["errors"]) / max(elapsed, 1e-9)
+		else:
+			rate = (snap["requests"] + snap["errors"] - self.last[1]) / max(now - self.last[0], 1e-9)
+		self.last = (now, snap["requests"] + snap["errors"])
+		progress = f"words:{snap['items']}"
+		eta = "-"
+		if self.rows:
+			expected = max(self.rows - snap["resumed"], 1)
+			progress = f"words:{snap['items']}/{expected} ({100 * snap['items'] / expected:.1f}%)"
+			if snap["items"] and not final:
+				eta = self.duration((expected - snap["items"]) * elapsed / snap["items"])
+		queues = " ".join(f"{k}:{v}" for k, v in sorted(snap["queues"].items()))
+		# the host with the highest error rate, if any host has errors
+		worst = ""
+		if snap["host_errors"]:
+			host = max(snap["host_errors"], key=lambda h: snap["host_errors"][h] / snap["host_requests"].get(h, 1))
+			worst = f" worst_host:{host} ({snap['host_errors'][host]}/{snap['host_requests'].get(host, 0)} failed)"
+		state = "done" if final else "running"
+		return(f"INFO Progress ({state}): {progress} requests:{snap['requests']} errors:{snap['errors']} retried:{snap['retried']} skipped:{snap['skipped']} filtered:{snap['filtered']} rate:{rate:.1f}/s p50:{self.percentile(snap, 50)} p95:{self.percentile(snap, 95)} {queues} elapsed:{self.duration(elapsed)} eta:{eta}{worst}")
+
+	def prometheus(self, snap) -> str:
+		"""Prometheus text exposition format"""
+		def label(v):
+			return(str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+		l = []
+		def metric(name, kind, help, samples):
+			l.append(f"# HELP requestinjector_{name} {help}")
+			l.append(f"# TYPE requestinjector_{name} {kind}")
+			for labels, value in samples:
+				l.append(f"requestinjector_{name}{labels} {value}")
+		metric("responses_total", "counter", "responses received, by status code", [(f'{{status="{k}"}}', v) for k, v in sorted(snap["statuses"].items())])
+		metric("errors_total", "counter", "requests that failed with an exception", [("", snap["errors"])])
+		metric("retried_total", "counter", "failed requests queued to be sent again (--retry_failed)", [("", snap["retried"])])
+		metric("skipped_total", "counter", "requests not sent because the host's circuit breaker was open", [("", snap["skipped"])])
+		metric("filtered_total", "counter", "responses dropped as soft-404s", [("", snap["filtered"])])
+		metric("matched_total", "counter", "responses matching at least one --match_file pattern", [("", snap["matched"])])
+		metric("duplicates_total", "counter", "URL+word pairs not requested again", [("", snap["duplicates"])])
+		metric("host_requests_total", "counter", "requests sent, by host", [(f'{{host="{label(k)}"}}', v) for k, v in sorted(snap["host_requests"].items())])
+		metric("host_errors_total", "counter", "requests that failed with an exception, by host", [(f'{{host="{label(k)}"}}', v) for k, v in sorted(snap["host_errors"].items())])
+		metric("words_done_total", "counter", "wordlist items requested against every URL", [("", snap["items"])])
+		metric("words_placed_total", "counter", "wordlist items read and queued", [("", snap["placed"])])
+		if self.rows:
+			metric("words", "gauge", "wordlist items this scan will request", [("", max(self.rows - snap["resumed"], 0))])
+		metric("results_written_total", "counter", "results written by the output thread", [("", snap["written"])])
+		metric("queue_depth", "gauge", "items waiting in each queue", [(f'{{queue="{k}"}}', v) for k, v in sorted(snap["queues"].items())])
+		buckets = []
+		seen = 0
+		for bound, n in zip(Stats.latency_bounds + ("+Inf",), snap["latency_buckets"]):
+			seen += n
+			buckets.append((f'_bucket{{le="{bound}"}}', seen))
+		metric("latency_seconds", "histogram", "seconds from sending a request to receiving the response headers", buckets + [("_sum", round(snap["latency_sum"], 6)), ("_count", seen)])
+		l.append("")
+		return("\n".join(l))
+
+	def report(self, final=False):
+		"""pushes (in a --processes child) or writes out (everywhere else) the current snapshot"""
+		snap = self.gather()
+		if self.shard is not None:
+			self.shared[self.shard[0]] = snap
+			return
+		if self.progress:
+			sys.stderr.write(self.line(snap, time.monotonic(), final) + "\n")
+		if self.metrics_file:
+			tmp = f"{self.metrics_file}.tmp"
+			with open(tmp, "w") as f:
+				f.write(self.prometheus(snap))
+			os.replace(tmp, self.metrics_file)
+
+	def serve(self):
+		"""serves the current metrics on http://127.0.0.1:metrics_port/metrics"""
+		reporter = self
+		class MetricsHandler(http.server.BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = reporter.prometheus(reporter.gather()).encode()
+				self.send_response(200)
+				self.send_header("Content-Type", "text/plain; version=0.0.4")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+			def log_message(self, *args):
+				pass
+		self.server = http.server.ThreadingHTTPServer(("127.0.0.1", self.metrics_port), MetricsHandler)
+		self.server.daemon_threads = True
+		t = threading.Thread(target=self.server.serve_forever, daemon=True)
+		t.name = "MetricsServer"
+		t.start()
+
+	def run(self):
+		if self.metrics_port and self.shard is None:
+			self.serve()
+		if self.total and self.shard is None:
+			self.rows = self.total()
+		while not self.stopped.wait(self.interval):
+			self.report()
+
+	def finish(self):
+		"""stops the periodic reports and makes a last one"""
+		self.stopped.set()
+		self.report(final=True)
+
+
+
+#================================================
+#
+# Result Classes
+#
+#================================================
+
+
+
+class Result:
+	"""one URL+word outcome, passed from Workers to the Drainer as a compact record instead of a pre-formatted string"""
+	__slots__ = ("status_code", "bytes", "sizetype", "word", "ip", "port", "url", "elapsed", "worker", "reason", "extra", "matches")
+	fields = __slots__
+	types = {"status_code": int, "bytes": int, "sizetype": str, "word": str, "ip": str, "port": int, "url": str, "elapsed": (int, float), "worker": str, "reason": str, "extra": str, "matches": list} # JSON type of each field when it is not null, see fromDict()
+
+	def __init__(self, status_code=None, bytes=None, sizetype=None, word=None, ip=None, port=None, url=None, elapsed=None, worker=None, reason=None, extra=None, matches=None):
+		self.status_code = status_code
+		self.bytes = bytes
+		self.sizetype = sizetype
+		self.word = word
+		self.ip = ip
+		self.port = port
+		self.url = url
+		self.elapsed = elapsed # seconds from sending the request to receiving the response headers
+		self.worker = worker
+		self.reason = reason # set when the request failed or was skipped
+		self.extra = extra
+		self.matches = matches # IDs of the --match_file patterns found in the body
+
+	def isError(self) -> bool:
+		return(self.reason is not None)
+
+	def asDict(self) -> dict:
+		return({f: getattr(self, f) for f in self.fields})
+
+	@classmethod
+	def fromDict(cls, fields) -> "Result":
+		"""rebuilds a Result sent over the network as asDict(), raising ValueError unless it has exactly these fields, each null or of its type in types"""
+		if not isinstance(fields, dict) or set(fields) != set(cls.fields):
+			raise ValueError("malformed result")
+		for name, value in fields.items():
+			if value is not None and (isinstance(value, bool) or not isinstance(value, cls.types[name])):
+				raise ValueError(f"malformed result field {name}")
+		if fields["matches"] is not None and not all(isinstance(m, str) for m in fields["matches"]):
+			raise ValueError("malformed result field matches")
+		return(cls(**fields))
+
+	def asRow(self) -> list:
+		row = [getattr(self, f) for f in self.fields]
+		if self.matches:
+			row[self.fields.index("matches")] = ",".join(self.matches)
+		return(row)
+
+	def __str__(self) -> str:
+		"""the classic full output line"""
+		if self.reason is not None:
+			return(f"EXCEPTION {self.worker}: {self.url} REASON: {self.reason} EXTRA: {self.extra}")
+		if self.matches:
+			return(f"status_code:{self.status_code} bytes:{self.bytes} word:{self.word} ip:{self.ip} port:{self.port} url:{self.url} sizetype:{self.sizetype} matches:{','.join(self.matches)}")
+		return(f"status_code:{self.status_code} bytes:{self.bytes} word:{self.word} ip:{self.ip} port:{self.port} url:{self.url} sizetype:{self.sizetype}")
+
+
+
+class ResultStream:
+	"""the consumer end of a scan started by RequestInjector.iterResults() or aiterResults(), taking the Drainer's place
+	the scan runs in a background thread and puts each Result into a queue of at most buffer results, so the Workers pause while the consumer falls behind"""
+	def __init__(self, injector, buffer=1000):
+		self.injector = injector
+		# --processes children put their results across process boundaries (cancellation is passed on to them by runSharded())
+		if injector.processes > 1:
+			self.queue = multiprocessing.JoinableQueue(maxsize=buffer)
+		else:
+			self.queue = queue.Queue(maxsize=buffer)
+		injector.cancel = threading.Event()
+		injector.results = self.queue
+		# results are recorded as the consumer takes them, in place of the Drainer
+		self.store = None
+		if injector.store_file:
+			self.store = injector.openStore()
+		self.stats = Stats()
+		injector.metrics.register(self.stats)
+		self.finished = False
+		self.error = None # the exception that ended the scan, raised by get() after the last result
+		self.runner = threading.Thread(target=self.run, daemon=True)
+		self.runner.name = "ResultStream"
+		self.runner.start()
+
+	def run(self):
+		try:
+			self.injector.run()
+		except BaseException as e:
+			# including SystemExit from a configuration error, which would otherwise only end this thread
+			self.error = e
+		finally:
+			# None marks the end of the results, even if the scan failed
+			self.queue.put(None)
+
+	def get(self, timeout=None):
+		"""returns the next Result, or None once the scan has finished; raises queue.Empty if none arrives within timeout seconds
+		if the scan failed, the exception that ended it is raised in place of the final None"""
+		r = self.take(timeout)
+		if r is None and self.error is not None:
+			error, self.error = self.error, None
+			raise error
+		return(r)
+
+	def take(self, timeout=None):
+		"""get() without raising the scan's exception"""
+		if self.finished:
+			return(None)
+		r = self.queue.get(timeout=timeout)
+		if r is None:
+			self.finished = True
+			if self.store is not None:
+				self.injector.closeStore(self.store, self.error is None and not self.injector.cancel.is_set())
+			return(None)
+		if self.store is not None:
+			self.store.add([r])
+		self.queue.task_done()
+		self.stats.written += 1
+		return(r)
+
+	def close(self):
+		"""cancels the scan if it is still running, discarding results until it has stopped"""
+		self.injector.cancel.set()
+		while not self.finished:
+			try:
+				self.take(timeout=0.1)
+			except queue.Empty:
+				pass
+		self.runner.join()
+
+
+
+#================================================
+#
+# Worker Classes
+#
+#================================================
+
+
+
+class Worker(threading.Thread):
+	"""parent class that retrieves an item from the input queue, makes a web request, and places the results into an output queue"""
+	def __init__(self, *args, **kwargs):
+		threading.Thread.__init__(self)
+		self.setDaemon(True)
+		self.name = threading.current_thread().name
+		self.queuein = kwargs.get("queuein")
+		self.queueout = kwargs.get("queueout")
+		self.urls = kwargs.get("urls")
+		self.proxy = kwargs.get("proxy")
+		self.headers = kwargs.get("headers")
+		if not self.headers:
+			self.headers = {}
+		self.header_default_useragent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:86.0) Gecko/20100101 Firefox/86.0"
+		self.header_default_accept = "text/html, application/xhtml+xml, application/xml;q=0.9, */*;q=0.8"
+		self.url_encode = kwargs.get("url_encode")
+		self.retries = kwargs.get("retries")
+		self.delay = kwargs.get("delay")
+		if len(self.headers) == 0:
+			self.headers = {'User-Agent':self.header_default_useragent, 'Accept':self.header_default_accept}
+		else:
+			if "User-Agent" not in self.headers:
+				self.headers["User-Agent"] = self.header_default_useragent
+			if "Accept" not in self.headers:
+				self.headers["Accept"] = self.header_default_accept
+		if not self.retries:
+			self.retries = 1
+		self.pool_connections = kwargs.get("pool_connections")
+		self.pool_maxsize = kwargs.get("pool_maxsize")
+		if not self.pool_connections:
+			self.pool_connections = requests.adapters.DEFAULT_POOLSIZE
+		if not self.pool_maxsize:
+			self.pool_maxsize = requests.adapters.DEFAULT_POOLSIZE
+		# --dns_ttl DnsCache the session's connections resolve hosts through, see DnsCacheAdapter
+		self.dns = kwargs.get("dns")
+		self.session = self.makeSession()
+		# tracks domains that raise exceptions, shared by every Worker so a dead host is given up on once instead of once per thread
+		self.breaker = kwargs.get("breaker")
+		if self.breaker is None:
+			self.breaker = CircuitBreaker(threshold=self.retries)
+		# body handling policy, see measureBody()
+		self.trust_length = kwargs.get("trust_length") # report the Content-Length header instead of downloading the body
+		self.max_body = kwargs.get("max_body") # stop counting body bytes after this many (0/None reads the whole body)
+		self.head_first = kwargs.get("head_first") # try a HEAD request first, and only send the GET if it does not give a usable Content-Length
+		self.drain_limit = 65536 # bodies up to this size are read anyway when trusting Content-Length, keeping the keep-alive connection reusable
+		# soft-404 filtering, see Calibrator; fingerprints is a dictionary of {prepared URL: set of fingerprints}, or None when --calibrate is not used
+		self.fingerprints = kwargs.get("fingerprints")
+		self.fingerprint_bytes = kwargs.get("fingerprint_bytes")
+		if not self.fingerprint_bytes:
+			self.fingerprint_bytes = 512
+		# shared flow control, see throttle()
+		self.ratelimiter = kwargs.get("ratelimiter")
+		self.controller = kwargs.get("controller")
+		# progress tracking for --state, see Checkpoint
+		self.checkpoint = kwargs.get("checkpoint")
+		# counters only this Worker writes to, see Metrics
+		self.stats = Stats()
+		if kwargs.get("metrics"):
+			kwargs.get("metrics").register(self.stats)
+		self.setUrls(self.urls or [])
+		# --dedup/--recurse, see SeenSet and Recursion
+		self.seen = kwargs.get("seen")
+		self.recursion = kwargs.get("recursion")
+		# connections opened before the first item, see warm()
+		self.warmup = kwargs.get("warmup")
+		self.warmed = threading.Event()
+		# set when a ResultStream consumer stops early, see cancelled()
+		self.cancel = kwargs.get("cancel")
+		# --match_file PatternSet the body is scanned with, see PatternScanner
+		self.patterns = kwargs.get("patterns")
+		self.match_first = kwargs.get("match_first")
+		# request timeouts, fixed at --timeout or learned per host by a shared TimeoutEstimator (--adaptive_timeout), see timeoutFor()
+		self.timeout = kwargs.get("timeout")
+		if not self.timeout:
+			self.timeout = 3
+		self.timeouts = kwargs.get("timeouts")
+		# failed requests sent again later, see nextJob()
+		self.retry = kwargs.get("retry")
+
+	def makeSession(self):
+		"""builds a keep-alive session for this thread, so each URL+word reuses a pooled TCP/TLS connection instead of opening a new one"""
+		s = requests.Session()
+		# pool_connections is the number of per-host pools to keep, pool_maxsize is the number of connections kept open to each host
+		if self.dns is not None:
+			adapter = DnsCacheAdapter(self.dns, pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+		else:
+			adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+		s.mount("http://", adapter)
+		s.mount("https://", adapter)
+		# do not let cookies set by the target leak into later requests, each URL+word should be sent the same way as a fresh requests.get()
+		s.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+		return(s)
+
+	def cancelled(self) -> bool:
+		"""checks if the scan was cancelled, in which case items are taken from queuein without being requested
+		their word/row numbers are not marked done, so the --state checkpoint keeps them in flight for --resume"""
+		return(self.cancel is not None and self.cancel.is_set())
+
+	def warmHosts(self) -> list:
+		"""one URL per host this Worker will request, at most pool_connections of them since the session keeps no more per-host pools than that"""
+		hosts = {}
+		for url in self.prepared:
+			u = urlparse(url)
+			hosts.setdefault((u.scheme, u.netloc), url)
+		return(list(hosts.values())[:self.pool_connections])
+
+	def warm(self):
+		"""opens this Worker's pooled connection to each host (TCP connect and TLS handshake) with a HEAD / request before the Filler starts, so the first wave of -t Workers does not connect all at once mid-scan
+		failures are ignored here, the scan's own requests report them to the circuit breaker"""
+		for url in self.warmHosts():
+			u = urlparse(url)
+			try:
+				self.pace(u.netloc)
+				r = self.session.head(f"{u.scheme}://{u.netloc}/", headers=self.headers, allow_redirects=False, verify=False, proxies=self.proxy, timeout=self.timeoutFor(url))
+				r.close()
+			except Exception:
+				pass
+
+	def timeoutFor(self, url):
+		"""the timeout for a request to url, as (connect, read) when learned per host"""
+		if self.timeouts is None:
+			return(self.timeout)
+		return(self.timeouts.get(urlparse(url).netloc))
+
+	def warmUp(self):
+		"""runs warm() if asked to, then tells RequestInjector this Worker is ready"""
+		if self.warmup:
+			self.warm()
+		self.warmed.set()
+
+	def badDomainChecker(self, domain) -> int:
+		"""tracks domains that raise exceptions, and returns the domain's failure count"""
+		#sys.stderr.write(f"\033[91mINFO {self.name}: BAD DOMAIN COUNT FOR: {domain}\033[0m\n") # red
+		return(self.breaker.failure(domain))
+
+	def headerLength(self, r):
+		"""returns the Content-Length header as an int, or None if it is missing, malformed, or describes an encoded (ex. gzip) body that would not match the decoded size"""
+		cl = r.headers.get("Content-Length")
+		if not cl or not cl.isdigit():
+			return(None)
+		if r.headers.get("Content-Encoding", "identity").lower() != "identity":
+			return(None)
+		return(int(cl))
+
+	def peerInfo(self, r):
+		"""socket info is only accessible if stream=True and before .content attribute is called (note this will be the proxy IP/port if one is used)"""
+		try:
+			return(r.raw._fp.fp.raw._sock.getpeername())
+		except AttributeError:
+			# bodiless responses (ex. HEAD) may have already handed the socket back
+			return(("", ""))
+
+	def scanner(self, head):
+		"""starts matching a body against --match_file, beginning with the head already read (None when not matching)"""
+		if self.patterns is None:
+			return(None)
+		scanner = PatternScanner(self.patterns, first=self.match_first)
+		scanner.feed(head)
+		return(scanner)
+
+	def matches(self, scanner) -> list:
+		"""the IDs a finished scanner found, counted in the metrics"""
+		if scanner is None or not scanner.found:
+			return(None)
+		self.stats.matched += 1
+		return(scanner.ids())
+
+	def measureBody(self, r, read=0, scanner=None):
+		"""returns the body size and how it was measured: exact (counted), header (Content-Length), or truncated (counting stopped at max_body, or at the first --match_file match with match_first); read is the number of body bytes already taken by readHead()
+		each chunk is passed to scanner, when matching, as it arrives"""
+		length = self.headerLength(r)
+		if scanner is not None and scanner.stopped():
+			return(read, "truncated")
+		if length is not None and self.trust_length and length > self.drain_limit and scanner is None:
+			# the body is left unread, so r.close() drops this connection instead of returning it to the pool
+			# (smaller bodies are counted below, since reading them is cheaper than dropping the connection and opening a new one)
+			return(length, "header")
+		sz = read
+		for chunk in r.iter_content(chunk_size=65536):
+			sz += len(chunk)
+			if scanner is not None and scanner.feed(chunk):
+				return(sz, "truncated")
+			if self.max_body and sz >= self.max_body:
+				return(sz, "truncated")
+		return(sz, "exact")
+
+	def drain(self, r, read=0):
+		"""reads and discards the rest of a body of up to drain_limit bytes in total (read of them already taken), so r.close() hands the keep-alive connection back to the pool instead of dropping it"""
+		length = self.headerLength(r)
+		if length is not None and length > self.drain_limit:
+			return
+		try:
+			for chunk in r.iter_content(chunk_size=65536):
+				read += len(chunk)
+				if read > self.drain_limit:
+					return
+		except requests.exceptions.StreamConsumedError:
+			pass # readHead() already read the whole (small) body
+
+	def readHead(self, r, n) -> bytes:
+		"""reads up to the first n bytes of the body, leaving the rest unread for measureBody()"""
+		head = b""
+		for chunk in r.iter_content(chunk_size=n):
+			head += chunk
+			if len(head) >= n:
+				break
+		return(head)
+
+	def sizeBucket(self, r, head):
+		"""the response size in Calibrator.bucket_size buckets, None when it is unknown"""
+		length = self.headerLength(r)
+		if length is None and len(head) < self.fingerprint_bytes:
+			# the whole body fit in head, so its size is known without a header
+			length = len(head)
+		if length is None:
+			return(None)
+		return(length // Calibrator.bucket_size)
+
+	def fingerprint(self, sc, r, head, item, word) -> tuple:
+		"""summarizes a calibration response as (status, size bucket, template, complete), see Calibrator
+		the template is the first fingerprint_bytes of the body with the requested item and its random word replaced by Calibrator.reflect_marks, since soft-404 pages often echo them ("/xyz was not found"); complete is set when the whole body fit"""
+		bucket = self.sizeBucket(r, head)
+		complete = len(head) < self.fingerprint_bytes
+		item = str(item)
+		if not complete:
+			# an echo cut off by the end of head cannot be recognized, so leave it out
+			head = head[:max(0, len(head) - len(item) + 1)]
+		template = head.replace(item.encode(), Calibrator.reflect_marks[0]).replace(word.encode(), Calibrator.reflect_marks[1])
+		return((sc, bucket, template, complete))
+
+	def isSoft404(self, url, sc, r, head, item) -> bool:
+		"""checks a response against the calibrated "not found" templates of a URL variation, each filled in with this item (and each of its query values) where the random word was echoed
+		the response itself is compared as read, so a word that also appears in the page's fixed text does not hide the match; neighbouring size buckets also match, since the echoed word changes the size"""
+		known = self.fingerprints.get(url)
+		if not known:
+			return(False)
+		bucket = self.sizeBucket(r, head)
+		complete = len(head) < self.fingerprint_bytes
+		item = str(item)
+		values = [item]
+		if "=" in item:
+			values = list(dict.fromkeys(kv.split("=", 1)[1] for kv in item.split("&") if "=" in kv)) or values
+		for ksc, kbucket, template, kcomplete in known:
+			if ksc != sc or (kbucket is None) != (bucket is None) or (bucket is not None and abs(kbucket - bucket) > 1):
+				continue
+			filled = template.replace(Calibrator.reflect_marks[0], item.encode())
+			for value in values:
+				expected = filled.replace(Calibrator.reflect_marks[1], value.encode())
+				n = min(len(expected), len(head))
+				# a complete body is only matched by one of the same length, otherwise the shorter is a prefix of the longer
+				if expected[:n] == head[:n] and (not kcomplete or len(expected) >= len(head)) and (not complete or len(head) >= len(expected)):
+					return(True)
+		return(False)
+
+	def requestUrl(self, url, item) -> str:
+		"""returns the URL requested for an item, in path and arg modes the word (current queue item) is appended to the URL"""
+		return(url+item)
+
+	def sendRequest(self, url, item=None):
+		"""sends the request for one URL+word (HEAD first when head_first is set) and returns the streaming response"""
+		if self.head_first:
+			# a HEAD with a usable Content-Length answers the request without any body transfer
+			h = self.session.head(url, headers=self.headers, allow_redirects=True, verify=False, proxies=self.proxy, timeout=self.timeoutFor(url), stream=True)
+			if h.status_code not in [405, 501] and self.headerLength(h) is not None:
+				return(h)
+			h.close()
+			# the GET is a second request, and takes a token of its own
+			self.pace(urlparse(url).netloc)
+		return(self.session.get(url, headers=self.headers, allow_redirects=True, verify=False, proxies=self.proxy, timeout=self.timeoutFor(url), stream=True))
+
+	def nextJob(self):
+		"""returns a RetryJob that is due, or else the next (n, item) job (or end marker) from queuein, waiting on queuein only until the next retry falls due
+		once the scan is cancelled, retries are handed out straight away so they are dropped rather than waited for"""
+		while True:
+			wait = None
+			if self.retry is not None:
+				job = self.retry.due(force=self.cancelled())
+				if job is not None:
+					return(job)
+				wait = self.retry.wait()
+			try:
+				return(self.queuein.get(timeout=wait))
+			except queue.Empty:
+				continue
+
+	def openItem(self, n):
+		"""the RetryScheduler ticket of queue item n, None without --retry_failed"""
+		if self.retry is None:
+			return(None)
+		return(self.retry.open(n))
+
+	def finishItem(self, n, ticket=None):
+		"""marks queue item n finished, or with a ticket, one of its requests (the item is finished by the last of them)"""
+		if ticket is not None:
+			if not self.retry.close(ticket):
+				return
+			if not ticket[2]:
+				# a retry was dropped by a cancelled scan, so the item stays in flight for --resume
+				self.queuein.task_done()
+				return
+		self.stats.items += 1
+		if self.checkpoint:
+			self.checkpoint.done(n)
+		# tell queuein the task is finished (for the queue.join() at the end)
+		self.queuein.task_done()
+
+	def retryJob(self, job):
+		"""sends a due RetryJob again (it may be queued once more), or drops it when the scan was cancelled"""
+		if self.cancelled():
+			job.ticket[2] = False
+		else:
+			if self.delay:
+				time.sleep(self.delay)
+			result = self.makeRequest(job.url, job.item, job.ticket, job.attempt)
+			if result is not None:
+				self.queueout.put(result)
+		self.finishItem(job.ticket[0], job.ticket)
+
+	def pace(self, domain):
+		"""waits for a rate limiter token, one per request sent"""
+		if self.ratelimiter is not None:
+			wait = self.ratelimiter.reserve(domain)
+			if wait > 0:
+				time.sleep(wait)
+
+	def throttle(self, domain) -> float:
+		"""waits for a rate limiter token and a free concurrency slot, then returns the request start time for observe()"""
+		self.pace(domain)
+		if self.controller is not None:
+			self.controller.acquire()
+		return(time.monotonic())
+
+	def observe(self, started, status):
+		"""reports the time to response headers (and the status, None on failure) to the concurrency controller, freeing the slot taken in throttle()"""
+		if self.controller is not None:
+			self.controller.release(time.monotonic() - started, status)
+
+	def prepareUrl(self, url):
+		"""this will be inherited downstream for modification"""
+		return(url)
+
+	def setUrls(self, urls):
+		"""sets the URLs every item is requested against, also used by --recurse between passes while the Worker is idle"""
+		self.urls = urls
+		# prepareUrl() will be different for each type (path, arg, etc) and is modified in the subclass, so each URL is prepared once here rather than once per item
+		self.prepared = [self.prepareUrl(url) for url in urls]
+		# index of the first URL of each host in self.prepared (--targets lists many hosts, mutations add several URLs per host), see schedule()
+		self.hoststarts = [i for i, url in enumerate(self.prepared) if i == 0 or urlparse(url).netloc != urlparse(self.prepared[i-1]).netloc]
+
+	def directoryOf(self, url, sc, location) -> str:
+		"""returns the directory URL if a response looks like one, a redirect to url + "/" or a 200/401/403 on a URL ending in "/", otherwise None"""
+		if location and location.endswith("/") and location.rstrip("/") == url.rstrip("/"):
+			return(location)
+		if url.endswith("/") and sc in [200, 401, 403]:
+			return(url)
+		return(None)
+
+	def schedule(self, n) -> list:
+		"""returns the prepared URLs in the order word/row number n visits them
+		each item starts at the next host along, so the Workers (or async slots) handling consecutive items are spread across different hosts instead of all requesting the first host at once"""
+		if len(self.hoststarts) < 2:
+			return(self.prepared)
+		k = self.hoststarts[n % len(self.hoststarts)]
+		return(self.prepared[k:] + self.prepared[:k])
+
+	def makeRequest(self, url, item, ticket=None, attempt=0):
+		"""handles web request logic
+		with --retry_failed, a failed request is queued to be sent again (returning None) until attempt reaches its limit, and only the last failure counts against the circuit breaker"""
+		started = None
+		baseurl = url
+		try:
+			# set a flag that determines if the request gets made or not, depending on if a domain is responsive or not based on the shared circuit breaker
+			execute = "yes"
+			domain = urlparse(url).netloc
+			if not self.breaker.allow(domain):
+				execute = "no"
+			if execute == "yes":
+				baseurl = url
+				url = self.requestUrl(url, item)
+				#print(f"\033[94m{self.name}\033[0m requesting website: {url}") # blue
+				# make the request through this thread's pooled keep-alive session, using given (or default) headers, allowing redirects, no TLS validation, given proxies, the host's timeout (see timeoutFor()), and streaming data
+				# stream=True means the response body content is not downloaded until the .content attribute is accessed, plus raw info (IP etc) can be accessed
+				# https://docs.python-requests.org/en/master/user/advanced/#body-content-workflow
+				started = self.throttle(domain)
+				r = self.sendRequest(url, item)
+				elapsed = time.monotonic() - started
+				self.observe(started, r.status_code)
+				started = None
+				if self.timeouts is not None:
+					self.timeouts.observe(domain, "read", elapsed)
+				self.breaker.success(domain)
+				self.stats.response(domain, r.status_code, elapsed)
+				# handle response content
+				# future: send all content to another object for processing
+				ip = self.peerInfo(r)
+				sc = r.status_code
+				head = b""
+				if r.request.method == "HEAD":
+					r.content # nothing to read, but marks the response consumed so r.close() keeps the connection
+				elif self.fingerprints is not None:
+					head = self.readHead(r, self.fingerprint_bytes)
+				# drop soft-404 responses after fingerprinting only the first fingerprint_bytes of the body (the rest of a small body is still read, to keep the connection)
+				if self.fingerprints is not None and self.isSoft404(baseurl, sc, r, head, item):
+					if r.request.method != "HEAD":
+						self.drain(r, len(head))
+					r.close()
+					self.stats.filtered += 1
+					return(None)
+				# directories found here are scanned with the same wordlist in the next --recurse pass (requests follows redirects, so a redirect shows up as the final URL)
+				if self.recursion is not None:
+					d = self.directoryOf(url, sc, r.url if r.history else None)
+					if d:
+						self.recursion.discover(d)
+				# --match_file patterns are matched as the body is read
+				scanner = self.scanner(head)
+				if r.request.method == "HEAD":
+					sz, st = self.headerLength(r), "header"
+				elif self.fingerprints is not None and len(head) < self.fingerprint_bytes:
+					sz, st = len(head), "exact" # readHead() already reached the end of the body
+				else:
+					sz, st = self.measureBody(r, len(head), scanner) # length of body content, which should (but will not always) match the Content-Length header
+				r.close() # ALWAYS close a streaming connection (a fully read body hands the connection back to the pool, a partly read one drops it)
+				#print(f"status_code:{sc} bytes:{sz} word:{item} ip:{ip[0]} port:{ip[1]} url:{url} sizetype:{st}")
+				return(Result(status_code=sc, bytes=sz, sizetype=st, word=str(item), ip=ip[0], port=ip[1], url=url, elapsed=round(elapsed, 6), matches=self.matches(scanner)))
+			else:
+				self.stats.skipped += 1
+				return(Result(word=str(item), url=self.requestUrl(url, item), worker=self.name, reason=f"circuit open for {domain}", extra=f"skipped: {self.breaker.skippedCount(domain)}, max allowed failures: {self.retries}")) # note this pseudo-exception will get displayed on stderr by Drainer
+		except Exception as e:
+			if started is not None:
+				self.observe(started, None)
+			if self.timeouts is not None and isinstance(e, requests.exceptions.Timeout):
+				self.timeouts.expired(domain)
+			self.stats.failure(domain)
+			if self.retry is not None and self.retry.schedule(baseurl, item, ticket, attempt):
+				self.stats.retried += 1
+				return(None)
+			# if the domain generates an exception, increment its counter in the shared circuit breaker
+			count = self.badDomainChecker(domain)
+			return(Result(word=str(item), url=url, worker=self.name, reason="requests.exceptions.ReadTimeout", extra=f"count: {count}, max allowed: {self.retries}")) # note this exception will get displayed on stderr by Drainer
+
+
+	def run(self):
+		"""invoke the request"""
+		self.warmUp()
+		while True:
+			# get item to work on from first queue, along with its word/row number (or a failed request that is due to be sent again)
+			job = self.nextJob()
+			# None marks the end of the scan, see RequestInjector.stopThreads()
+			if job is None:
+				self.queuein.task_done()
+				break
+			if isinstance(job, RetryJob):
+				self.retryJob(job)
+				continue
+			n, item = job
+#			print(f"\033[94m{self.name}\033[0m got item from queuein: {item}") # blue
+			if self.cancelled():
+				self.queuein.task_done()
+				continue
+			ticket = self.openItem(n)
+			# process that item for each URL variation, interleaved across hosts
+			for url in self.schedule(n):
+#				print(f"\033[94m{self.name}\033[0m prepped {url}") # blue
+				# skip URL+word pairs already requested (repeated words, overlapping mutations, recursion levels)
+				if self.seen is not None and not self.seen.add(url+item):
+					self.stats.duplicates += 1
+					continue
+				if self.delay:
+					time.sleep(self.delay)
+				result = self.makeRequest(url, item, ticket)
+				# put the result of each url+item request into the second queue (None means it was filtered out as a soft-404, or queued to be retried)
+				if result is not None:
+					self.queueout.put(result)
+#				s = f"\033[94m{self.name}\033[0m put item into queueout: {result}" # blue
+			self.finishItem(n, ticket)
+
+
+
+class PathWorker(Worker):
+	"""performs web requests according to path mode requirements"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+	def prepareUrl(self, url):
+	# extra logic to double-check that the URL has a trailing slash, but ProcessUrl should handle this properly
+		if not url.endswith("/"):
+			url = url + "/"
+		return(url)
+
+
+
+class ArgWorker(Worker):
+	"""performs web requests according to arg mode requirements"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+	def prepareUrl(self, url):
+	# extra logic to double-check that the URL has no trailing slash
+		if url.endswith("/"):
+			url = url.rstrip("/")
+		if not url.endswith("?"):
+			url = url + "?"
+		return(url)
+
+
+
+class BodyWorker(Worker):
+	"""performs web requests according to body mode requirements, sending each item's body to the unchanged URL"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.method = kwargs.get("method")
+		if not self.method:
+			self.method = "POST"
+
+	def requestUrl(self, url, item) -> str:
+		return(url)
+
+	def sendRequest(self, url, item=None):
+		"""sends the item's body (head_first does not apply, a HEAD would not carry it)"""
+		return(self.session.request(self.method, url, data=item.body(), headers=self.headers, allow_redirects=True, verify=False, proxies=self.proxy, timeout=self.timeoutFor(url), stream=True))
+
+
+
+class PipelineResponse:
+	"""the parts of a pipelined response a PipelineWorker uses: status, headers, the first bytes of the body, and the body size"""
+	__slots__ = ("status_code", "headers", "head", "size", "peer", "keepalive")
+
+	def __init__(self, status_code, headers, head, size, peer, keepalive):
+		self.status_code = status_code
+		self.headers = headers # requests.structures.CaseInsensitiveDict, so Worker.headerLength() works unchanged
+		self.head = head
+		self.size = size
+		self.peer = peer
+		self.keepalive = keepalive # False when the server asked to close the connection after this response
+
+
+
+class PipelineError(Exception):
+	"""a pipelined connection returned something the lean parser does not handle"""
+
+
+
+class PipelineConnection:
+	"""one persistent socket to a host, written to with several pre-serialized GET requests at once and read back one response at a time"""
+	def __init__(self, scheme, host, port, timeout=3, read_timeout=None, dns=None):
+		if dns is not None:
+			sock = dns.createConnection((host, port), timeout=timeout)
+		else:
+			sock = socket.create_connection((host, port), timeout=timeout)
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		if scheme == "https":
+			# no certificate validation, like verify=False in the standard engine
+			context = ssl.create_default_context()
+			context.check_hostname = False
+			context.verify_mode = ssl.CERT_NONE
+			sock = context.wrap_socket(sock, server_hostname=host)
+		if read_timeout:
+			sock.settimeout(read_timeout)
+		self.sock = sock
+		self.peer = sock.getpeername()[:2]
+		self.reader = sock.makefile("rb", buffering=65536)
+		self.scratch = bytearray(65536) # body bytes past the head are read into this and discarded
+		self.sent = 0 # requests written to this connection
+		self.answered = 0 # responses read from this connection
+
+	def send(self, data, count):
+		self.sock.sendall(data)
+		self.sent += count
+
+	def line(self) -> bytes:
+		l = self.reader.readline(65537)
+		if not l:
+			raise PipelineError("connection closed")
+		if len(l) > 65536:
+			raise PipelineError("header line too long")
+		return(l)
+
+	def skip(self, n, keep, scanner=None) -> bytes:
+		"""reads n body bytes, returning at most the first keep of them, and passing all of them to scanner (until it has stopped)"""
+		kept = self.reader.read(min(n, keep)) if keep > 0 else b""
+		if len(kept) < min(n, keep):
+			raise PipelineError("connection closed inside a body")
+		n -= len(kept)
+		if scanner is not None and kept:
+			scanner.feed(kept)
+		view = memoryview(self.scratch)
+		while n > 0:
+			got = self.reader.readinto(view[:min(n, len(view))])
+			if not got:
+				raise PipelineError("connection closed inside a body")
+			if scanner is not None and not scanner.stopped():
+				scanner.feed(view[:got])
+			n -= got
+		return(kept)
+
+	def read(self, keep, scanner=None) -> PipelineResponse:
+		"""parses the next response: status line, headers, then a body framed by Content-Length or chunked encoding (or the end of the connection)
+		the whole body is always read, to reach the next response, so a scanner that stops early only stops matching"""
+		while True:
+			status = self.line().split(None, 2)
+			if len(status) < 2 or not status[0].startswith(b"HTTP/1.") or not status[1].isdigit():
+				raise PipelineError("malformed status line")
+			sc = int(status[1])
+			headers = requests.structures.CaseInsensitiveDict()
+			while True:
+				l = self.line()
+				if l in (b"\r\n", b"\n"):
+					break
+				k, sep, v = l.decode("latin-1").partition(":")
+				if not sep:
+					raise PipelineError("malformed header line")
+				headers[k.strip()] = v.strip()
+			# skip interim responses (100 Continue etc), the final response follows on the same connection
+			if sc >= 200 or sc == 101:
+				break
+		keepalive = status[0] == b"HTTP/1.1" and headers.get("Connection", "").lower() != "close"
+		head = b""
+		size = 0
+		if sc in [204, 304] or 100 <= sc < 200:
+			pass
+		elif "chunked" in headers.get("Transfer-Encoding", "").lower():
+			while True:
+				chunk = self.line().split(b";", 1)[0].strip()
+				try:
+					n = int(chunk, 16)
+				except ValueError:
+					raise PipelineError("malformed chunk size")
+				if n == 0:
+					# trailers end with an empty line
+					while self.line() not in (b"\r\n", b"\n"):
+						pass
+					break
+				head += self.skip(n, keep - len(head), scanner)
+				size += n
+				self.line() # CRLF after each chunk
+		elif headers.get("Content-Length", "").isdigit():
+			size = int(headers["Content-Length"])
+			head = self.skip(size, keep, scanner)
+		else:
+			# no framing, the body runs to the end of the connection, which then cannot carry another response
+			keepalive = False
+			while True:
+				got = self.reader.readinto(self.scratch)
+				if not got:
+					break
+				if len(head) < keep:
+					head += bytes(self.scratch[:min(got, keep - len(head))])
+				if scanner is not None and not scanner.stopped():
+					scanner.feed(memoryview(self.scratch)[:got])
+				size += got
+		self.answered += 1
+		return(PipelineResponse(sc, headers, head, size, self.peer, keepalive))
+
+	def close(self):
+		try:
+			self.reader.close()
+			self.sock.close()
+		except OSError:
+			pass
+
+
+
+class PipelineWorker(PathWorker):
+	"""performs path mode GET requests over persistent per-host sockets, writing up to pipeline_depth pre-serialized requests at a time and reading the responses back in order
+	anything the lean parser does not handle (redirects, encoded bodies, unusual words) is sent through the standard requests path instead, as is every request to a host that mishandles pipelining"""
+	# characters requests would send unchanged, so a word made only of these is copied into the request line as is
+	plain = re.compile(r"[A-Za-z0-9\-._~!$&'()*+,;=:@/]*")
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.depth = kwargs.get("pipeline_depth")
+		if not self.depth:
+			self.depth = 8
+		self.fallback = kwargs.get("pipeline_fallback") # hosts found to mishandle pipelining, shared by every PipelineWorker
+		if self.fallback is None:
+			self.fallback = set()
+		self.connections = {} # host -> PipelineConnection
+
+	def setUrls(self, urls):
+		super().setUrls(urls)
+		# everything around the word is serialized once per URL: "GET /path/" before it, " HTTP/1.1" and the headers after it
+		headers = requests.utils.default_headers()
+		headers["Accept-Encoding"] = "identity" # encoded bodies would be counted differently than the standard engine's decoded sizes
+		headers.update(self.headers)
+		self.wire = {}
+		for url in self.prepared:
+			u = urlparse(url)
+			port = u.port or (443 if u.scheme == "https" else 80)
+			lines = [f"Host: {u.netloc}"] + [f"{k}: {v}" for k, v in headers.items()]
+			suffix = (" HTTP/1.1\r\n" + "\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+			prefix = b"GET " + requests.Request("GET", url).prepare().path_url.encode("ascii")
+			self.wire[url] = (prefix, suffix, u.scheme, u.hostname, port)
+
+	def requestBytes(self, url, item) -> bytes:
+		prefix, suffix, scheme, host, port = self.wire[url]
+		if self.plain.fullmatch(item) and not ("." in item and [s for s in item.split("/") if s in [".", ".."]]):
+			return(prefix + item.encode("ascii") + suffix)
+		# let requests quote the word (and resolve any dot segments) exactly as the standard engine would
+		return(b"GET " + requests.Request("GET", url+item).prepare().path_url.encode("ascii") + suffix)
+
+	def connection(self, domain, url) -> PipelineConnection:
+		c = self.connections.get(domain)
+		if c is None:
+			prefix, suffix, scheme, host, port = self.wire[url]
+			if self.timeouts is None:
+				c = PipelineConnection(scheme, host, port, timeout=self.timeout, dns=self.dns)
+			else:
+				connect, read = self.timeouts.get(domain)
+				started = time.monotonic()
+				c = PipelineConnection(scheme, host, port, timeout=connect, read_timeout=read, dns=self.dns)
+				self.timeouts.observe(domain, "connect", time.monotonic() - started)
+			self.connections[domain] = c
+		return(c)
+
+	def warm(self):
+		for url in self.warmHosts():
+			try:
+				self.connection(urlparse(url).netloc, url)
+			except OSError:
+				pass
+
+	def dropConnection(self, domain):
+		c = self.connections.pop(domain, None)
+		if c is not None:
+			c.close()
+
+	def disablePipelining(self, domain):
+		if domain not in self.fallback:
+			self.fallback.add(domain)
+			sys.stderr.write(f"INFO {self.name}: {domain} does not handle pipelined requests, falling back to the standard engine\n")
+		self.dropConnection(domain)
+
+	def handle(self, domain, url, item, r, elapsed, scanner=None):
+		"""turns a pipelined response into a Result, the pipelined equivalent of the response handling in Worker.makeRequest()"""
+		self.breaker.success(domain)
+		self.stats.response(domain, r.status_code, elapsed)
+		if self.fingerprints is not None and self.isSoft404(url, r.status_code, r, r.head, item):
+			self.stats.filtered += 1
+			return(None)
+		if self.recursion is not None:
+			d = self.directoryOf(url+item, r.status_code, None)
+			if d:
+				self.recursion.discover(d)
+		length = self.headerLength(r)
+		if length is not None and self.trust_length and length > self.drain_limit:
+			sz, st = length, "header"
+		elif self.fingerprints is not None and r.size < self.fingerprint_bytes:
+			sz, st = r.size, "exact"
+		else:
+			# the same counting as measureBody(), which reads 65536-byte chunks after the head and stops at the first one reaching max_body
+			sz, st = len(r.head), "exact"
+			while sz < r.size:
+				sz += min(65536, r.size - sz)
+				if self.max_body and sz >= self.max_body:
+					st = "truncated"
+					break
+		return(Result(status_code=r.status_code, bytes=sz, sizetype=st, word=item, ip=r.peer[0], port=r.peer[1], url=url+item, elapsed=round(elapsed, 6), matches=self.matches(scanner)))
+
+	def pipeline(self, domain, batch) -> tuple:
+		"""writes a batch of (url, item, ticket) requests to the host's connection and reads the responses, returning the Results and the requests to send through the standard path"""
+		results = []
+		retry = []
+		if self.ratelimiter is not None:
+			for i in batch:
+				wait = self.ratelimiter.reserve(domain)
+				if wait > 0:
+					time.sleep(wait)
+		# the whole batch shares one connection, so it takes one --adaptive slot
+		if self.controller is not None:
+			self.controller.acquire()
+		status = None
+		started = time.monotonic()
+		try:
+			c = self.connection(domain, batch[0][0])
+			if self.timeouts is not None:
+				c.sock.settimeout(self.timeouts.timeout(domain, "read"))
+			# each request is timestamped as it is written, so its elapsed time does not include the writes ahead of it
+			written = []
+			for url, item, ticket in batch:
+				c.send(self.requestBytes(url, item), 1)
+				written.append(time.monotonic())
+			keep = self.fingerprint_bytes if self.fingerprints is not None else 0
+			answered = started # when the previous response finished arriving
+			for i, (url, item, ticket) in enumerate(batch):
+				scanner = None
+				if self.patterns is not None:
+					scanner = PatternScanner(self.patterns, first=self.match_first)
+				try:
+					r = c.read(keep, scanner)
+				except (OSError, PipelineError):
+					self.dropConnection(domain)
+					# a reused connection may simply have timed out while idle; answering some of this batch and then failing means the host mishandles pipelining
+					if i > 0:
+						self.disablePipelining(domain)
+					retry = retry + batch[i:]
+					break
+				# a pipelined response cannot arrive before the ones ahead of it, so its time is counted from its own write, or from the previous response if that came later
+				now = time.monotonic()
+				elapsed = now - max(written[i], answered)
+				answered = now
+				status = r.status_code
+				# only the first response of a batch measures the host, the later ones also waited on the responses ahead of them
+				if i == 0 and self.timeouts is not None:
+					self.timeouts.observe(domain, "read", elapsed)
+				if 300 <= r.status_code < 400 and "Location" in r.headers or r.headers.get("Content-Encoding", "identity").lower() != "identity":
+					# redirects are followed, and encoded bodies decoded, by the standard path
+					retry.append((url, item, ticket))
+				else:
+					result = self.handle(domain, url, item, r, elapsed, scanner)
+					if result is not None:
+						results.append(result)
+				if not r.keepalive:
+					self.dropConnection(domain)
+					if i < len(batch) - 1:
+						self.disablePipelining(domain)
+						retry = retry + batch[i+1:]
+					break
+		except OSError:
+			# the connection could not be opened (or written to), the standard path reports the failure
+			self.dropConnection(domain)
+			retry = batch
+		finally:
+			if self.controller is not None:
+				self.controller.release(time.monotonic() - started, status)
+		return(results, retry)
+
+	def run(self):
+		"""invoke the requests, collecting up to pipeline_depth queued items at a time and pipelining them per host"""
+		self.warmUp()
+		while True:
+			items = [self.nextJob()]
+			if isinstance(items[0], RetryJob):
+				# retries are sent one at a time through the standard path
+				self.retryJob(items[0])
+				continue
+			while len(items) < self.depth and items[-1] is not None:
+				try:
+					items.append(self.queuein.get_nowait())
+				except queue.Empty:
+					break
+			# None marks the end of the scan, this Worker finishes the items taken before it and returns
+			stop = items[-1] is None
+			if stop:
+				items.pop()
+				self.queuein.task_done()
+			if self.cancelled():
+				for i in items:
+					self.queuein.task_done()
+				if stop:
+					break
+				continue
+			tickets = [self.openItem(n) for n, item in items]
+			hosts = {} # host -> [(url, item, ticket), ...] in the order they are sent
+			for (n, item), ticket in zip(items, tickets):
+				for url in self.schedule(n):
+					if self.seen is not None and not self.seen.add(url+item):
+						self.stats.duplicates += 1
+						continue
+					hosts.setdefault(urlparse(url).netloc, []).append((url, item, ticket))
+			for domain, pending in hosts.items():
+				for i in range(0, len(pending), self.depth):
+					batch = pending[i:i+self.depth]
+					if self.delay:
+						time.sleep(self.delay * len(batch))
+					retry = batch
+					if domain not in self.fallback and self.breaker.allow(domain):
+						results, retry = self.pipeline(domain, batch)
+						for result in results:
+							self.queueout.put(result)
+					for url, item, ticket in retry:
+						result = self.makeRequest(url, item, ticket)
+						if result is not None:
+							self.queueout.put(result)
+			for (n, item), ticket in zip(items, tickets):
+				self.finishItem(n, ticket)
+			if stop:
+				for domain in list(self.connections):
+					self.dropConnection(domain)
+				break
+
+
+
+if aiohttp is not None:
+	class PeerTCPConnector(aiohttp.TCPConnector):
+		"""pooled aiohttp connector that records the peer IP/port of the connection each request is sent on, the equivalent of the socket lookup in Worker.makeRequest()
+		connect() runs in the requesting task for every request (new or pooled connection), so the peer is kept in a context variable that task reads once it has the response"""
+		peer = contextvars.ContextVar("peer", default=("", ""))
+
+		async def connect(self, req, traces, timeout):
+			conn = await super().connect(req, traces, timeout)
+			peer = None
+			if conn.transport is not None:
+				peer = conn.transport.get_extra_info("peername")
+			self.peer.set(tuple(peer[:2]) if peer else ("", ""))
+			return(conn)
+
+
+
+class AsyncWorker(Worker):
+	"""parent class that drives many concurrent requests from a single thread using an asyncio event loop (--engine async), producing the same results as the threaded Workers"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		# number of requests in flight at once, replaces the thread count of the threaded engine
+		self.concurrency = kwargs.get("concurrency")
+		if not self.concurrency:
+			self.concurrency = 1
+
+	def makeSession(self):
+		"""the aiohttp session must be created inside the running event loop, see runLoop()"""
+		return(None)
+
+	async def makeRequest(self, url, item, ticket=None, attempt=0):
+		"""handles web request logic, mirrors Worker.makeRequest()"""
+		started = None
+		baseurl = url
+		try:
+			execute = "yes"
+			domain = urlparse(url).netloc
+			if not self.breaker.allow(domain):
+				execute = "no"
+			if execute == "yes":
+				baseurl = url
+				url = self.requestUrl(url, item)
+				proxy = None
+				if self.proxy:
+					proxy = self.proxy.get(urlparse(url).scheme)
+				started = await self.throttle(domain)
+				r = await self.sendRequest(url, proxy, item)
+				elapsed = time.monotonic() - started
+				self.observe(started, r.status)
+				started = None
+				if self.timeouts is not None:
+					self.timeouts.observe(domain, "read", elapsed)
+				self.breaker.success(domain)
+				self.stats.response(domain, r.status, elapsed)
+				async with r:
+					# small bodies may already have released r.connection, so peer info is what PeerTCPConnector recorded for this task's last request (note this will be the proxy IP/port if one is used)
+					ip = PeerTCPConnector.peer.get()
+					sc = r.status
+					head = b""
+					if r.method != "HEAD" and self.fingerprints is not None:
+						head = await self.readHead(r, self.fingerprint_bytes)
+					# drop soft-404 responses after fingerprinting only the first fingerprint_bytes of the body (the rest of a small body is still read, to keep the connection)
+					if self.fingerprints is not None and self.isSoft404(baseurl, sc, r, head, item):
+						if r.method == "HEAD" or not await self.drain(r, len(head)):
+							r.close()
+						self.stats.filtered += 1
+						return(None)
+					if self.recursion is not None:
+						d = self.directoryOf(url, sc, str(r.url) if r.history else None)
+						if d:
+							self.recursion.discover(d)
+					scanner = self.scanner(head)
+					if r.method == "HEAD":
+						sz, st = self.headerLength(r), "header"
+					else:
+						sz, st = await self.measureBody(r, len(head), scanner)
+				return(Result(status_code=sc, bytes=sz, sizetype=st, word=str(item), ip=ip[0], port=ip[1], url=url, elapsed=round(elapsed, 6), matches=self.matches(scanner)))
+			else:
+				self.stats.skipped += 1
+				return(Result(word=str(item), url=self.requestUrl(url, item), worker=self.name, reason=f"circuit open for {domain}", extra=f"skipped: {self.breaker.skippedCount(domain)}, max allowed failures: {self.retries}")) # note this pseudo-exception will get displayed on stderr by Drainer
+		except Exception as e:
+			if started is not None:
+				self.observe(started, None)
+			if self.timeouts is not None and isinstance(e, asyncio.TimeoutError):
+				self.timeouts.expired(domain)
+			self.stats.failure(domain)
+			if self.retry is not None and self.retry.schedule(baseurl, item, ticket, attempt):
+				self.stats.retried += 1
+				return(None)
+			# if the domain generates an exception, increment its counter in the shared circuit breaker
+			count = self.badDomainChecker(domain)
+			return(Result(word=str(item), url=url, worker=self.name, reason="requests.exceptions.ReadTimeout", extra=f"count: {count}, max allowed: {self.retries}")) # note this exception will get displayed on stderr by Drainer
+
+	def clientTimeout(self, url):
+		"""aiohttp version of Worker.timeoutFor()"""
+		if self.timeouts is None:
+			# no total, which would also cut off the body of a slow but steady large response
+			return(aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout))
+		connect, read = self.timeouts.get(urlparse(url).netloc)
+		return(aiohttp.ClientTimeout(sock_connect=connect, sock_read=read))
+
+	def connectTrace(self):
+		"""aiohttp TraceConfig giving the connect time of every new connection to the TimeoutEstimator (--adaptive_timeout)"""
+		trace = aiohttp.TraceConfig()
+		async def requestStart(session, ctx, params):
+			ctx.host = params.url.raw_authority
+		async def connectStart(session, ctx, params):
+			ctx.connecting = time.monotonic()
+		async def connectEnd(session, ctx, params):
+			self.timeouts.observe(ctx.host, "connect", time.monotonic() - ctx.connecting)
+		trace.on_request_start.append(requestStart)
+		trace.on_connection_create_start.append(connectStart)
+		trace.on_connection_create_end.append(connectEnd)
+		return(trace)
+
+	async def pace(self, domain):
+		"""async version of Worker.pace()"""
+		if self.ratelimiter is not None:
+			wait = self.ratelimiter.reserve(domain)
+			if wait > 0:
+				await asyncio.sleep(wait)
+
+	async def throttle(self, domain) -> float:
+		"""async version of Worker.throttle()"""
+		await self.pace(domain)
+		if self.controller is not None:
+			await self.controller.acquireAsync()
+		return(time.monotonic())
+
+	async def sendRequest(self, url, proxy, item=None):
+		"""async version of Worker.sendRequest()"""
+		if self.head_first:
+			# a HEAD with a usable Content-Length answers the request without any body transfer
+			h = await self.session.head(url, headers=self.headers, allow_redirects=True, proxy=proxy, timeout=self.clientTimeout(url))
+			if h.status not in [405, 501] and self.headerLength(h) is not None:
+				return(h)
+			h.release()
+			# the GET is a second request, and takes a token of its own
+			await self.pace(urlparse(url).netloc)
+		return(await self.session.get(url, headers=self.headers, allow_redirects=True, proxy=proxy, timeout=self.clientTimeout(url)))
+
+	async def drain(self, r, read=0) -> bool:
+		"""async version of Worker.drain(), returns whether the whole body was read (and the connection can be released to the pool)"""
+		length = self.headerLength(r)
+		if length is not None and length > self.drain_limit:
+			return(False)
+		async for chunk in r.content.iter_chunked(65536):
+			read += len(chunk)
+			if read > self.drain_limit:
+				return(False)
+		return(True)
+
+	async def readHead(self, r, n) -> bytes:
+		"""async version of Worker.readHead()"""
+		head = b""
+		while len(head) < n:
+			chunk = await r.content.read(n - len(head))
+			if not chunk:
+				break
+			head += chunk
+		return(head)
+
+	async def measureBody(self, r, read=0, scanner=None):
+		"""async version of Worker.measureBody()"""
+		length = self.headerLength(r)
+		if scanner is not None and scanner.stopped():
+			r.close() # drop the connection rather than reading the rest of the body
+			return(read, "truncated")
+		if length is not None and self.trust_length and length > self.drain_limit and scanner is None:
+			r.close() # drop the connection rather than reading the rest of the body
+			return(length, "header")
+		sz = read
+		async for chunk in r.content.iter_chunked(65536):
+			sz += len(chunk)
+			if (scanner is not None and scanner.feed(chunk)) or (self.max_body and sz >= self.max_body):
+				r.close() # drop the connection rather than reading the rest of the body
+				return(sz, "truncated")
+		return(sz, "exact")
+
+	async def nextJobAsync(self, pending):
+		"""async version of Worker.nextJob(), reading the hand-off queue filled by feed()"""
+		while True:
+			wait = None
+			if self.retry is not None:
+				job = self.retry.due(force=self.cancelled())
+				if job is not None:
+					return(job)
+				wait = self.retry.wait()
+			try:
+				return(await asyncio.wait_for(pending.get(), wait))
+			except asyncio.TimeoutError:
+				continue
+
+	async def retryJobAsync(self, job):
+		"""async version of Worker.retryJob()"""
+		if self.cancelled():
+			job.ticket[2] = False
+		else:
+			if self.delay:
+				await asyncio.sleep(self.delay)
+			result = await self.makeRequest(job.url, job.item, job.ticket, job.attempt)
+			if result is not None:
+				self.queueout.put(result)
+		self.finishItem(job.ticket[0], job.ticket)
+
+	async def consume(self, pending):
+		"""one in-flight request slot, the async equivalent of Worker.run()"""
+		while True:
+			job = await self.nextJobAsync(pending)
+			if job is None:
+				break
+			if isinstance(job, RetryJob):
+				await self.retryJobAsync(job)
+				continue
+			n, item = job
+			if self.cancelled():
+				self.queuein.task_done()
+				continue
+			ticket = self.openItem(n)
+			for url in self.schedule(n):
+				if self.seen is not None and not self.seen.add(url+item):
+					self.stats.duplicates += 1
+					continue
+				if self.delay:
+					await asyncio.sleep(self.delay)
+				result = await self.makeRequest(url, item, ticket)
+				# a full queueout pauses the whole loop until the Drainer catches up, which is the intended backpressure
+				if result is not None:
+					self.queueout.put(result)
+			self.finishItem(n, ticket)
+
+	def feed(self, loop, pending):
+		"""runs in its own daemon thread, moving items from the threaded queuein into the event loop (blocks while every slot is busy)"""
+		while True:
+			item = self.queuein.get()
+			if item is None:
+				# the end of the scan, every slot is told to return so runLoop() can finish
+				for i in range(self.concurrency):
+					asyncio.run_coroutine_threadsafe(pending.put(None), loop).result()
+				self.queuein.task_done()
+				break
+			asyncio.run_coroutine_threadsafe(pending.put(item), loop).result()
+
+	async def runLoop(self):
+		"""fans items out to self.concurrency request slots sharing one pooled connector"""
+		loop = asyncio.get_running_loop()
+		# small hand-off queue so the loop never holds more than one item per slot
+		pending = asyncio.Queue(maxsize=self.concurrency)
+		# one pooled connector shared by every slot, no per-host cap so a single target can use all slots
+		if self.dns is not None:
+			# the DnsCache replaces aiohttp's own cache, so every engine sees the same answers for --dns_ttl seconds
+			connector = PeerTCPConnector(limit=self.concurrency, limit_per_host=0, ssl=False, use_dns_cache=False, resolver=DnsCacheResolver(self.dns))
+		else:
+			connector = PeerTCPConnector(limit=self.concurrency, limit_per_host=0, ssl=False)
+		# connect times through a proxy say nothing about the target host
+		traces = []
+		if self.timeouts is not None and not self.proxy:
+			traces.append(self.connectTrace())
+		timeout = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+		async with aiohttp.ClientSession(connector=connector, timeout=timeout, cookie_jar=aiohttp.DummyCookieJar(), trace_configs=traces) as self.session:
+			slots = [asyncio.create_task(self.consume(pending)) for i in range(self.concurrency)]
+			# queuein.get() blocks, so it is waited on outside the loop; a daemon thread (not the loop's executor) so it cannot hold up interpreter exit
+			feeder = threading.Thread(target=self.feed, args=(loop, pending), daemon=True)
+			feeder.name = f"{self.name}-feeder"
+			feeder.start()
+			await asyncio.gather(*slots)
+
+	def run(self):
+		"""invoke the event loop"""
+		# aiohttp opens connections inside the loop as slots need them, so only the DNS cache is warmed ahead of an async scan
+		self.warmed.set()
+		asyncio.run(self.runLoop())
+
+
+
+class AsyncPathWorker(AsyncWorker, PathWorker):
+	"""performs asyncio web requests according to path mode requirements"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+
+
+class AsyncArgWorker(AsyncWorker, ArgWorker):
+	"""performs asyncio web requests according to arg mode requirements"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+
+
+class AsyncBodyWorker(AsyncWorker, BodyWorker):
+	"""performs asyncio web requests according to body mode requirements"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+	async def sendRequest(self, url, proxy, item=None):
+		"""async version of BodyWorker.sendRequest(), aiohttp would send a file-like body chunked so the pieces are always joined"""
+		return(await self.session.request(self.method, url, data=item.body(stream=False), headers=self.headers, allow_redirects=True, proxy=proxy, timeout=self.clientTimeout(url)))
+
+
+
+#================================================
+#
+# Drainer Classes (Output Handlers)
+#
+#================================================
+
+
+
+class Drainer(threading.Thread):
+	"""provides output management"""
+	def __init__(self, queue, color=False, output_file="", simple_output=False, output_format="text", batch_size=1024, metrics=None, store=None):
+		threading.Thread.__init__(self)
+		self.setDaemon(True)
+		self.queue = queue
+		self.name = threading.current_thread().name
+		self.color = color
+		self.output_file = output_file
+		self.simple_output = simple_output
+		self.output_format = output_format # text, jsonl, or csv
+		self.batch_size = batch_size # the most results written (and flushed) in one go
+		self.store = store # ResultStore every result is also recorded in (--store)
+		self.stats = Stats()
+		if metrics:
+			metrics.register(self.stats)
+		# results go to output_file (or stdout) through one large buffer; text-format errors still go to stderr
+		if self.output_file:
+			self.stream = open(self.output_file, "w", buffering=1048576, newline="")
+		else:
+			self.stream = sys.stdout
+		if self.output_format == "csv":
+			self.csvwriter = csv.writer(self.stream)
+			self.csvwriter.writerow(Result.fields)
+	
+	def colorize(self, status) -> str:
+		"""wraps a status code in a terminal color by its class"""
+		s = str(status)
+		if s[0] == "1":
+			s = "\033[94m" + s + "\033[0m" # blue + reset code
+		elif s[0] == "2":
+			s = "\033[92m" + s + "\033[0m" # green + reset code
+		elif s[0] == "3":
+			s = "\033[93m" + s + "\033[0m" # yellow + reset code
+		elif s[0] == "4":
+			s = "\033[91m" + s + "\033[0m" # red + reset code
+		elif s[0] == "5":
+			s = "\033[95m" + s + "\033[0m" # purple + reset code
+		return(s)
+
+	def formatText(self, item) -> str:
+		"""handles full and condensed text output, built from the record fields rather than re-parsing a line"""
+		if self.color:
+			return(self.colorize(item.status_code) + " " + item.url)
+		if self.simple_output:
+			return(f"{item.status_code} {item.url}")
+		return(str(item))
+
+	def write(self, batch):
+		"""formats a batch of results and writes them with one call"""
+		lines = []
+		errors = []
+		for item in batch:
+			if self.output_format == "jsonl":
+				lines.append(json.dumps(item.asDict()))
+			elif self.output_format == "csv":
+				self.csvwriter.writerow(item.asRow())
+			elif item.isError():
+				errors.append(str(item))
+			else:
+				lines.append(self.formatText(item))
+		if lines:
+			lines.append("")
+			self.stream.write("\n".join(lines))
+		self.stream.flush()
+		if errors:
+			errors.append("")
+			sys.stderr.write("\n".join(errors))
+
+	def run(self):
+		"""dispatches output handling"""
+		try:
+			self.drain()
+		finally:
+			# flushes the buffer and releases the handle however the loop ended
+			if self.output_file:
+				self.stream.close()
+
+	def drain(self):
+		"""writes results in batches until the end marker (None)"""
+		while True:
+			item = self.queue.get()
+#			print(f"\033[33m{self.name}\033[0m removed from queueout:\t{item}") # gold
+			if item is None:
+				break
+			batch = [item]
+			stop = False
+			# take whatever else is already waiting without blocking, so output is written in large chunks when results arrive quickly
+			while len(batch) < self.batch_size:
+				try:
+					item = self.queue.get_nowait()
+				except queue.Empty:
+					break
+				if item is None:
+					stop = True
+					break
+				batch.append(item)
+			self.write(batch)
+			if self.store is not None:
+				self.store.add(batch)
+			self.stats.written += len(batch)
+			# only mark results done once written, so queueout.join() cannot return with output still buffered
+			for i in batch:
+				self.queue.task_done()
+			if stop:
+				break
+
+
+
+#================================================
+#
+# Distributed Classes
+#
+#================================================
+
+
+
+class Lease:
+	"""one piece of a distributed scan: rows [start, end) of the wordlist, requested against the URLs of one target (its ProcessUrl.output variants)"""
+	__slots__ = ("id", "urls", "rows", "holder", "keys")
+
+	def __init__(self, id, urls, rows):
+		self.id = id
+		self.urls = urls
+		self.rows = rows
+		self.holder = None # name of the agent scanning it
+		self.keys = set() # URL+word of every result already passed on, so a lease scanned again after its agent died is not reported twice
+
+	def message(self) -> dict:
+		return({"type": "lease", "id": self.id, "urls": self.urls, "rows": list(self.rows)})
+
+
+
+class Coordinator(threading.Thread):
+	"""hands the leases of a scan to agents (--agent) connecting over TCP (--coordinator), and puts the results they stream back into queueout
+	the protocol is one JSON object per line: each side proves it knows the shared secret by signing a random challenge from the other (see sign()), then the agent is sent the scan's options, asks for the next lease, streams its results and reports it finished, until it is told the scan is done
+	an agent that disconnects, or sends nothing (not even its heartbeat) for lease_timeout seconds, is dropped and its lease goes back to the front of the queue
+	nothing is encrypted: the options (headers included) and results can be read by anyone on the network between the two"""
+	def __init__(self, address, secret, config, leases, queueout, lease_timeout=30.0, metrics=None):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.name = "Coordinator"
+		self.secret = secret # bytes each agent must also have, see readSecret()
+		self.config = config # the options every agent scans with and what it checks its own files against, see RequestInjector.agentConfig()
+		self.pending = list(leases) # leases not held by any agent, in order
+		self.outstanding = {} # lease ID --> Lease held by an agent
+		self.queueout = queueout
+		self.lease_timeout = lease_timeout
+		self.condition = threading.Condition()
+		self.finished = threading.Event() # set once every lease is finished, or the scan was cancelled (see close())
+		self.handlers = [] # one thread per connected agent
+		self.stats = Stats()
+		if metrics:
+			metrics.register(self.stats)
+		self.server = socket.create_server(self.address(address))
+
+	@staticmethod
+	def address(address) -> tuple:
+		"""splits [HOST:]PORT (HOST defaults to 127.0.0.1), raising ValueError if it is not one"""
+		host, sep, port = address.rpartition(":")
+		if sep and not host:
+			raise ValueError(f"{address} is not [HOST:]PORT")
+		return((host.strip("[]") or "127.0.0.1", int(port)))
+
+	@staticmethod
+	def sign(secret, role, nonce) -> str:
+		"""the HMAC proving the sender (role "agent" or "coordinator") knows the shared secret, over the other side's random nonce so it cannot be replayed"""
+		return(hmac.new(secret, f"{role}:{nonce}".encode("utf-8"), hashlib.sha256).hexdigest())
+
+	@staticmethod
+	def verify(secret, role, nonce, mac) -> bool:
+		return(isinstance(mac, str) and hmac.compare_digest(Coordinator.sign(secret, role, nonce), mac))
+
+	@staticmethod
+	def send(sock, message):
+		sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+	@staticmethod
+	def receive(reader) -> dict:
+		"""the next message, or None when the connection was closed, raising ValueError if it is not a JSON object"""
+		line = reader.readline()
+		if not line:
+			return(None)
+		message = json.loads(line)
+		if not isinstance(message, dict):
+			raise ValueError("malformed message")
+		return(message)
+
+	def run(self):
+		"""accepts agents until the scan is finished, each served by its own thread"""
+		while not self.finished.is_set():
+			try:
+				conn, addr = self.server.accept()
+			except OSError:
+				break
+			t = threading.Thread(target=self.serve, args=(conn, addr), daemon=True)
+			t.name = f"Coordinator-{addr[0]}:{addr[1]}"
+			t.start()
+			self.handlers.append(t)
+
+	def serve(self, conn, addr):
+		"""talks to one agent for as long as it is connected"""
+		name = f"{addr[0]}:{addr[1]}"
+		lease = None
+		conn.settimeout(self.lease_timeout)
+		reader = conn.makefile("rb")
+		try:
+			nonce = os.urandom(16).hex()
+			self.send(conn, {"type": "challenge", "nonce": nonce})
+			hello = self.receive(reader)
+			if hello is None or hello.get("type") != "hello":
+				return
+			if not self.verify(self.secret, "agent", nonce, hello.get("mac")):
+				sys.stderr.write(f"INFO Coordinator: refused {name}, which does not know the shared secret\n")
+				return
+			name = f"{hello.get('name', '')}@{name}"
+			sys.stderr.write(f"INFO Coordinator: agent {name} connected\n")
+			self.send(conn, {"type": "config", "mac": self.sign(self.secret, "coordinator", hello["nonce"]), "heartbeat": self.lease_timeout / 3, **self.config})
+			while True:
+				message = self.receive(reader)
+				if message is None:
+					break
+				if message["type"] == "next":
+					lease = self.assign(name)
+					if lease is None:
+						self.send(conn, {"type": "done"})
+						break
+					self.send(conn, lease.message())
+				elif message["type"] == "result" and lease is not None and message["lease"] == lease.id:
+					self.accept(lease, message["result"])
+				elif message["type"] == "finished" and lease is not None and message["lease"] == lease.id:
+					self.complete(lease)
+					lease = None
+		except (OSError, ValueError, KeyError, TypeError) as e:
+			sys.stderr.write(f"INFO Coordinator: dropping agent {name} ({e or type(e).__name__})\n")
+		finally:
+			if lease is not None:
+				self.release(lease)
+			conn.close()
+
+	def assign(self, name) -> Lease:
+		"""the next lease for an agent, waiting while every remaining lease is held by another one (which may still die); None once the scan is finished"""
+		with self.condition:
+			while not self.pending and not self.finished.is_set():
+				self.condition.wait()
+			if self.finished.is_set():
+				return(None)
+			lease = self.pending.pop(0)
+			lease.holder = name
+			self.outstanding[lease.id] = lease
+			return(lease)
+
+	def accept(self, lease, fields):
+		"""passes one streamed result on to queueout, unless an earlier holder of the lease already did, raising ValueError if it is malformed"""
+		result = Result.fromDict(fields)
+		if self.finished.is_set():
+			return
+		key = (result.url, result.word)
+		with self.condition:
+			if key in lease.keys:
+				return
+			lease.keys.add(key)
+			# every agent's handler thread records into the one Stats, so only while holding the lock (see Stats)
+			if result.status_code is None:
+				self.stats.failure(urlparse(result.url or "").netloc)
+			else:
+				self.stats.response(urlparse(result.url).netloc, result.status_code, result.elapsed or 0.0)
+		self.queueout.put(result)
+
+	def complete(self, lease):
+		with self.condition:
+			self.outstanding.pop(lease.id, None)
+			lease.keys = set()
+			self.stats.items += lease.rows[1] - lease.rows[0]
+			if not self.pending and not self.outstanding:
+				self.finished.set()
+			self.condition.notify_all()
+
+	def release(self, lease):
+		"""puts the lease of a lost agent back at the front of the queue, for the next agent that asks"""
+		with self.condition:
+			if self.outstanding.pop(lease.id, None) is None:
+				return
+			sys.stderr.write(f"INFO Coordinator: lease {lease.id} (rows {lease.rows[0]}-{lease.rows[1]} of {lease.urls[0]}) from agent {lease.holder} returned to the queue\n")
+			lease.holder = None
+			self.pending.insert(0, lease)
+			self.condition.notify_all()
+
+	def close(self):
+		"""ends the scan early (or after it finished), telling agents that ask for a lease it is done"""
+		with self.condition:
+			self.finished.set()
+			self.condition.notify_all()
+		self.server.close()
+		# give agents waiting for a lease (up to 5 seconds) to be told, so they exit cleanly instead of seeing the connection drop
+		deadline = time.monotonic() + 5
+		for t in self.handlers:
+			t.join(max(0, deadline - time.monotonic()))
+
+
+
+class Agent:
+	"""the other end of a Coordinator (--agent): scans each lease it is handed with the usual Filler/Worker pipeline, streaming the results back as they arrive
+	only the options in RequestInjector.agent_options are taken from the coordinator, files (wordlists, body template, match file and cache) are always this agent's own, and it refuses to scan unless its wordlists have as many rows as the coordinator's"""
+	def __init__(self, address, secret, wordlist, body_template="", match_file="", cache_dir=None):
+		self.address = Coordinator.address(address)
+		self.secret = secret # bytes the coordinator must also have, see readSecret()
+		self.local = dict(wordlist=wordlist, body_template=body_template, match_file=match_file, cache_dir=cache_dir)
+		self.lock = threading.Lock() # results and heartbeats are sent from different threads
+		self.stopped = threading.Event() # set once the connection is closed or lost
+		# kept from one lease to the next, each scanned by a fresh RequestInjector
+		self.fingerprints = {} # lease URLs --> calibrated fingerprints, so each target is calibrated once
+		self.offsets = {} # first row of a lease --> its byte offset in each plain-text wordlist, see configure()
+		self.template = None
+		self.patterns = None
+
+	def send(self, message):
+		with self.lock:
+			Coordinator.send(self.sock, message)
+
+	def beat(self, interval):
+		"""tells the Coordinator this agent is alive, also while a lease produces no results"""
+		while not self.stopped.wait(interval):
+			try:
+				self.send({"type": "heartbeat"})
+			except OSError:
+				return
+
+	def forward(self, lease, results, cancel):
+		"""streams a lease's results to the Coordinator, taking the Drainer's place
+		if the connection is lost the scan is cancelled, and the results still in flight are dropped so it can finish"""
+		while True:
+			r = results.get()
+			if r is None:
+				break
+			if not self.stopped.is_set():
+				try:
+					self.send({"type": "result", "lease": lease, "result": r.asDict()})
+				except OSError:
+					self.stopped.set()
+					cancel.set()
+			results.task_done()
+
+	def makeInjector(self) -> "RequestInjector":
+		return(RequestInjector(url=None, **self.options, **self.local))
+
+	def configure(self, config):
+		"""takes the allowed options from the coordinator's config, and checks this agent's files match the coordinator's"""
+		self.options = {name: value for name, value in config["options"].items() if name in RequestInjector.agent_options}
+		files = sorted(name for name in ("body_template", "match_file") if self.local[name])
+		if files != sorted(config["files"]):
+			print(f"Error: the coordinator scans with {', '.join(config['files']) or 'no --body_template or --match_file'}, this agent with {', '.join(files) or 'neither'}")
+			sys.exit(1)
+		probe = self.makeInjector()
+		rows = probe.countRows()
+		if rows != config["rows"]:
+			print(f"Error: the coordinator's wordlist(s) have {config['rows']} rows, this agent's {rows}")
+			sys.exit(1)
+		# one pass over the wordlists finds where every possible lease starts, so each lease seeks straight to its rows instead of reading the files from the top
+		starts = list(range(0, rows, config["lease_size"]))
+		self.offsets = dict(zip(starts, probe.rowOffsets(starts) or []))
+
+	def scan(self, lease):
+		"""runs one lease, its rows against its URLs, with a fresh RequestInjector (so no state or metrics pile up) given the fingerprints and compiled files of earlier leases"""
+		key = tuple(lease["urls"])
+		injector = self.makeInjector()
+		injector.url = lease["urls"]
+		injector.rows = tuple(lease["rows"])
+		injector.offsets = self.offsets.get(injector.rows[0])
+		injector.fingerprints = self.fingerprints.get(key)
+		injector.template = self.template
+		injector.patterns = self.patterns
+		results = queue.Queue(maxsize=injector.queue_size)
+		injector.results = results
+		injector.cancel = threading.Event()
+		sender = threading.Thread(target=self.forward, args=(lease["id"], results, injector.cancel), daemon=True)
+		sender.name = "AgentSender"
+		sender.start()
+		try:
+			injector.run()
+		finally:
+			results.put(None)
+			sender.join()
+		if injector.fingerprints is not None:
+			self.fingerprints[key] = injector.fingerprints
+		self.template = injector.template
+		self.patterns = injector.patterns
+		if self.stopped.is_set():
+			raise ConnectionError("connection closed while sending results")
+
+	def run(self):
+		"""connects to the Coordinator and scans the leases it hands out until it says the scan is done"""
+		try:
+			self.sock = socket.create_connection(self.address)
+		except OSError as e:
+			print(f"Error: could not connect to coordinator {self.address[0]}:{self.address[1]} ({e.strerror})")
+			sys.exit(1)
+		reader = self.sock.makefile("rb")
+		try:
+			challenge = Coordinator.receive(reader)
+			if challenge is None or challenge.get("type") != "challenge":
+				raise ConnectionError("connection closed by the coordinator")
+			nonce = os.urandom(16).hex()
+			self.send({"type": "hello", "name": socket.gethostname(), "nonce": nonce, "mac": Coordinator.sign(self.secret, "agent", challenge["nonce"])})
+			config = Coordinator.receive(reader)
+			if config is None:
+				raise ConnectionError("connection closed by the coordinator (is the shared secret the same?)")
+			if not Coordinator.verify(self.secret, "coordinator", nonce, config.get("mac")):
+				print(f"Error: coordinator {self.address[0]}:{self.address[1]} does not know the shared secret")
+				sys.exit(1)
+			self.configure(config)
+			beat = threading.Thread(target=self.beat, args=(config["heartbeat"],), daemon=True)
+			beat.name = "AgentHeartbeat"
+			beat.start()
+			while True:
+				self.send({"type": "next"})
+				message = Coordinator.receive(reader)
+				if message is None or message["type"] == "done":
+					break
+				sys.stderr.write(f"INFO Agent: scanning lease {message['id']} (rows {message['rows'][0]}-{message['rows'][1]} of {message['urls'][0]})\n")
+				self.scan(message)
+				self.send({"type": "finished", "lease": message["id"]})
+		except OSError as e:
+			print(f"Error: lost the connection to the coordinator {self.address[0]}:{self.address[1]} ({e.strerror or e})")
+			sys.exit(1)
+		except (ValueError, KeyError, TypeError) as e:
+			print(f"Error: unexpected message from the coordinator {self.address[0]}:{self.address[1]} ({e or type(e).__name__})")
+			sys.exit(1)
+		finally:
+			self.stopped.set()
+			self.sock.close()
+
+
+
+#================================================
+#
+# Primary Object
+#
+#================================================
+
+
+
+class RequestInjector:
+	"""main handler to dispatch threaded objects"""
+	# attributes left out of the copy a --processes child gets, see __getstate__()
+	process_local = ("metrics", "dns")
+	# the arguments a --coordinator sends to each --agent, and the only ones an agent accepts: everything that decides which requests are sent and how (URLs and rows come with each lease, output stays with the coordinator)
+	# never a file path, the agent reads its own wordlists, body template and match file (see Agent)
+	agent_options = ("staticargs", "injectkeys", "longest", "fillvalue", "delay", "mode", "attacktype", "threads", "headers", "proxy", "retries", "url_encode", "pool_connections", "pool_maxsize", "engine", "queue_size", "wordlist_cache", "trust_length", "max_body", "head_first", "calibrate", "calibrate_words", "fingerprint_bytes", "rate", "host_rate", "adaptive", "latency_target", "cooldown", "dedup", "body_encoding", "method", "pipeline_depth", "dns_ttl", "warmup", "match_first", "timeout", "adaptive_timeout", "timeout_min", "timeout_max", "retry_failed", "retry_backoff")
+
+	def __init__(self, url, wordlist, staticargs, injectkeys, longest, fillvalue, delay=0.0, mode="path", attacktype=None, threads=5, mutate=False, headers={}, proxy={}, retries=None, url_encode=False, simple_output=False, color=False, pool_connections=10, pool_maxsize=10, engine="thread", queue_size=10000, wordlist_cache=False, cache_dir=None, processes=1, trust_length=False, max_body=0, head_first=False, calibrate=False, calibrate_words=3, fingerprint_bytes=512, rate=0.0, host_rate=0.0, adaptive=False, latency_target=None, cooldown=30.0, output_file="", output_format="text", state="", resume=False, targets="", progress=0.0, metrics_file="", metrics_port=0, recurse=0, dedup=False, body_template="", body_encoding="raw", method="POST", pipeline_depth=8, dns_ttl=300.0, warmup=True, match_file="", match_first=False, timeout=3.0, adaptive_timeout=False, timeout_min=1.0, timeout_max=10.0, retry_failed=0, retry_backoff=1.0, store_file="", prioritize=False, coordinator="", secret=b"", lease_size=1000, lease_timeout=30.0):
+		self.wordlist = wordlist
+		self.mode = mode
+		self.attacktype = attacktype
+		self.staticargs = staticargs
+		self.injectkeys = injectkeys
+		self.longest = longest
+		self.fillvalue = fillvalue
+		self.delay = delay
+		self.threads = threads
+		self.mutate = mutate
+		self.targets = targets
+		# convert the url (and every --targets url) to a list of url(s)
+		# TODO - self.url depends on the mode, and ProcessUrl should be called in the handlers
+		self.url = []
+		seen = set()
+		for u in self.readTargets(url):
+			for v in ProcessUrl(url=u, mutate=self.mutate, mode=self.mode).output:
+				if v not in seen:
+					seen.add(v)
+					self.url.append(v)
+		self.headers = headers
+		self.proxy = proxy
+		self.retries = retries
+		self.url_encode = url_encode
+		self.simple_output = simple_output
+		self.color = color
+		self.pool_connections = pool_connections
+		self.pool_maxsize = pool_maxsize
+		self.engine = engine
+		self.queue_size = queue_size
+		self.wordlist_cache = wordlist_cache
+		self.cache_dir = cache_dir
+		self.processes = processes
+		self.trust_length = trust_length
+		self.max_body = max_body
+		self.head_first = head_first
+		self.calibrate = calibrate
+		self.calibrate_words = calibrate_words
+		self.fingerprint_bytes = fingerprint_bytes
+		self.fingerprints = None # filled in by runCalibration()
+		self.rate = rate
+		self.host_rate = host_rate
+		self.adaptive = adaptive
+		self.latency_target = latency_target
+		self.cooldown = cooldown
+		self.output_file = output_file
+		self.output_format = output_format
+		self.state = state
+		self.resume = resume
+		self.progress = progress
+		self.metrics_file = metrics_file
+		self.metrics_port = metrics_port
+		self.metrics = Metrics() # counters of every thread in this process
+		self.recurse = recurse
+		self.dedup = dedup or recurse > 0
+		self.body_template = body_template
+		self.body_encoding = body_encoding
+		self.method = method
+		self.template = None # the compiled BodyTemplate in body mode, set by run()
+		self.pipeline_depth = pipeline_depth
+		self.dns_ttl = dns_ttl
+		self.warmup = warmup
+		self.match_file = match_file
+		self.match_first = match_first
+		self.patterns = None # the compiled --match_file PatternSet, set by run()
+		self.timeout = timeout
+		self.adaptive_timeout = adaptive_timeout
+		self.timeout_min = timeout_min
+		self.timeout_max = timeout_max
+		self.retry_failed = retry_failed
+		self.retry_backoff = retry_backoff
+		self.store_file = store_file
+		self.prioritize = prioritize
+		self.priority = None # words placed first with --prioritize, read from the store by openStore()
+		self.coordinator = coordinator
+		self.secret = secret # shared with every --agent, see readSecret()
+		self.lease_size = lease_size
+		self.lease_timeout = lease_timeout
+		self.rows = None # (start, end) word/row numbers of this --processes child's shard (see shardRanges()), or of the lease an --agent is scanning (see Agent.scan())
+		self.offsets = None # byte offset of the shard's first row in each plain-text wordlist, see shardRanges()
+		# the following are set on the copy of this object that runs inside each --processes child, see runShard()
+		self.shard = None
+		self.queueout = None
+		self.shared_bad_domains = None
+		self.shared_lock = None
+		self.shared_metrics = None
+		self.checkpoint = None # set by run() when using --state
+		self.dns = None # DnsCache set by run() when using --dns_ttl, see startDnsCache()
+		self.results = None # the queue a ResultStream reads, in place of the Drainer, see iterResults()
+		self.cancel = None # Event that stops the Filler and Workers early, set by ResultStream.close()
+
+	def __getstate__(self) -> dict:
+		"""the copy of this object sent to each --processes child, which the spawn and forkserver start methods pickle
+		attributes holding locks, connections or threads belong to this process only, and the child starts with fresh ones"""
+		state = self.__dict__.copy()
+		for name in self.process_local:
+			state[name] = None
+		return(state)
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.metrics = Metrics()
+
+	def readTargets(self, url) -> list:
+		"""returns the -u url followed by each url in the --targets file (one per line, blank lines and # comments skipped)"""
+		urls = []
+		if url:
+			urls.append(url)
+		if self.targets:
+			try:
+				with open(self.targets, "r") as f:
+					for line in f:
+						line = line.strip()
+						if len(line) > 0 and not line.startswith("#"):
+							urls.append(line)
+			except OSError as e:
+				print(f"Error: could not read targets file {self.targets} ({e.strerror})")
+				sys.exit(1)
+		return(urls)
+
+	def preflightChecks(self):
+		"""sanity checks for various mode requirements"""
+		# check that there is something to scan
+		if not self.url:
+			print("Error: no URL provided (-u/--url URL or --targets FILE)")
+			sys.exit(1)
+		# check that mode is approved
+		if not self.mode in ["path", "arg", "body"]:
+			print("Error: mode not one of: path, arg, body")
+			sys.exit(1)
+		# checks for path mode
+		if not self.wordlist and self.mode == "path":
+			print("Error: mode set to path, but no wordlist provided (-w/--wordlist WORDLIST)")
+			sys.exit(1)
+		# checks for arg mode attacktypes
+		if self.mode in ["arg", "body"] and not self.attacktype in ["shotgun", "trident", "clusterbomb"]:
+			print("Error: attacktype not one of: shotgun, trident, clusterbomb")
+			sys.exit(1)
+		if self.mode in ["arg", "body"] and self.attacktype == "clusterbomb" and len(self.wordlist) != len(self.injectkeys):
+			print("Error: the clusterbomb attacktype needs one wordlist per key (-K KEY1,KEY2 -w WORDLIST1,WORDLIST2)")
+			sys.exit(1)
+		# checks for body mode
+		if self.mode == "body" and not self.body_template:
+			print("Error: mode set to body, but no body template provided (--body_template FILE)")
+			sys.exit(1)
+		if self.mode == "body" and not [k for k in self.injectkeys if len(k.strip()) > 0]:
+			print("Error: mode set to body, but no keys provided (-K KEY1,KEY2 with {{KEY1}} {{KEY2}} in the body template)")
+			sys.exit(1)
+		if self.mode == "body" and not self.body_encoding in BodyTemplate.encodings:
+			print("Error: body encoding not one of: raw, json, url")
+			sys.exit(1)
+		# check that if --longest is used, --fillvalue VALUE is also specified
+		if self.longest and self.fillvalue == "":
 			print("Error: --longest was specified, but no filler value was provided for inevitable nulls (-F/--fillvalue VALUE)")
 			sys.exit(1)
+		# check that the engine is approved, and that its requirements are installed
+		if not self.engine in ["thread", "async", "pipeline"]:
+			print("Error: engine not one of: thread, async, pipeline")
+			sys.exit(1)
+		if self.engine == "async" and aiohttp is None:
+			print("Error: --engine async requires the aiohttp package (pip install aiohttp)")
+			sys.exit(1)
+		if self.engine == "pipeline" and self.mode != "path":
+			print("Error: --engine pipeline is only available in path mode")
+			sys.exit(1)
+		if self.engine == "pipeline" and (self.proxy or self.head_first):
+			print("Error: --engine pipeline cannot be combined with -p/--proxy or --head_first")
+			sys.exit(1)
+		if self.timeout <= 0:
+			print("Error: --timeout must be greater than 0")
+			sys.exit(1)
+		if self.adaptive_timeout and not 0 < self.timeout_min <= self.timeout_max:
+			print("Error: --timeout_min must be greater than 0, and no greater than --timeout_max")
+			sys.exit(1)
+		if self.prioritize and not self.store_file:
+			print("Error: --prioritize requires --store FILE")
+			sys.exit(1)
+		if self.prioritize and self.mode != "path":
+			print("Error: --prioritize is only available in path mode")
+			sys.exit(1)
+		if self.prioritize and self.state:
+			print("Error: --prioritize cannot be combined with --state, the word order changes as the store grows")
+			sys.exit(1)
+		# checks for --coordinator, which hands the scan to --agent processes instead of running it here
+		if self.coordinator and (self.processes > 1 or self.recurse or self.state or self.prioritize):
+			print("Error: --coordinator cannot be combined with --processes, --recurse, --state or --prioritize")
+			sys.exit(1)
+		if self.coordinator and (self.lease_size < 1 or self.lease_timeout <= 0):
+			print("Error: --lease_size must be 1 or greater, and --lease_timeout greater than 0")
+			sys.exit(1)
+		if self.coordinator:
+			try:
+				Coordinator.address(self.coordinator)
+			except ValueError:
+				print(f"Error: --coordinator {self.coordinator} is not [HOST:]PORT")
+				sys.exit(1)
+		if self.coordinator and not self.secret:
+			print("Error: --coordinator needs a shared secret, which every --agent must also have (--secret_file FILE or the REQUESTINJECTOR_SECRET environment variable)")
+			sys.exit(1)
+		if self.retry_failed < 0 or self.retry_backoff < 0:
+			print("Error: --retry_failed and --retry_backoff must be 0 or greater")
+			sys.exit(1)
+		if self.dns_ttl < 0:
+			print("Error: --dns_ttl must be 0 (off) or greater")
+			sys.exit(1)
+		if self.match_first and not self.match_file:
+			print("Error: --match_first requires --match_file FILE")
+			sys.exit(1)
+		if self.match_file and self.head_first:
+			print("Error: --match_file cannot be combined with --head_first")
+			sys.exit(1)
+		if self.pipeline_depth < 1:
+			print("Error: --pipeline_depth must be 1 or greater")
+			sys.exit(1)
+		if self.queue_size < 0:
+			print("Error: --queue_size must be 0 (unbounded) or greater")
+			sys.exit(1)
+		if self.processes < 1:
+			print("Error: --processes must be 1 or greater")
+			sys.exit(1)
+		if not self.output_format in ["text", "jsonl", "csv"]:
+			print("Error: output format not one of: text, jsonl, csv")
+			sys.exit(1)
+		# checks for --recurse, which scans each level in turn within one process
+		if self.recurse < 0:
+			print("Error: --recurse must be 0 (off) or greater")
+			sys.exit(1)
+		if self.recurse and self.mode != "path":
+			print("Error: --recurse is only available in path mode")
+			sys.exit(1)
+		if self.recurse and (self.processes > 1 or self.state):
+			print("Error: --recurse cannot be combined with --processes or --state")
+			sys.exit(1)
+		if self.progress < 0:
+			print("Error: --progress must be 0 (off) or greater")
+			sys.exit(1)
+		if self.rate < 0 or self.host_rate < 0:
+			print("Error: --rate and --host_rate must be 0 (unlimited) or greater")
+			sys.exit(1)
+		# checks for --state/--resume, done here in the parent process so a mismatch is reported before any shard starts
+		if self.resume and not self.state:
+			print("Error: --resume was specified, but no state file was provided (--state FILE)")
+			sys.exit(1)
+		if self.resume and not self.shard:
+			shards = [None]
+			if self.processes > 1:
+				shards = [(i, self.processes) for i in range(self.processes)]
+			for shard in shards:
+				if self.makeCheckpoint(shard).read() is None:
+					print(f"Error: --resume was specified, but {self.statePath(shard)} is missing or was saved by a scan with different URLs, wordlists or options")
+					sys.exit(1)
 		# TODO - ADD MODE HANDLERS HERE SO run() CAN DISPATCH THESE FOR READABILITY
 
+	def compileTemplate(self) -> BodyTemplate:
+		"""compiles the --body_template file once, for the Fillers and calibration of this process"""
+		try:
+			template = BodyTemplate(self.body_template, self.injectkeys, encoding=self.body_encoding)
+		except OSError as e:
+			print(f"Error: could not read body template {self.body_template} ({e.strerror})")
+			sys.exit(1)
+		if not template.slots:
+			print(f"Error: none of the keys appear in the body template {self.body_template} (as {{{{KEY}}}})")
+			sys.exit(1)
+		return(template)
+
+	def compilePatterns(self) -> PatternSet:
+		"""compiles the --match_file patterns once, for every Worker of this process"""
+		try:
+			patterns = PatternSet(self.match_file)
+		except OSError as e:
+			print(f"Error: could not read match file {self.match_file} ({e.strerror})")
+			sys.exit(1)
+		except (re.error, UnicodeDecodeError) as e:
+			print(f"Error: invalid pattern in match file {self.match_file} ({e})")
+			sys.exit(1)
+		if len(patterns) == 0:
+			print(f"Error: no patterns found in match file {self.match_file}")
+			sys.exit(1)
+		return(patterns)
+
+	def openStore(self) -> ResultStore:
+		"""opens the --store database and records the start of this scan, reading the --prioritize word order first so it only reflects earlier scans"""
+		try:
+			store = ResultStore(self.store_file)
+			if self.prioritize:
+				self.priority = store.priority(self.url)
+			store.begin(self.mode, self.url, self.wordlist)
+		except sqlite3.Error as e:
+			print(f"Error: could not open result store {self.store_file} ({e})")
+			sys.exit(1)
+		return(store)
+
+	def fillerKwargs(self, queuein) -> dict:
+		"""arguments shared by every Filler type"""
+		return(dict(queue=queuein, wordlist=self.wordlist, injectkeys=self.injectkeys, staticargs=self.staticargs, longest=self.longest, fillvalue=self.fillvalue, wordlist_cache=self.wordlist_cache, cache_dir=self.cache_dir, checkpoint=self.checkpoint, metrics=self.metrics, template=self.template, priority=self.priority, cancel=self.cancel, rows=self.rows, offsets=self.offsets))
+
+	def statePath(self, shard) -> str:
+		"""each --processes child keeps its own state file, FILE.0, FILE.1 etc"""
+		if shard:
+			return(f"{self.state}.{shard[0]}")
+		return(self.state)
+
+	def makeCheckpoint(self, shard) -> Checkpoint:
+		"""the saved word/row numbers only mean something for the same URLs, wordlists and options that decide the order words are read in"""
+		signature = dict(url=self.url, mode=self.mode, attacktype=self.attacktype, wordlist=self.wordlist, injectkeys=self.injectkeys, staticargs=self.staticargs, longest=self.longest, fillvalue=self.fillvalue, wordlist_cache=self.wordlist_cache, shard=shard)
+		if self.mode == "body":
+			signature.update(body_template=self.body_template, body_encoding=self.body_encoding)
+		return(Checkpoint(self.statePath(shard), signature))
+
+	def makeRateLimiter(self) -> RateLimiter:
+		"""the --rate/--host_rate limiter shared by calibration and every Worker in this process (None when unlimited)"""
+		if not (self.rate or self.host_rate):
+			return(None)
+		return(RateLimiter(rate=self.rate, host_rate=self.host_rate))
+
+	def startWorkers(self, workerclass, asyncworkerclass, queuein, queueout, seen=None, recursion=None, ratelimiter=None) -> list:
+		"""starts the request workers for the selected engine and returns the started thread objects"""
+		workers = []
+		# one controller shared by every Worker in this process (and one limiter, see makeRateLimiter())
+		controller = None
+		if self.adaptive:
+			controller = ConcurrencyController(self.threads, latency_target=self.latency_target)
+		timeouts = None
+		if self.adaptive_timeout:
+			timeouts = TimeoutEstimator(default=self.timeout, minimum=self.timeout_min, maximum=self.timeout_max)
+		retry = None
+		if self.retry_failed:
+			retry = RetryScheduler(self.retry_failed, backoff=self.retry_backoff)
+		breaker = CircuitBreaker(threshold=self.retries or 1, cooldown=self.cooldown, shared=self.shared_bad_domains, shared_lock=self.shared_lock)
+		kwargs = dict(queuein=queuein, queueout=queueout, delay=self.delay, urls=self.url, headers=self.headers, proxy=self.proxy, retries=self.retries, pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, breaker=breaker, trust_length=self.trust_length, max_body=self.max_body, head_first=self.head_first, fingerprints=self.fingerprints, fingerprint_bytes=self.fingerprint_bytes, ratelimiter=ratelimiter, controller=controller, checkpoint=self.checkpoint, metrics=self.metrics, seen=seen, recursion=recursion, method=self.method, warmup=self.warmup, dns=self.dns, patterns=self.patterns, match_first=self.match_first, timeout=self.timeout, timeouts=timeouts, retry=retry, cancel=self.cancel)
+		if self.engine == "async":
+			# a single thread runs the event loop, and -t/--threads becomes the number of concurrent requests
+			w = asyncworkerclass(concurrency=self.threads, **kwargs)
+			w.name = "AsyncWorker"
+			w.start()
+			workers.append(w)
+		elif self.engine == "pipeline":
+			# every PipelineWorker keeps its own connection to each host, and they share the hosts found to mishandle pipelining
+			fallback = set()
+			for i in range(self.threads):
+				w = PipelineWorker(pipeline_depth=self.pipeline_depth, pipeline_fallback=fallback, **kwargs)
+				w.name = f"PipelineWorker-{i}"
+				w.start()
+				workers.append(w)
+		else:
+			for i in range(self.threads):
+				w = workerclass(**kwargs)
+				w.name = f"Worker-{i}"
+				#print(f"starting Worker-{i}")
+				w.start()
+				workers.append(w)
+		return(workers)
+
+	def stopThreads(self, queuein, workers, queueout, drainer):
+		"""lets the Workers and the Drainer of a finished scan return, instead of waiting on empty queues for the life of the process (see iterResults())"""
+		# one end marker per Worker, each takes exactly one before returning
+		for w in workers:
+			queuein.put(None)
+		if drainer is not None:
+			queueout.put(None)
+			drainer.join()
+
+	def warmWorkers(self, workers):
+		"""waits (up to 10 seconds) for every Worker to open its connections, before the Filler is started"""
+		deadline = time.monotonic() + 10
+		for w in workers:
+			w.warmed.wait(max(0, deadline - time.monotonic()))
+
+	def startDnsCache(self):
+		"""resolves every host once and serves later lookups from a DnsCache for --dns_ttl seconds (returns None when it is off)"""
+		if not self.dns_ttl:
+			return(None)
+		dns = DnsCache(ttl=self.dns_ttl)
+		dns.resolve(self.url)
+		return(dns)
+
+	def calibrationItem(self, word) -> str:
+		"""formats a random calibration word the way this mode's Filler would"""
+		if self.mode == "arg":
+			return(ArgTemplate([k for k in self.injectkeys if len(k.strip()) > 0], self.staticargs).fill(word))
+		if self.mode == "body":
+			return(self.template.fill(word))
+		return(word)
+
+	def runCalibration(self, urls=None, ratelimiter=None) -> dict:
+		"""soft-404 calibration phase, run once before any Filler starts (and for each new --recurse level), through the scan's rate limiter"""
+		workerclass = PathWorker
+		if self.mode == "arg":
+			workerclass = ArgWorker
+		elif self.mode == "body":
+			workerclass = BodyWorker
+		w = workerclass(headers=self.headers, proxy=self.proxy, head_first=self.head_first, fingerprint_bytes=self.fingerprint_bytes, method=self.method, timeout=self.timeout, ratelimiter=ratelimiter, dns=self.dns)
+		w.name = "Calibrator"
+		return(Calibrator(w, urls or self.url, words=self.calibrate_words, itemmaker=self.calibrationItem).run())
+
+	def makeDrainer(self, queueout, store=None):
+		"""builds the output thread, which also records every result in store (--store)"""
+		d = Drainer(queueout, simple_output=self.simple_output, color=self.color, output_file=self.output_file, output_format=self.output_format, metrics=self.metrics, store=store)
+		d.name = "Drainer"
+		return(d)
+
+	def countRows(self) -> int:
+		"""number of rows the Filler will read, for the progress ETA; with --wordlist_cache (and always for clusterbomb) that is the length of the compiled, deduplicated wordlists"""
+		def count(fname, dedup=True):
+			if self.wordlist_cache:
+				w = CompiledWordlist(fname, cache_dir=self.cache_dir, dedup=dedup)
+				n = len(w)
+				w.close()
+				return(n)
+			n = 0
+			last = b"\n"
+			with open(fname, "rb") as f:
+				for chunk in iter(lambda: f.read(1048576), b""):
+					n += chunk.count(b"\n")
+					last = chunk[-1:]
+			if last != b"\n":
+				n += 1 # no newline after the last row
+			return(n)
+		try:
+			if self.mode in ["arg", "body"] and self.attacktype == "clusterbomb":
+				with PayloadSpace(self.wordlist, cache_dir=self.cache_dir) as space:
+					return(len(space))
+			if self.mode in ["arg", "body"] and self.attacktype == "trident":
+				counts = [count(fname, dedup=False) for fname in self.wordlist]
+				if self.longest:
+					return(max(counts))
+				return(min(counts))
+			return(count(self.wordlist[0]))
+		except OSError:
+			return(None)
+
+	def startReporter(self):
+		"""starts the metrics Reporter if --progress, --metrics_file or --metrics_port asked for one"""
+		if not (self.progress or self.metrics_file or self.metrics_port):
+			return(None)
+		r = Reporter(self.metrics, interval=self.progress or 5.0, progress=bool(self.progress), metrics_file=self.metrics_file, metrics_port=self.metrics_port, total=self.countRows, shared=self.shared_metrics, shard=self.shard)
+		r.start()
+		return(r)
+
+	@staticmethod
+	def lineOffsets(fname, rows) -> list:
+		"""byte offsets at which the (ascending) line numbers rows start in fname, the file size for rows past its end"""
+		offsets = []
+		line = 0
+		pos = 0
+		with open(fname, "rb") as f:
+			for chunk in iter(lambda: f.read(1048576), b""):
+				lines = chunk.count(b"\n")
+				start = 0
+				# chunks before the next wanted row are only counted
+				while len(offsets) < len(rows) and rows[len(offsets)] <= line + lines:
+					while line < rows[len(offsets)]:
+						start = chunk.index(b"\n", start) + 1
+						line += 1
+						lines -= 1
+					offsets.append(pos + start)
+				line += lines
+				pos += len(chunk)
+				if len(offsets) == len(rows):
+					break
+		return(offsets + [pos] * (len(rows) - len(offsets)))
+
+	def shardRanges(self) -> list:
+		"""splits the rows into self.processes contiguous (start, end) ranges, each with the byte offset it starts at in every plain-text wordlist, so each process seeks straight to its own part of the files and they are read once in total
+		the last range runs to the end, covering any rows countRows() does not see"""
+		total = self.countRows() or 0
+		starts = [total * i // self.processes for i in range(self.processes)]
+		ranges = [(start, end) for start, end in zip(starts, starts[1:] + [None])]
+		offsets = self.rowOffsets(starts)
+		if offsets is None:
+			return([(rows, None) for rows in ranges])
+		return(list(zip(ranges, offsets)))
+
+	def rowOffsets(self, starts) -> list:
+		"""the byte offset of each of the (ascending) row numbers starts in every plain-text wordlist the Filler reads, for Filler.offsets
+		None when there is nothing to seek (the compiled cache and the clusterbomb payload space are indexed by row number already) or a wordlist cannot be read"""
+		if self.wordlist_cache or self.attacktype == "clusterbomb":
+			return(None)
+		wordlists = self.wordlist[:1]
+		if self.mode in ["arg", "body"] and self.attacktype == "trident":
+			wordlists = self.wordlist
+		try:
+			offsets = [self.lineOffsets(fname, starts) for fname in wordlists]
+		except OSError:
+			return(None)
+		return([[o[i] for o in offsets] for i in range(len(starts))])
+
+	def runSharded(self, store=None):
+		"""splits the wordlist into self.processes contiguous shards (see shardRanges()), each scanned by its own process with its own Filler/Worker set, while this process drains every result into one output stream, in the order they complete"""
+		# results from every process go through one queue to a single Drainer, so lines are never interleaved
+		queueout = self.results
+		if queueout is None:
+			queueout = multiprocessing.JoinableQueue(maxsize=self.queue_size)
+		# per-domain failure counts are shared so a dead host is given up on by every process's CircuitBreaker, not each one separately
+		manager = multiprocessing.Manager()
+		shared_bad_domains = manager.dict()
+		shared_lock = manager.Lock()
+		# each child pushes its metrics snapshot here, and this process's Reporter adds them up
+		self.shared_metrics = manager.dict()
+		self.metrics.watch("queueout", queueout)
+		reporter = self.startReporter()
+		# a threading.Event cannot reach another process, so the children are given a multiprocessing.Event that is set along with it
+		cancel = self.cancel
+		if isinstance(cancel, threading.Event):
+			self.cancel = multiprocessing.Event()
+		procs = []
+		try:
+			for i, (rows, offsets) in enumerate(self.shardRanges()):
+				p = multiprocessing.Process(target=runShard, args=(self, (i, self.processes), rows, offsets, queueout, shared_bad_domains, shared_lock, self.shared_metrics), daemon=True)
+				p.name = f"Shard-{i}"
+				p.start()
+				procs.append(p)
+		finally:
+			children = self.cancel
+			self.cancel = cancel
+		d = None
+		if self.results is None:
+			d = self.makeDrainer(queueout, store)
+			d.start()
+		for p in procs:
+			while p.is_alive():
+				if cancel is not None and cancel.is_set():
+					children.set()
+				p.join(0.1)
+		queueout.join()
+		if reporter:
+			reporter.finish()
+		self.stopThreads(queueout, [], queueout, d)
+		manager.shutdown()
+
+	def agentConfig(self, rows) -> dict:
+		"""the arguments each --agent builds its own RequestInjector from, with what it checks its own files against (the number of wordlist rows, and which optional files are used), and the lease size its leases start at multiples of"""
+		options = {name: getattr(self, name) for name in self.agent_options}
+		files = [name for name in ("body_template", "match_file") if getattr(self, name)]
+		return({"options": options, "rows": rows, "files": files, "lease_size": self.lease_size})
+
+	def makeLeases(self, rows) -> list:
+		"""splits the scan into leases of lease_size rows against the URLs of one host, each row range offered for every host before the next one, so agents spread across hosts"""
+		groups = {}
+		for u in self.url:
+			groups.setdefault(urlparse(u).netloc, []).append(u)
+		leases = []
+		for start in range(0, rows, self.lease_size):
+			for urls in groups.values():
+				leases.append(Lease(len(leases), urls, (start, min(start + self.lease_size, rows))))
+		return(leases)
+
+	def runCoordinator(self, store=None):
+		"""serves the leases of the scan to --agent processes and drains the results they stream back, without sending any request from this process"""
+		rows = self.countRows()
+		if rows is None:
+			print("Error: --coordinator could not read the wordlist(s) to split the scan into leases")
+			sys.exit(1)
+		queueout = self.results
+		if queueout is None:
+			queueout = queue.Queue(maxsize=self.queue_size)
+		self.metrics.watch("queueout", queueout)
+		try:
+			c = Coordinator(self.coordinator, self.secret, self.agentConfig(rows), self.makeLeases(rows), queueout, lease_timeout=self.lease_timeout, metrics=self.metrics)
+		except OSError as e:
+			print(f"Error: could not listen on {self.coordinator} ({e.strerror})")
+			sys.exit(1)
+		sys.stderr.write(f"INFO Coordinator: listening on {self.coordinator}, {len(c.pending)} leases of up to {self.lease_size} rows\n")
+		reporter = self.startReporter()
+		d = None
+		if self.results is None:
+			d = self.makeDrainer(queueout, store)
+			d.start()
+		c.start()
+		try:
+			# short waits, so a cancelled iterResults() consumer is noticed
+			while not c.finished.wait(0.5):
+				if self.cancel and self.cancel.is_set():
+					break
+		finally:
+			c.close()
+		queueout.join()
+		if reporter:
+			reporter.finish()
+		self.stopThreads(queueout, [], queueout, d)
+
+	def iterResults(self, buffer=1000):
+		"""runs the scan in a background thread and yields each Result as it completes, instead of printing it through the Drainer
+		at most buffer results wait to be consumed (the Workers pause while it is full), and leaving the loop early (break, or closing the generator) cancels the scan"""
+		# configuration errors are reported here, in the caller's thread, rather than ending the background scan silently
+		self.preflightChecks()
+		stream = ResultStream(self, buffer=buffer)
+		try:
+			while True:
+				r = stream.get()
+				if r is None:
+					break
+				yield(r)
+		finally:
+			stream.close()
+
+	async def aiterResults(self, buffer=1000):
+		"""async generator version of iterResults(), the event loop keeps running while waiting for results"""
+		self.preflightChecks()
+		stream = ResultStream(self, buffer=buffer)
+		loop = asyncio.get_running_loop()
+		try:
+			while True:
+				# short timeouts, so a cancelled consumer never leaves an executor thread waiting on the queue
+				try:
+					r = await loop.run_in_executor(None, stream.get, 0.1)
+				except queue.Empty:
+					continue
+				if r is None:
+					break
+				yield(r)
+		finally:
+			await loop.run_in_executor(None, stream.close)
+
 	def run(self):
 		"""dispatch threads to perform specified actions"""
 		# sanity checks first
 		self.preflightChecks()
+		if self.mode == "body" and self.template is None:
+			self.template = self.compileTemplate()
+		if self.match_file and self.patterns is None:
+			self.patterns = self.compilePatterns()
+		# results are stored by this process's Drainer, never by a --processes child (an iterResults() consumer opens its own, see ResultStream)
+		# the store is only passed down to the Drainer, never kept on self, since this object is pickled for each --processes child
+		store = None
+		if self.store_file and not self.shard and self.results is None:
+			store = self.openStore()
+		self.dns = self.startDnsCache()
+		finished = False
+		try:
+			self.dispatch(store)
+			finished = not (self.cancel and self.cancel.is_set())
+		finally:
+			self.dns = None
+			if store:
+				self.closeStore(store, finished)
+
+	def closeStore(self, store, finished):
+		"""closes the --store database at the end of the scan, marking the scan finished unless it was cancelled or failed"""
+		store.close(finished=finished)
+		sys.stderr.write(f"INFO Results stored as scan {store.scan} in {self.store_file}\n")
+
+	def dispatch(self, store=None):
+		"""runs the calibration phase, then the scan, split across --processes or in this process (or handed to --agent processes)"""
+		if self.coordinator:
+			self.runCoordinator(store)
+			return
+		# one limiter for calibration and the scan, so calibration requests are paced with the rest (each --processes child makes its own for its share of the rate)
+		ratelimiter = self.makeRateLimiter()
+		# calibrate once, before sharding, so every process filters against the same fingerprints
+		if self.calibrate and self.fingerprints is None:
+			self.fingerprints = self.runCalibration(ratelimiter=ratelimiter)
+		if self.processes > 1 and not self.shard:
+			self.runSharded(store)
+			return
 		# this queue gets filled with words from the wordlist
-		queuein = queue.Queue()
-		# this queue gets filled with the web request results
-		queueout = queue.Queue()
+		# both queues are bounded by self.queue_size (0 means unbounded), so a Filler blocks on put() once Workers fall behind, and Workers block once the Drainer falls behind
+		# memory therefore stays flat regardless of wordlist size, at roughly queue_size words plus queue_size result lines in flight
+		queuein = queue.Queue(maxsize=self.queue_size)
+		# progress is recorded per process (per shard), so a later --resume can skip every word/row already requested
+		if self.state:
+			self.checkpoint = self.makeCheckpoint(self.shard)
+			if self.resume:
+				self.checkpoint.load()
+		# this queue gets filled with the web request results (inside a --processes child, it is the parent's queue)
+		# (or the queue iterResults() reads)
+		queueout = self.queueout
+		if queueout is None:
+			queueout = self.results
+		if queueout is None:
+			queueout = queue.Queue(maxsize=self.queue_size)
+		self.metrics.watch("queuein", queuein)
+		if not self.shard:
+			self.metrics.watch("queueout", queueout)
+		reporter = self.startReporter()
+		# --dedup/--recurse state shared by every Worker
+		seen = None
+		if self.dedup:
+			seen = SeenSet()
+		recursion = None
+		if self.recurse:
+			recursion = Recursion(self.recurse, self.url)
 		# hold thread objects here to be joined
 		threads = []
 		# begin loading words into queuein using Fillers
@@ -569,53 +4314,154 @@ class RequestInjector:
 		#
 		# path mode
 		if self.mode == "path":
-			f = PathFiller(queue=queuein, wordlist=self.wordlist)
+			f = PathFiller(**self.fillerKwargs(queuein))
 			f.name = "PathFiller"
-			f.start()
-			threads.append(f)
-			for i in range(self.threads):
-				w = PathWorker(queuein=queuein, queueout=queueout, delay=self.delay, urls=self.url, headers=self.headers, proxy=self.proxy, retries=self.retries)
-				w.name = f"Worker-{i}"
-				#print(f"starting Worker-{i}")
-				w.start()
-				threads.append(w)
+			workers = self.startWorkers(PathWorker, AsyncPathWorker, queuein, queueout, seen=seen, recursion=recursion, ratelimiter=ratelimiter)
 		#
-		# arg mode
-		elif self.mode == "arg":
+		# arg mode, and body mode which builds bodies from the same attacktypes through self.template
+		elif self.mode in ["arg", "body"]:
 			#
 			# shotgun attacktype
 			if self.attacktype == "shotgun":
-				f = ArgShotgunFiller(queue=queuein, wordlist=self.wordlist, injectkeys=self.injectkeys, staticargs=self.staticargs)
+				f = ArgShotgunFiller(**self.fillerKwargs(queuein))
 				f.name = "ArgShotgunFiller"
 			#
 			# trident attacktype
 			elif self.attacktype == "trident":
 				if not self.longest:
-					f = ArgTridentFiller(queue=queuein, wordlist=self.wordlist, injectkeys=self.injectkeys, staticargs=self.staticargs)
+					f = ArgTridentFiller(**self.fillerKwargs(queuein))
 				else:
-					f = ArgTridentLongestFiller(queue=queuein, wordlist=self.wordlist, injectkeys=self.injectkeys, staticargs=self.staticargs, longest=self.longest, fillvalue=self.fillvalue)
+					f = ArgTridentLongestFiller(**self.fillerKwargs(queuein))
 				f.name = "ArgTridentFiller"
-			f.start()
-			threads.append(f)
-			for i in range(self.threads):
-				w = ArgWorker(queuein=queuein, queueout=queueout, delay=self.delay, urls=self.url, headers=self.headers, proxy=self.proxy, retries=self.retries)
-				w.name = f"Worker-{i}"
-				#print(f"starting Worker-{i}")
-				w.start()
-				threads.append(w)
+			#
+			# clusterbomb attacktype
+			elif self.attacktype == "clusterbomb":
+				f = ArgClusterbombFiller(**self.fillerKwargs(queuein))
+				f.name = "ArgClusterbombFiller"
+			if self.mode == "body":
+				workers = self.startWorkers(BodyWorker, AsyncBodyWorker, queuein, queueout, seen=seen, ratelimiter=ratelimiter)
+			else:
+				workers = self.startWorkers(ArgWorker, AsyncArgWorker, queuein, queueout, seen=seen, ratelimiter=ratelimiter)
 		#
-		# thread to handle output
-		d = Drainer(queueout, simple_output=self.simple_output, color=self.color)
-		d.name = "Drainer"
-		d.start()
-		threads.append(d)
+		# the Workers open their connections while queuein is still empty, then the Filler starts feeding them
+		self.warmWorkers(workers)
+		f.start()
+		threads = threads + [f] + workers
 		#
-		# do not join daemon threads, but do check queue sizes
+		# thread to handle output (inside a --processes child, the parent runs the Drainer, and iterResults() replaces it)
+		d = None
+		if not self.shard and self.results is None:
+			d = self.makeDrainer(queueout, store)
+			d.start()
+			threads.append(d)
+		#
+		# the Filler is the only thread that finishes on its own, wait for it to place every word (it blocks while queuein is full)
+		# otherwise queuein.join() could return early if Workers briefly empty the queue before the Filler catches up
+		# do not join the remaining daemon threads, but do check queue sizes
 		# ensure the daemon threads have finished by checking that the queues are empty
-		#print("\033[33;7mqueuein is empty\033[0m") # gold background
-		queuein.join()
-		#print("\033[33;7mqueueout is empty\033[0m") # gold background
-		queueout.join()
+		try:
+			f.join()
+			#print("\033[33;7mqueuein is empty\033[0m") # gold background
+			queuein.join()
+			# --recurse: once a pass is finished, scan the directories it found with the same wordlist, one level at a time
+			while recursion is not None and not (self.cancel and self.cancel.is_set()):
+				urls = recursion.nextLevel()
+				if not urls:
+					break
+				if self.fingerprints is not None:
+					self.fingerprints.update(self.runCalibration(urls, ratelimiter=ratelimiter))
+				for w in workers:
+					w.setUrls(urls)
+				f = PathFiller(**self.fillerKwargs(queuein))
+				f.name = "PathFiller"
+				f.start()
+				f.join()
+				queuein.join()
+			#print("\033[33;7mqueueout is empty\033[0m") # gold background
+			if not self.shard:
+				queueout.join()
+			if reporter:
+				reporter.finish()
+			self.stopThreads(queuein, workers, queueout, d)
+		except KeyboardInterrupt:
+			# record what was in flight, so --resume can send it again
+			if self.checkpoint:
+				self.checkpoint.save()
+			raise
+		if self.checkpoint:
+			# a cancelled scan is saved like an interrupted one, so --resume can finish it
+			self.checkpoint.save(finished=not (self.cancel and self.cancel.is_set()))
+
+
+
+def runShard(injector, shard, rows, offsets, queueout, shared_bad_domains, shared_lock, shared_metrics):
+	"""entrypoint of each --processes child, runs the usual Filler/Worker pipeline on one shard (range of rows) of the wordlist"""
+	# each process gets an equal share of the request rates, so the total across processes stays at --rate/--host_rate
+	injector.rate = injector.rate / shard[1]
+	injector.host_rate = injector.host_rate / shard[1]
+	injector.shard = shard
+	injector.rows = rows
+	injector.offsets = offsets
+	injector.queueout = queueout
+	injector.shared_bad_domains = shared_bad_domains
+	injector.shared_lock = shared_lock
+	injector.shared_metrics = shared_metrics
+	# a forked child inherits the parent's Metrics as is (the other start methods build a new one in __setstate__())
+	injector.metrics = Metrics()
+	injector.run()
+
+
+
+def readSecret(secret_file) -> bytes:
+	"""the secret a --coordinator and its agents authenticate each other with, read from --secret_file, or else the REQUESTINJECTOR_SECRET environment variable"""
+	if secret_file:
+		try:
+			with open(secret_file, "rb") as f:
+				return(f.read().strip())
+		except OSError as e:
+			print(f"Error: could not read --secret_file {secret_file} ({e.strerror})")
+			sys.exit(1)
+	return(os.environ.get("REQUESTINJECTOR_SECRET", "").encode("utf-8"))
+
+
+
+def printDiff(store_file, spec, output_format="text"):
+	"""prints every URL whose status differs between two scans in a --store database (--diff OLD,NEW, or last for the last finished scan and the one before it with the same URLs)"""
+	if not store_file:
+		print("Error: --diff requires --store FILE")
+		sys.exit(1)
+	try:
+		store = ResultStore(store_file)
+	except sqlite3.Error as e:
+		print(f"Error: could not open result store {store_file} ({e})")
+		sys.exit(1)
+	if spec == "last":
+		old, new = store.latest()
+		if old is None:
+			print(f"Error: {store_file} does not hold two finished scans of the same URLs")
+			sys.exit(1)
+	else:
+		try:
+			old, new = [int(i) for i in spec.split(",")]
+		except ValueError:
+			print("Error: --diff takes two scan IDs, ex. --diff 3,7, or last")
+			sys.exit(1)
+		for scan in [old, new]:
+			if not store.exists(scan):
+				print(f"Error: scan {scan} is not in {store_file}")
+				sys.exit(1)
+	sys.stderr.write(f"INFO Comparing scan {old} with scan {new}\n")
+	if output_format == "csv":
+		writer = csv.writer(sys.stdout)
+		writer.writerow(["change", "url", "old_status", "old_bytes", "new_status", "new_bytes"])
+	for change, url, old_status, old_bytes, new_status, new_bytes in store.diff(old, new):
+		if output_format == "jsonl":
+			print(json.dumps(dict(change=change, url=url, old_status=old_status, old_bytes=old_bytes, new_status=new_status, new_bytes=new_bytes)))
+		elif output_format == "csv":
+			writer.writerow([change, url, old_status, old_bytes, new_status, new_bytes])
+		else:
+			print(f"{change} status:{old_status}->{new_status} bytes:{old_bytes}->{new_bytes} url:{url}")
+	store.close(finished=False)
 
 
 
@@ -632,38 +4478,131 @@ def tool_entrypoint():
 	# collect command line arguments
 	parser = argparse.ArgumentParser(description="RequestInjector: scan a URL using one or more given wordlists with optional URL transformations")
 	# required arguments
-	req = parser.add_argument_group("required arguments")
-	req.add_argument("-u", "--url", dest="url", type=str, help="provide a URL to check", required=True)
+	req = parser.add_argument_group("required arguments (one or both)")
+	req.add_argument("-u", "--url", dest="url", type=str, help="provide a URL to check")
+	req.add_argument("--targets", dest="targets", default="", type=str, help="provide a file of URLs to check, one per line, scanned together in one process: the wordlist is read once for every target, and requests are interleaved across hosts (raise --pool_connections toward the number of hosts to keep their connections alive)")
 	# general arguments
 	gen = parser.add_argument_group("general arguments")
 	gen.add_argument("-w", "--wordlist", dest="wordlist", type=str, help="provide a wordlist (file) location, or multiple comma-separated files in a string, ex. -w /home/user/words1.txt or -w /home/user/words1.txt,/home/user/words2.txt, etc")
-	gen.add_argument("-M", "--mode", dest="mode", default="path", type=str, help="provide a mode (path|arg|body(NYI)) (default path)")
+	gen.add_argument("-M", "--mode", dest="mode", default="path", type=str, help="provide a mode (path|arg|body); body sends the -K keys' values inside --body_template FILE (default path)")
 	gen.add_argument("-H", "--headers", dest="headers", default={}, type=json.loads, help="provide a dictionary of headers to include, with single-quotes wrapping the dictionary and double-quotes wrapping the keys and values, ex. '{\"Content-Type\": \"application/json\"}' (defaults to a Firefox User-Agent and Accept: text/html) *note default is set inside PathWorker class*")
 	gen.add_argument("-p", "--proxy", dest="proxy", default={}, type=json.loads, help="provide a dictionary of proxies to use, with single-quotes wrapping the dictionary and double-quotes wrapping the keys and values, ex. '{\"http\": \"http://127.0.0.1:8080\", \"https\": \"https://127.0.0.1:8080\"}'")
 	gen.add_argument("-r", "--retries", dest="retries", default=1, type=int, help="provide the number of times to retry a connection (default 1)")
-	gen.add_argument("-t", "--threads", dest="threads", default=10, type=int, help="provide the number of threads for making requests (default 10)")
+	gen.add_argument("--cooldown", dest="cooldown", default=30.0, type=float, help="provide the number of seconds a host is skipped after failing -r/--retries times, before a single probe request is allowed to test it again (default 30.0)")
+	gen.add_argument("-t", "--threads", dest="threads", default=10, type=int, help="provide the number of threads for making requests, or the number of concurrent requests when using --engine async (default 10)")
+	gen.add_argument("--engine", dest="engine", default="thread", type=str, help="provide a request engine (thread|async|pipeline); thread uses one OS thread per in-flight request, async drives all requests from one asyncio event loop and requires aiohttp, pipeline (path mode only) writes several GET requests at a time to a raw keep-alive socket per host and thread, falling back to thread for redirects, encoded bodies and hosts that mishandle pipelining (default thread)")
+	gen.add_argument("--dns_ttl", dest="dns_ttl", default=300.0, type=float, help="provide the number of seconds host name lookups are cached for; every host is resolved once before the scan (default 300.0, 0 is off)")
+	gen.add_argument("--no_warmup", dest="no_warmup", action="store_true", help="provide to skip opening each thread's connections (TCP and TLS handshake, with a HEAD / request to each host) before the scan starts; the async engine only warms the DNS cache")
+	gen.add_argument("--pipeline_depth", dest="pipeline_depth", default=8, type=int, help="provide the number of requests written to a connection at a time when using --engine pipeline (default 8)")
+	gen.add_argument("--rate", dest="rate", default=0.0, type=float, help="provide the maximum total requests per second, shared by all threads/processes (default 0.0, unlimited)")
+	gen.add_argument("--host_rate", dest="host_rate", default=0.0, type=float, help="provide the maximum requests per second to any single host (default 0.0, unlimited)")
+	gen.add_argument("--adaptive", dest="adaptive", action="store_true", help="provide to adapt the number of in-flight requests (up to -t) to the target: halved when latency rises or 429/503/errors appear, raised by one while responses are healthy")
+	gen.add_argument("--latency_target", dest="latency_target", default=None, type=float, help="provide the smoothed response latency in seconds above which --adaptive backs off (default twice the best latency observed)")
+	gen.add_argument("--retry_failed", dest="retry_failed", default=0, type=int, help="provide the number of times a failed request is sent again; each retry waits in a queue (not a thread) for an exponential backoff with jitter, and only its last failure counts towards -r/--retries (default 0)")
+	gen.add_argument("--retry_backoff", dest="retry_backoff", default=1.0, type=float, help="provide the delay in seconds before the first --retry_failed retry, doubled for each later one up to 30 seconds, half of it random (default 1.0)")
+	gen.add_argument("--timeout", dest="timeout", default=3.0, type=float, help="provide the number of seconds to wait for a connection or response before a request fails (default 3.0)")
+	gen.add_argument("--adaptive_timeout", dest="adaptive_timeout", action="store_true", help="provide to learn separate connect and read timeouts for each host from its observed latency (smoothed latency plus four times its variation, like TCP's retransmission timeout), doubled after each timeout; --timeout is used until a host has answered")
+	gen.add_argument("--timeout_min", dest="timeout_min", default=1.0, type=float, help="provide the lowest timeout in seconds --adaptive_timeout may set (default 1.0)")
+	gen.add_argument("--timeout_max", dest="timeout_max", default=10.0, type=float, help="provide the highest timeout in seconds --adaptive_timeout may set (default 10.0)")
 	gen.add_argument("-d", "--delay", dest="delay", default=0.0, type=float, help="provide a delay between requests, per thread, as a float (default 0.0); use fewer threads and longer delays if the goal is to be less noisy, although the amount of requests will remain the same")
+	gen.add_argument("--pool_connections", dest="pool_connections", default=10, type=int, help="provide the number of per-host connection pools each thread keeps for keep-alive reuse (default 10)")
+	gen.add_argument("--pool_maxsize", dest="pool_maxsize", default=10, type=int, help="provide the maximum number of keep-alive connections each thread keeps open to a single host (default 10)")
+	gen.add_argument("--queue_size", dest="queue_size", default=10000, type=int, help="provide the maximum number of items held in each of the word and result queues; the wordlist reader blocks when the queue is full, so memory stays at roughly queue_size words plus queue_size results regardless of wordlist size; 0 is unbounded (default 10000)")
+	gen.add_argument("--wordlist_cache", dest="wordlist_cache", action="store_true", help="provide to compile each wordlist once into a normalized binary cache (stripped, with blank and duplicate words removed, except for trident) that later scans read through mmap; the cache is rebuilt when the wordlist changes")
+	gen.add_argument("--cache_dir", dest="cache_dir", default=None, type=str, help="provide a directory for --wordlist_cache files (default ~/.cache/requestinjector)")
+	gen.add_argument("--processes", dest="processes", default=1, type=int, help="provide the number of processes to split the wordlist across (a contiguous range of rows per process, so each reads only its part of the files), each running its own -t threads; results are merged into one output stream in the order they complete, not wordlist order (default 1)")
+	gen.add_argument("--trust_length", dest="trust_length", action="store_true", help="provide to report the Content-Length header as the size instead of downloading large bodies (sizetype:header in results)")
+	gen.add_argument("--max_body", dest="max_body", default=0, type=int, help="provide the maximum number of body bytes to read when measuring a response; reading stops early and the size is reported as sizetype:truncated; 0 reads the whole body (default 0)")
+	gen.add_argument("--head_first", dest="head_first", action="store_true", help="provide to send a HEAD request first, and only send the GET when the HEAD is refused or has no Content-Length")
+	gen.add_argument("--calibrate", dest="calibrate", action="store_true", help="provide to request random nonexistent words against each URL before the scan, and drop scan responses matching those wildcard/soft-404 responses (same status, similar size, same first --fingerprint_bytes of the body)")
+	gen.add_argument("--calibrate_words", dest="calibrate_words", default=3, type=int, help="provide the number of random words to request per URL when using --calibrate (default 3)")
+	gen.add_argument("--fingerprint_bytes", dest="fingerprint_bytes", default=512, type=int, help="provide the number of body bytes hashed into each --calibrate fingerprint; matching responses are dropped after reading only this many bytes (default 512)")
+	gen.add_argument("--state", dest="state", default="", type=str, help="provide a file to periodically save scan progress to (the last word/row placed and those still in flight), one file per process when using --processes")
+	gen.add_argument("--resume", dest="resume", action="store_true", help="provide to continue the scan saved in --state FILE, skipping every word/row already requested; the URLs, wordlists and mode options must match the saved scan")
+	gen.add_argument("--recurse", dest="recurse", default=0, type=int, help="provide a depth to recurse into directories found during a path mode scan (a redirect to the same URL plus a trailing slash, or 200/401/403 on a URL ending in a slash); each new directory is scanned with the same wordlist after the current pass finishes (default 0, off)")
+	gen.add_argument("--dedup", dest="dedup", action="store_true", help="provide to never request the same URL+word twice (repeated words, overlapping mutations or targets); always on with --recurse")
 	gen.add_argument("-m", "--mutate", dest="mutate", action="store_true", help="provide if mutations should be applied to the checked URL+word (currently only supports path mode, arg mode support nyi)")
 	# arg mode-specific arguments
 	ams = parser.add_argument_group("arg mode-specific arguments")
-	ams.add_argument("-T", "--attacktype", dest="attacktype", default="shotgun", type=str, help="provide an attack type (shotgun|trident); shotgun is similar to Burp Suite's sniper and battering ram modes, and trident is similar to pitchfork (default shotgun)")
+	ams.add_argument("-T", "--attacktype", dest="attacktype", default="shotgun", type=str, help="provide an attack type (shotgun|trident|clusterbomb); shotgun is similar to Burp Suite's sniper and battering ram modes, trident is similar to pitchfork, and clusterbomb requests every combination of one word from each wordlist, one wordlist per key (default shotgun)")
 	ams.add_argument("--longest", dest="longest", action="store_true", help="provide if you wish to fully exhaust the longest wordlist using the trident attacktype, and not stop when the end of shortest wordlist has been reached (zip() vis itertools.zip_longest()")
 	ams.add_argument("-F", "--fillvalue", dest="fillvalue", default="", type=str, help="provide a string to use in null values when using --longest with the trident attacktype (such as when using two wordlists of differing lengths; the fillvalue will be used when the shortest wordlist has finished, but terms are still being used from the longest wordlist)")
 	ams.add_argument("-S", "--staticargs", dest="staticargs", default="", type=str, help="provide a string of static key=value pairs to include in each request, appended to the end of the query, as a comma-separated string, ex. key1=val1,key2=val2 etc")
 	ams.add_argument("-K", "--injectkeys", dest="injectkeys", default="", type=str, help="provide a string of keys to be used; using the shotgun attacktype, each key will receive values from only the first wordlist; using the trident attacktype, each key must have a specifc wordlist specified in the matching position with the -w WORDLIST option; ex. '-T trident -K user,account,sid -w userwords.txt,accountids.txt,sids.txt'")
+	# body mode-specific arguments
+	bms = parser.add_argument_group("body mode-specific arguments")
+	bms.add_argument("--body_template", dest="body_template", default="", type=str, help="provide a file used as the request body, with {{KEY}} where each -K key's value is injected; -T/--attacktype, -w and --longest choose the values as in arg mode")
+	bms.add_argument("--body_encoding", dest="body_encoding", default="raw", type=str, help="provide how values are escaped before injection (raw|json|url); json escapes them for use inside a JSON string, url percent-encodes them for a form body (default raw)")
+	bms.add_argument("--method", dest="method", default="POST", type=str, help="provide the HTTP method used to send the body (default POST)")
 	# output arguments
 	ota = parser.add_argument_group("output arguments")
 	ota.add_argument("--color", dest="color", action="store_true", help="provide if stdout should have colorized status codes (will force simple_output format)")
 	ota.add_argument("--simple_output", dest="simple_output", action="store_true", help="provide for simplified output, just status code and URL, ex. 200 http://example.com")
+	ota.add_argument("-o", "--output", dest="output_file", default="", type=str, help="provide a file to write results to instead of stdout")
+	ota.add_argument("--progress", dest="progress", default=0.0, type=float, help="provide a number of seconds between one-line progress reports on stderr (words done, requests, errors, rate, latency, queue depths, ETA) (default 0.0, off)")
+	ota.add_argument("--metrics_file", dest="metrics_file", default="", type=str, help="provide a file to rewrite with Prometheus text-format metrics every --progress seconds (or 5), ex. for the node_exporter textfile collector")
+	ota.add_argument("--metrics_port", dest="metrics_port", default=0, type=int, help="provide a port to serve Prometheus text-format metrics on, at http://127.0.0.1:PORT/metrics, while the scan runs")
+	ota.add_argument("--match_file", dest="match_file", default="", type=str, help="provide a file of body patterns, one per line, optionally as ID<TAB>pattern; lines starting with re: are regexes, others literal strings; bodies are matched as they are read and the IDs found are reported as matches (a matches field in jsonl/csv)")
+	ota.add_argument("--match_first", dest="match_first", action="store_true", help="provide to stop reading a body at the first --match_file match (the size is then reported as sizetype:truncated)")
+	ota.add_argument("--store", dest="store_file", default="", type=str, help="provide a SQLite database to record every scan's results in (created if missing), for --prioritize and --diff")
+	ota.add_argument("--prioritize", dest="prioritize", action="store_true", help="provide to request the words that hit (any status but 404) in the --store's earlier scans of the same hosts first (at most 100000 of them), highest hit rate first, then the rest of the wordlist in order (path mode)")
+	ota.add_argument("--diff", dest="diff", default="", type=str, help="provide two scan IDs of the --store as OLD,NEW (or last, for the last finished scan and the one before it with the same URLs) to print every URL whose status changed between them, instead of scanning; only the status is compared (a change in length alone is not shown), and responses dropped as soft-404s by --calibrate are not stored, so a URL that turned into a soft-404 shows as removed")
+	ota.add_argument("--format", dest="output_format", default="text", type=str, help="provide an output format (text|jsonl|csv); jsonl and csv write one record per result, including failed and skipped requests (default text)")
+	# distributed arguments
+	dst = parser.add_argument_group("distributed arguments")
+	dst.add_argument("--coordinator", dest="coordinator", default="", type=str, help="provide a [HOST:]PORT to listen on for --agent processes (HOST defaults to 127.0.0.1, give 0.0.0.0 to accept agents from other machines), and hand them the scan in leases (a range of wordlist rows against one host's URLs) instead of sending requests from this process; results are written here as usual; traffic is not encrypted, so headers (cookies, tokens) and results can be read on the network, use an SSH tunnel or VPN across untrusted ones")
+	dst.add_argument("--agent", dest="agent", default="", type=str, help="provide the [HOST:]PORT of a --coordinator to scan leases for (HOST defaults to 127.0.0.1), with the options it sends; files are never taken from the coordinator, so give this agent its own -w (same rows as the coordinator's), and --body_template, --match_file and --cache_dir when used; other arguments are ignored")
+	dst.add_argument("--secret_file", dest="secret_file", default="", type=str, help="provide a file holding the secret a --coordinator and its agents prove to each other before any option or result is sent (default the REQUESTINJECTOR_SECRET environment variable)")
+	dst.add_argument("--lease_size", dest="lease_size", default=1000, type=int, help="provide the number of wordlist rows in each --coordinator lease (default 1000)")
+	dst.add_argument("--lease_timeout", dest="lease_timeout", default=30.0, type=float, help="provide the number of seconds an agent may go without sending anything (it sends a heartbeat every third of this) before the --coordinator drops it and hands its lease to another agent (default 30.0)")
 	# get arguments as variables
 	args = vars(parser.parse_args())
+	# --diff compares two stored scans instead of running one
+	if args["diff"]:
+		printDiff(args["store_file"], args["diff"], args["output_format"])
+		return
+	secret = readSecret(args["secret_file"])
+	# an --agent takes every other option, except its files, from its --coordinator
+	if args["agent"]:
+		if not secret:
+			print("Error: --agent needs the --coordinator's shared secret (--secret_file FILE or the REQUESTINJECTOR_SECRET environment variable)")
+			sys.exit(1)
+		if not args["wordlist"]:
+			print("Error: --agent needs its own wordlist (-w/--wordlist WORDLIST)")
+			sys.exit(1)
+		try:
+			agent = Agent(args["agent"], secret, args["wordlist"].split(","), body_template=args["body_template"], match_file=args["match_file"], cache_dir=args["cache_dir"])
+		except ValueError:
+			print(f"Error: --agent {args['agent']} is not [HOST:]PORT")
+			sys.exit(1)
+		agent.run()
+		return
 	headers = args["headers"]
 	mutate = args["mutate"]
 	proxy = args["proxy"]
 	retries = args["retries"]
 	threads = args["threads"]
 	delay = args["delay"]
+	pool_connections = args["pool_connections"]
+	pool_maxsize = args["pool_maxsize"]
+	engine = args["engine"]
+	queue_size = args["queue_size"]
+	wordlist_cache = args["wordlist_cache"]
+	cache_dir = args["cache_dir"]
+	processes = args["processes"]
+	trust_length = args["trust_length"]
+	max_body = args["max_body"]
+	head_first = args["head_first"]
+	calibrate = args["calibrate"]
+	calibrate_words = args["calibrate_words"]
+	fingerprint_bytes = args["fingerprint_bytes"]
+	rate = args["rate"]
+	host_rate = args["host_rate"]
+	adaptive = args["adaptive"]
+	latency_target = args["latency_target"]
+	cooldown = args["cooldown"]
 	url = args["url"]
+	targets = args["targets"]
 	wordlist = args["wordlist"].split(",")
 	mode = args["mode"]
 	attacktype = args["attacktype"]
@@ -672,11 +4611,39 @@ def tool_entrypoint():
 #	injectvalues = args["injectvalues"].split(",")
 	color = args["color"]
 	simple_output = args["simple_output"]
+	output_file = args["output_file"]
+	output_format = args["output_format"]
+	state = args["state"]
+	progress = args["progress"]
+	recurse = args["recurse"]
+	dedup = args["dedup"]
+	metrics_file = args["metrics_file"]
+	metrics_port = args["metrics_port"]
+	resume = args["resume"]
 	longest = args["longest"]
+	body_template = args["body_template"]
+	body_encoding = args["body_encoding"]
+	method = args["method"].upper()
+	pipeline_depth = args["pipeline_depth"]
+	dns_ttl = args["dns_ttl"]
+	warmup = not args["no_warmup"]
+	match_file = args["match_file"]
+	match_first = args["match_first"]
+	timeout = args["timeout"]
+	retry_failed = args["retry_failed"]
+	retry_backoff = args["retry_backoff"]
+	store_file = args["store_file"]
+	prioritize = args["prioritize"]
+	coordinator = args["coordinator"]
+	lease_size = args["lease_size"]
+	lease_timeout = args["lease_timeout"]
+	adaptive_timeout = args["adaptive_timeout"]
+	timeout_min = args["timeout_min"]
+	timeout_max = args["timeout_max"]
 	fillvalue = args["fillvalue"]
 	#
 	# initialize and run the primary object (RequestInjector)
-	x = RequestInjector(url=url, wordlist=wordlist, mode=mode, attacktype=attacktype, staticargs=staticargs, injectkeys=injectkeys, threads=threads, delay=delay, longest=longest, fillvalue=fillvalue, mutate=mutate, headers=headers, proxy=proxy, retries=retries, simple_output=simple_output, color=color) #, simple_output=True)
+	x = RequestInjector(url=url, wordlist=wordlist, mode=mode, attacktype=attacktype, staticargs=staticargs, injectkeys=injectkeys, threads=threads, delay=delay, longest=longest, fillvalue=fillvalue, mutate=mutate, headers=headers, proxy=proxy, retries=retries, simple_output=simple_output, color=color, pool_connections=pool_connections, pool_maxsize=pool_maxsize, engine=engine, queue_size=queue_size, wordlist_cache=wordlist_cache, cache_dir=cache_dir, processes=processes, trust_length=trust_length, max_body=max_body, head_first=head_first, calibrate=calibrate, calibrate_words=calibrate_words, fingerprint_bytes=fingerprint_bytes, rate=rate, host_rate=host_rate, adaptive=adaptive, latency_target=latency_target, cooldown=cooldown, output_file=output_file, output_format=output_format, state=state, resume=resume, targets=targets, progress=progress, metrics_file=metrics_file, metrics_port=metrics_port, recurse=recurse, dedup=dedup, body_template=body_template, body_encoding=body_encoding, method=method, pipeline_depth=pipeline_depth, dns_ttl=dns_ttl, warmup=warmup, match_file=match_file, match_first=match_first, timeout=timeout, adaptive_timeout=adaptive_timeout, timeout_min=timeout_min, timeout_max=timeout_max, retry_failed=retry_failed, retry_backoff=retry_backoff, store_file=store_file, prioritize=prioritize, coordinator=coordinator, secret=secret, lease_size=lease_size, lease_timeout=lease_timeout) #, simple_output=True)
 	x.run()
 
 
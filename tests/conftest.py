@@ -0,0 +1,87 @@
+import http.server
+import multiprocessing
+import os
+import sys
+import threading
+
+import pytest
+
+# the tests import requestinjector.py straight from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+	"""answers every GET (and HEAD) with 200 when the path contains "admin" and 404 otherwise, with a body whose size depends on the path"""
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True # the headers and body are written separately, which Nagle would hold back for a delayed ACK
+
+	def do_HEAD(self):
+		self.send_response(200 if "admin" in self.path else 404)
+		self.send_header("Content-Length", str(len(self.path) * 10))
+		self.end_headers()
+
+	def do_GET(self):
+		self.do_HEAD()
+		self.wfile.write(b"x" * (len(self.path) * 10))
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.fixture
+def server():
+	"""a local HTTP server on a free port, yields its base URL"""
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+	httpd.daemon_threads = True
+	t = threading.Thread(target=httpd.serve_forever, daemon=True)
+	t.start()
+	yield(f"http://127.0.0.1:{httpd.server_address[1]}/")
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+class CountingServer(http.server.ThreadingHTTPServer):
+	"""counts the TCP connections it accepts"""
+	daemon_threads = True
+	connections = 0
+
+	def process_request(self, request, client_address):
+		self.connections += 1
+		http.server.ThreadingHTTPServer.process_request(self, request, client_address)
+
+
+
+@pytest.fixture
+def counting_server():
+	"""like server, but yields (URL, the CountingServer) so a test can check how many connections were opened"""
+	httpd = CountingServer(("127.0.0.1", 0), Handler)
+	t = threading.Thread(target=httpd.serve_forever, daemon=True)
+	t.start()
+	yield((f"http://127.0.0.1:{httpd.server_address[1]}/", httpd))
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+@pytest.fixture
+def wordlist(tmp_path):
+	"""a 200-word wordlist, two of which are hits"""
+	words = [f"word{i}" for i in range(198)] + ["admin", "admin2"]
+	path = tmp_path / "words.txt"
+	path.write_text("\n".join(words) + "\n")
+	return(str(path), words)
+
+
+
+@pytest.fixture(params=["fork", "spawn", "forkserver"])
+def start_method(request):
+	"""runs a --processes test under each start method, spawn and forkserver pickling the RequestInjector sent to each child"""
+	if request.param not in multiprocessing.get_all_start_methods():
+		pytest.skip(f"{request.param} is not available here")
+	previous = multiprocessing.get_start_method(allow_none=True)
+	multiprocessing.set_start_method(request.param, force=True)
+	yield(request.param)
+	multiprocessing.set_start_method(previous, force=True)
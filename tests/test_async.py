@@ -0,0 +1,33 @@
+import pytest
+
+from requestinjector import RequestInjector
+
+pytest.importorskip("aiohttp")
+
+
+
+def lines(url, path, **kwargs) -> list:
+	"""the classic text lines of a scan, without the fields that differ from run to run"""
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=["k"], longest=False, fillvalue="", attacktype="shotgun", **kwargs)
+	return(sorted(str(r).replace(f" port:{r.port}", "") for r in x.iterResults()))
+
+
+
+@pytest.mark.parametrize("mode", ["path", "arg"])
+def test_same_results_as_thread(server, wordlist, mode):
+	"""the async engine produces the same result lines as the thread Workers"""
+	path, words = wordlist
+	expected = lines(server, path, mode=mode, threads=4)
+	assert len(expected) == len(words)
+	assert lines(server, path, mode=mode, threads=4, engine="async") == expected
+
+
+
+def test_concurrency_over_pooled_connections(counting_server, wordlist):
+	"""-t is the number of concurrent requests, sent from one thread over at most that many connections"""
+	url, httpd = counting_server
+	path, words = wordlist
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=50, engine="async")
+	results = list(x.iterResults())
+	assert sorted(r.word for r in results) == sorted(words)
+	assert httpd.connections <= 50
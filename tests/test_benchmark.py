@@ -0,0 +1,104 @@
+import http.client
+import urllib.request
+
+import pytest
+
+from benchmark import Benchmark, BenchServer, compare
+
+
+
+@pytest.fixture
+def bench_server():
+	servers = []
+	def start(**kwargs):
+		s = BenchServer(**kwargs)
+		s.start()
+		servers.append(s)
+		return(s)
+	yield(start)
+	for s in servers:
+		s.stop()
+
+
+
+def statuses(server, paths) -> list:
+	conn = http.client.HTTPConnection("127.0.0.1", server.port)
+	codes = []
+	for p in paths:
+		conn.request("GET", p)
+		r = conn.getresponse()
+		r.read()
+		codes.append(r.status)
+	conn.close()
+	return(codes)
+
+
+
+def test_status_mix(bench_server):
+	"""each path's status comes from the seed and the path, in the proportions of the mix"""
+	paths = [f"/bench/w{n}" for n in range(400)]
+	one = statuses(bench_server(status_mix={"404": 3, "200": 1}, seed=1), paths)
+	two = statuses(bench_server(status_mix={"404": 3, "200": 1}, seed=1), reversed(paths))
+	assert one == list(reversed(two))
+	assert set(one) == {200, 404}
+	assert 0.15 < one.count(200) / len(one) < 0.35
+	assert one != statuses(bench_server(status_mix={"404": 3, "200": 1}, seed=2), paths)
+
+
+
+def test_body_and_keepalive(bench_server):
+	s = bench_server(body_size=100, status_mix={200: 1}, keepalive=False)
+	with urllib.request.urlopen(f"http://127.0.0.1:{s.port}/x") as r:
+		assert r.status == 200
+		assert r.headers["Connection"] == "close"
+		assert r.read() == b"x" * 100
+
+
+
+def test_error_rate(bench_server):
+	"""a fraction of paths is answered by dropping the connection"""
+	s = bench_server(error_rate=0.5)
+	dropped = 0
+	for n in range(100):
+		conn = http.client.HTTPConnection("127.0.0.1", s.port)
+		try:
+			conn.request("GET", f"/w{n}")
+			conn.getresponse().read()
+		except (http.client.HTTPException, ConnectionError):
+			dropped += 1
+		conn.close()
+	assert 30 < dropped < 70
+
+
+
+def test_run(bench_server, tmp_path):
+	"""one scan, measured from its jsonl output and the child's resource usage"""
+	s = bench_server(status_mix={"404": 1, "200": 1})
+	b = Benchmark(s, tmp_path, label="test")
+	r = b.run("path", "thread", 4, 100)
+	assert r["exit"] == 0
+	assert (r["label"], r["mode"], r["engine"], r["threads"], r["words"]) == ("test", "path", "thread", 4, 100)
+	assert r["requests"] == 100
+	assert r["errors"] == 0
+	assert r["rps"] > 0
+	assert 0 < r["p50"] <= r["p95"] <= r["p99"]
+	assert r["max_rss_kb"] > 0
+	assert r["server"]["status_mix"] == {"200": 0.5, "404": 1.0}
+
+
+
+def test_percentile():
+	b = Benchmark(None, ".")
+	values = list(range(1, 101))
+	assert (b.percentile(values, 50), b.percentile(values, 95), b.percentile(values, 100)) == (50, 95, 100)
+	assert b.percentile([], 50) is None
+
+
+
+def test_compare(capsys):
+	old = [{"mode": "path", "engine": "thread", "threads": 10, "words": 1000, "rps": 100.0, "p95": 0.01}]
+	new = [dict(old[0], rps=150.0, p95=0.02), dict(old[0], threads=50)]
+	compare(old, new)
+	err = capsys.readouterr().err.splitlines()
+	assert len(err) == 1
+	assert "rps:100.0 -> 150.0 (+50.0%)" in err[0]
@@ -0,0 +1,98 @@
+import http.server
+import threading
+
+import pytest
+
+from requestinjector import RequestInjector, Result
+
+
+
+class SizeHandler(http.server.BaseHTTPRequestHandler):
+	"""answers /sizeN with an N byte body (and its Content-Length), counting the GET requests it serves"""
+	protocol_version = "HTTP/1.1"
+	gets = 0
+
+	def body(self) -> bytes:
+		size = self.path.rpartition("size")[2]
+		if not size.isdigit():
+			return(b"") # ex. the HEAD / a Worker warms its connection with
+		return(b"x" * int(size))
+
+	def do_HEAD(self):
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(self.body())))
+		self.end_headers()
+
+	def do_GET(self):
+		type(self).gets += 1
+		body = self.body()
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.fixture
+def size_server(tmp_path):
+	"""yields the server URL, a wordlist of a small and a large body, and the handler class counting GETs"""
+	handler = type("CountingSizeHandler", (SizeHandler,), {"gets": 0})
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+	httpd.daemon_threads = True
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	path = tmp_path / "words.txt"
+	path.write_text("size100\nsize300000\n")
+	yield(f"http://127.0.0.1:{httpd.server_address[1]}/", str(path), handler)
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+def scan(size_server, **kwargs) -> dict:
+	url, path, handler = size_server
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, **kwargs)
+	return({r.word: (r.bytes, r.sizetype) for r in x.iterResults()})
+
+
+
+def test_text_line():
+	"""sizetype follows the fields of the original text line, so its prefix is unchanged"""
+	r = Result(status_code=200, bytes=5, sizetype="exact", word="admin", ip="127.0.0.1", port=80, url="http://127.0.0.1/admin")
+	assert str(r) == "status_code:200 bytes:5 word:admin ip:127.0.0.1 port:80 url:http://127.0.0.1/admin sizetype:exact"
+	r.matches = ["key"]
+	assert str(r).endswith(" url:http://127.0.0.1/admin sizetype:exact matches:key")
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+def test_exact(size_server, engine):
+	assert scan(size_server, engine=engine) == {"size100": (100, "exact"), "size300000": (300000, "exact")}
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+def test_trust_length(size_server, engine):
+	"""large bodies are sized from Content-Length, small ones are still read (and counted) to keep the connection"""
+	assert scan(size_server, engine=engine, trust_length=True) == {"size100": (100, "exact"), "size300000": (300000, "header")}
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+def test_max_body(size_server, engine):
+	results = scan(size_server, engine=engine, max_body=1000)
+	assert results["size100"] == (100, "exact")
+	size, sizetype = results["size300000"]
+	assert sizetype == "truncated"
+	assert 1000 <= size < 300000
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_head_first(size_server, engine):
+	"""a HEAD with a Content-Length answers the request, no GET is sent"""
+	results = scan(size_server, engine=engine, head_first=True)
+	assert results == {"size100": (100, "header"), "size300000": (300000, "header")}
+	assert size_server[2].gets == 0
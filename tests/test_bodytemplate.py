@@ -0,0 +1,77 @@
+import pickle
+
+import pytest
+
+from requestinjector import BodyPayload, BodyTemplate
+
+
+
+@pytest.fixture
+def template_file(tmp_path):
+	path = tmp_path / "body.json"
+	path.write_bytes(b'{"user": "{{user}}", "pass": "{{pass}}", "again": "{{user}}", "other": "{{nokey}}"}')
+	return(str(path))
+
+
+
+def test_slots(template_file):
+	t = BodyTemplate(template_file, ["user", " pass"])
+	assert t.slots == [0, 1, 0]
+	assert len(t.segments) == len(t.slots) + 1
+	p = t.render(["alice", "secret"])
+	assert p.body() == b'{"user": "alice", "pass": "secret", "again": "alice", "other": "{{nokey}}"}'
+	assert p == "user=alice&pass=secret"
+	assert p.length == len(p.body())
+
+
+
+def test_fill(template_file):
+	p = BodyTemplate(template_file, ["user", "pass"]).fill("bob")
+	assert p == "bob"
+	assert p.body() == b'{"user": "bob", "pass": "bob", "again": "bob", "other": "{{nokey}}"}'
+
+
+
+@pytest.mark.parametrize("encoding, expected", [
+	("raw", b'a"b c&d'),
+	("json", b'a\\"b c&d'),
+	("url", b"a%22b+c%26d"),
+])
+def test_encodings(tmp_path, encoding, expected):
+	path = tmp_path / "body.txt"
+	path.write_bytes(b"<{{k}}>")
+	assert BodyTemplate(str(path), ["k"], encoding=encoding).fill('a"b c&d').body() == b"<" + expected + b">"
+
+
+
+def test_no_keys(template_file):
+	t = BodyTemplate(template_file, [])
+	assert t.slots == []
+	assert t.fill("x").body() == open(template_file, "rb").read()
+
+
+
+def test_stream(tmp_path):
+	"""a body over the threshold is read back through BodyStream in any block size, without changing its bytes"""
+	path = tmp_path / "body.bin"
+	path.write_bytes(b"A" * 1000 + b"{{k}}" + b"B" * 1000)
+	p = BodyTemplate(str(path), ["k"]).fill("C" * 500)
+	p.stream_threshold = 100
+	stream = p.body()
+	assert len(stream) == 2500
+	blocks = []
+	while True:
+		block = stream.read(333)
+		if not block:
+			break
+		blocks.append(block)
+	assert b"".join(blocks) == p.body(stream=False) == b"A" * 1000 + b"C" * 500 + b"B" * 1000
+
+
+
+def test_pickle(template_file):
+	"""queue items cross process boundaries with --processes"""
+	p = BodyTemplate(template_file, ["user", "pass"]).fill("bob")
+	q = pickle.loads(pickle.dumps(p))
+	assert isinstance(q, BodyPayload)
+	assert q == p and q.body() == p.body()
@@ -0,0 +1,73 @@
+import socket
+import threading
+
+from requestinjector import CircuitBreaker, RequestInjector
+
+
+
+def test_opens_at_threshold():
+	b = CircuitBreaker(threshold=3, cooldown=30.0)
+	for i in range(2):
+		b.failure("a")
+		assert b.allow("a")
+	b.failure("a")
+	assert b.hosts["a"]["state"] == CircuitBreaker.STATE_OPEN
+	assert not b.allow("a")
+	assert not b.allow("a")
+	assert b.skippedCount("a") == 2
+	assert b.allow("b")
+
+
+
+def test_success_resets():
+	"""a response before the threshold clears the host's failures"""
+	b = CircuitBreaker(threshold=2, cooldown=30.0)
+	b.failure("a")
+	b.success("a")
+	b.failure("a")
+	assert b.allow("a")
+
+
+
+def test_half_open_probe():
+	"""after the cooldown one probe is let through; its success closes the host, its failure opens it again"""
+	b = CircuitBreaker(threshold=1, cooldown=0.0)
+	b.failure("a")
+	assert b.allow("a")
+	assert b.hosts["a"]["state"] == CircuitBreaker.STATE_HALF_OPEN
+	assert not b.allow("a") # the probe is still in flight
+	b.failure("a")
+	assert b.hosts["a"]["state"] == CircuitBreaker.STATE_OPEN
+	assert b.allow("a")
+	b.success("a")
+	assert "a" not in b.hosts
+	assert b.allow("a") and b.allow("a")
+
+
+
+def test_shared_between_processes():
+	"""failures recorded by one process's breaker open the host in another's (--processes)"""
+	shared = {}
+	lock = threading.Lock()
+	one = CircuitBreaker(threshold=2, cooldown=30.0, shared=shared, shared_lock=lock)
+	two = CircuitBreaker(threshold=2, cooldown=30.0, shared=shared, shared_lock=lock)
+	one.failure("a")
+	two.failure("a")
+	assert shared == {"a": 2}
+	assert not two.allow("a")
+	one.last_sync = 0.0
+	assert not one.allow("a")
+
+
+
+def test_dead_host_skipped(wordlist):
+	"""once a dead host fails -r times, every Worker skips it right away, reporting each skipped request"""
+	path, words = wordlist
+	with socket.socket() as s:
+		s.bind(("127.0.0.1", 0))
+		port = s.getsockname()[1]
+	x = RequestInjector(url=f"http://127.0.0.1:{port}/", wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, retries=1, cooldown=60.0)
+	results = list(x.iterResults())
+	assert len(results) == len(words)
+	skipped = [r for r in results if r.reason and r.reason.startswith("circuit open")]
+	assert len(skipped) >= len(words) - 4
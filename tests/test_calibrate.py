@@ -0,0 +1,84 @@
+import http.server
+import threading
+
+import pytest
+
+from requestinjector import RequestInjector
+
+
+
+class SoftHandler(http.server.BaseHTTPRequestHandler):
+	"""answers 200 for every path, with a short "not found" page unless the path contains "admin" """
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		body = b"<html>the admin page</html>" * 40 if "admin" in self.path else b"not found"
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.fixture
+def soft_server():
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SoftHandler)
+	httpd.daemon_threads = True
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	yield(f"http://127.0.0.1:{httpd.server_address[1]}/")
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+def test_soft404_filtered(soft_server, wordlist, engine):
+	"""soft-404 pages smaller than the fingerprint window are dropped, not reported as errors"""
+	path, words = wordlist
+	x = RequestInjector(url=soft_server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, engine=engine, calibrate=True)
+	results = list(x.iterResults())
+	assert [r.reason for r in results if r.reason is not None] == []
+	assert sorted(r.word for r in results) == ["admin", "admin2"]
+
+
+
+class EchoHandler(http.server.BaseHTTPRequestHandler):
+	"""answers 200 for every path, with a "not found" page that echoes the path unless it contains "admin" """
+	protocol_version = "HTTP/1.1"
+	padding = 0 # bytes appended to the "not found" page, so it can be longer than the fingerprint window
+
+	def do_GET(self):
+		if "admin" in self.path:
+			body = b"<html>the admin page</html>" * 40
+		else:
+			body = b"<html>page " + self.path.encode() + b" not found</html>" + b"." * self.padding
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+@pytest.mark.parametrize("padding", [0, 2000])
+def test_word_in_template(tmp_path, engine, padding):
+	"""words that also appear in the page's fixed text are still recognized as soft-404s"""
+	handler = type("PaddedEchoHandler", (EchoHandler,), {"padding": padding})
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+	httpd.daemon_threads = True
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	path = tmp_path / "words.txt"
+	path.write_text("a\npage\nhtml\nfound\nnot\nzzz\nadmin\n")
+	try:
+		x = RequestInjector(url=f"http://127.0.0.1:{httpd.server_address[1]}/x/", wordlist=[str(path)], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, engine=engine, calibrate=True)
+		results = list(x.iterResults())
+	finally:
+		httpd.shutdown()
+		httpd.server_close()
+	assert [r.word for r in results] == ["admin"]
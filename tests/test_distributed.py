@@ -0,0 +1,126 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from requestinjector import Agent, Coordinator, RequestInjector, Result
+
+
+
+def free_port() -> int:
+	with socket.socket() as s:
+		s.bind(("127.0.0.1", 0))
+		return(s.getsockname()[1])
+
+
+
+def wait_listening(port, timeout=10.0):
+	"""waits until the coordinator accepts connections (the probe connection is dropped by it as a client that never says hello)"""
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		try:
+			socket.create_connection(("127.0.0.1", port), timeout=1).close()
+			return
+		except OSError:
+			time.sleep(0.05)
+	raise TimeoutError(f"nothing listening on port {port}")
+
+
+
+def start_coordinator(server, path, port, secret=b"secret"):
+	"""runs a --coordinator scan in a background thread, returning the thread and the list its results are collected in"""
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, coordinator=f"127.0.0.1:{port}", secret=secret, lease_size=25, lease_timeout=5.0)
+	results = []
+	t = threading.Thread(target=lambda: results.extend(x.iterResults()), daemon=True)
+	t.start()
+	wait_listening(port)
+	return(t, results)
+
+
+
+def test_two_agents(server, wordlist):
+	"""every word is scanned exactly once, shared between two agents"""
+	path, words = wordlist
+	port = free_port()
+	t, results = start_coordinator(server, path, port)
+	agents = [Agent(str(port), b"secret", [path]) for i in range(2)]
+	threads = [threading.Thread(target=a.run, daemon=True) for a in agents]
+	for a in threads:
+		a.start()
+	for a in threads:
+		a.join(60)
+	t.join(60)
+	assert not t.is_alive()
+	assert sorted(r.word for r in results) == sorted(words)
+	assert sorted(r.word for r in results if r.status_code == 200) == ["admin", "admin2"]
+
+
+
+def test_wrong_secret(server, wordlist):
+	path, words = wordlist
+	port = free_port()
+	t, results = start_coordinator(server, path, port)
+	agent = Agent(str(port), b"wrong", [path])
+	with pytest.raises(SystemExit):
+		agent.run()
+	# a rightful agent still gets the whole scan
+	Agent(str(port), b"secret", [path]).run()
+	t.join(60)
+	assert sorted(r.word for r in results) == sorted(words)
+
+
+
+def test_rows_mismatch(server, wordlist, tmp_path):
+	"""an agent whose wordlist differs from the coordinator's refuses to scan"""
+	path, words = wordlist
+	other = tmp_path / "other.txt"
+	other.write_text("admin\n")
+	port = free_port()
+	t, results = start_coordinator(server, path, port)
+	with pytest.raises(SystemExit):
+		Agent(str(port), b"secret", [str(other)]).run()
+	Agent(str(port), b"secret", [path]).run()
+	t.join(60)
+
+
+
+def test_options_allow_list():
+	"""file paths and unknown options sent by a coordinator are ignored"""
+	agent = Agent("1", b"secret", ["/tmp/agent_words.txt"])
+	config = {"options": {"threads": 3, "wordlist": ["/etc/passwd"], "body_template": "/etc/shadow", "cache_dir": "/", "secret": "x"}, "files": [], "rows": 0, "lease_size": 10}
+	agent.makeInjector = lambda: type("Probe", (), {"countRows": lambda self: 0, "rowOffsets": lambda self, starts: None})()
+	agent.configure(config)
+	assert agent.options == {"threads": 3}
+
+
+
+def test_lease_offsets(server, wordlist):
+	"""each lease seeks straight to its first row, found in one pass when the agent is configured"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", lease_size=25)
+	agent = Agent("1", b"secret", [path])
+	agent.configure(x.agentConfig(x.countRows()))
+	assert sorted(agent.offsets) == list(range(0, len(words), 25))
+	with open(path, "rb") as f:
+		data = f.read()
+	for start, offsets in agent.offsets.items():
+		assert data[offsets[0]:].split(b"\n")[0].decode() == words[start]
+
+
+
+def test_malformed_result():
+	fields = Result(status_code=200, word="admin", url="http://127.0.0.1/admin").asDict()
+	assert Result.fromDict(fields).word == "admin"
+	for bad in [dict(fields, unknown=1), {"word": "admin"}, dict(fields, status_code="200"), dict(fields, matches=[1]), ["admin"]]:
+		with pytest.raises(ValueError):
+			Result.fromDict(bad)
+
+
+
+def test_address():
+	assert Coordinator.address("8000") == ("127.0.0.1", 8000)
+	assert Coordinator.address("0.0.0.0:8000") == ("0.0.0.0", 8000)
+	assert Coordinator.address("[::1]:8000") == ("::1", 8000)
+	with pytest.raises(ValueError):
+		Coordinator.address(":8000")
@@ -0,0 +1,53 @@
+import socket
+
+import pytest
+
+from requestinjector import DnsCache, RequestInjector
+
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+	"""counts real lookups of localhost"""
+	calls = []
+	real = socket.getaddrinfo
+
+	def counting(host, *args, **kwargs):
+		if host == "localhost":
+			calls.append(args)
+		return(real(host, *args, **kwargs))
+
+	monkeypatch.setattr(socket, "getaddrinfo", counting)
+	return(calls)
+
+
+
+def test_cache(lookups):
+	dns = DnsCache(ttl=60)
+	first = dns.getaddrinfo("localhost", 80, 0, socket.SOCK_STREAM)
+	assert dns.getaddrinfo("localhost", 80, 0, socket.SOCK_STREAM) == first
+	assert len(lookups) == 1
+	dns.getaddrinfo("localhost", 81, 0, socket.SOCK_STREAM)
+	assert len(lookups) == 2
+
+
+
+def test_expiry(lookups):
+	dns = DnsCache(ttl=0)
+	dns.getaddrinfo("localhost", 80)
+	dns.getaddrinfo("localhost", 80)
+	assert len(lookups) == 2
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async", "pipeline"])
+def test_engines(lookups, server, wordlist, engine):
+	"""every engine resolves through the cache, which never replaces socket.getaddrinfo"""
+	path, words = wordlist
+	patched = socket.getaddrinfo
+	url = server.replace("127.0.0.1", "localhost")
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=8, engine=engine, calibrate=True)
+	assert len(list(x.iterResults())) == len(words)
+	assert socket.getaddrinfo is patched
+	# only the lookups made up front by DnsCache.resolve()
+	assert len(lookups) <= 2
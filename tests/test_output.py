@@ -0,0 +1,62 @@
+import csv
+import json
+
+from requestinjector import RequestInjector, Result
+
+
+
+def scan(server, path, output, output_format):
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, output_file=str(output), output_format=output_format)
+	x.run()
+
+
+
+def test_jsonl(server, wordlist, tmp_path):
+	"""one JSON object per result, with every Result field"""
+	path, words = wordlist
+	output = tmp_path / "out.jsonl"
+	scan(server, path, output, "jsonl")
+	records = [json.loads(line) for line in output.read_text().splitlines()]
+	assert sorted(r["word"] for r in records) == sorted(words)
+	for r in records:
+		assert list(r) == list(Result.fields)
+		assert r["status_code"] == (200 if "admin" in r["word"] else 404)
+		assert r["bytes"] == len(f"/{r['word']}") * 10
+		assert r["url"] == server + r["word"]
+		assert r["reason"] is None
+
+
+
+def test_csv(server, wordlist, tmp_path):
+	"""a header row of the Result fields, then one row per result"""
+	path, words = wordlist
+	output = tmp_path / "out.csv"
+	scan(server, path, output, "csv")
+	with open(output, newline="") as f:
+		rows = list(csv.reader(f))
+	assert rows[0] == list(Result.fields)
+	records = [dict(zip(rows[0], row)) for row in rows[1:]]
+	assert sorted(r["word"] for r in records) == sorted(words)
+	assert {r["status_code"] for r in records} == {"200", "404"}
+
+
+
+def test_text(server, wordlist, tmp_path):
+	path, words = wordlist
+	output = tmp_path / "out.txt"
+	scan(server, path, output, "text")
+	lines = output.read_text().splitlines()
+	assert len(lines) == len(words)
+	assert all(line.startswith("status_code:") for line in lines)
+	assert f"url:{server}admin sizetype:exact" in output.read_text()
+
+
+
+def test_failures_recorded(wordlist, tmp_path):
+	"""jsonl also records failed and skipped requests, with their reason"""
+	path, words = wordlist
+	output = tmp_path / "out.jsonl"
+	scan("http://127.0.0.1:9/", path, output, "jsonl")
+	records = [json.loads(line) for line in output.read_text().splitlines()]
+	assert len(records) == len(words)
+	assert all(r["status_code"] is None and r["reason"] for r in records)
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from requestinjector import PatternScanner, PatternSet, Result
+
+
+
+def patternset(tmp_path, lines):
+	path = tmp_path / "patterns.txt"
+	path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+	return(PatternSet(str(path)))
+
+
+
+def scan(patterns, chunks, first=False):
+	scanner = PatternScanner(patterns, first=first)
+	for chunk in chunks:
+		if scanner.feed(chunk):
+			break
+	return(scanner.ids())
+
+
+
+def split(data, size):
+	return([data[i:i+size] for i in range(0, len(data), size)])
+
+
+
+def test_ids(tmp_path):
+	p = patternset(tmp_path, ["# comment", "", "key\tAKIA", "password", "re:tok_[0-9]{4}"])
+	assert len(p) == 3
+	assert scan(p, [b"xx password AKIA tok_1234"]) == ["key", "password", "re:tok_[0-9]{4}"]
+	assert scan(p, [b"nothing here"]) is None
+
+
+
+def test_overlapping_literals(tmp_path):
+	"""literals inside, overlapping, or repeating other literals are all reported"""
+	p = patternset(tmp_path, ["admin", "min", "adm", "inis", "a\tmin"])
+	assert scan(p, [b"__administrator"]) == ["admin", "min", "adm", "inis", "a"]
+
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_spanning_chunks(tmp_path, size):
+	"""a literal or regex split across chunks is still found"""
+	p = patternset(tmp_path, ["secret_value", "re:id=[0-9]+;"])
+	assert scan(p, split(b"...secret_value... id=12345; ...", size)) == ["secret_value", "re:id=[0-9]+;"]
+
+
+
+def test_first(tmp_path):
+	p = patternset(tmp_path, ["one", "two"])
+	scanner = PatternScanner(p, first=True)
+	assert scanner.feed(b"two one") is True
+	assert scanner.stopped()
+	assert len(scanner.ids()) == 1
+
+
+
+def test_random(tmp_path):
+	"""matches the patterns found by searching the whole body, for random literals and chunk sizes"""
+	rng = random.Random(1)
+	for i in range(50):
+		literals = sorted(set("".join(rng.choice("ab") for j in range(rng.randint(1, 6))) for k in range(8)))
+		p = patternset(tmp_path, literals)
+		body = "".join(rng.choice("abc") for j in range(rng.randint(0, 200))).encode()
+		expected = [l for l in literals if l.encode() in body] or None
+		assert scan(p, split(body, rng.randint(1, 20))) == expected
+
+
+
+def test_as_row():
+	r = Result(status_code=200, bytes=10, sizetype="exact", word="w", url="http://x/w", matches=["a", "b"])
+	row = r.asRow()
+	assert row[Result.fields.index("matches")] == "a,b"
+	assert row[Result.fields.index("status_code")] == 200
@@ -0,0 +1,56 @@
+import itertools
+
+import pytest
+
+from requestinjector import ArgTemplate, PayloadSpace, RequestInjector
+
+
+
+@pytest.fixture
+def lists(tmp_path):
+	"""three small wordlists, the second with a blank line and a repeated word that the compiled cache drops"""
+	words = [["a", "b", "c"], ["x", "", "y", "x"], ["1", "2"]]
+	paths = []
+	for i, w in enumerate(words):
+		path = tmp_path / f"list{i}.txt"
+		path.write_text("\n".join(w) + "\n")
+		paths.append(str(path))
+	return(paths)
+
+
+
+def test_matches_product(tmp_path, lists):
+	with PayloadSpace(lists, cache_dir=str(tmp_path / "cache")) as space:
+		expected = list(itertools.product(["a", "b", "c"], ["x", "y"], ["1", "2"]))
+		assert len(space) == len(expected)
+		assert [space[i] for i in range(len(space))] == expected
+		assert space[-1] == expected[-1]
+
+
+
+def test_out_of_range(tmp_path, lists):
+	with PayloadSpace(lists, cache_dir=str(tmp_path / "cache")) as space:
+		with pytest.raises(IndexError):
+			space[len(space)]
+		with pytest.raises(IndexError):
+			space[-len(space) - 1]
+
+
+
+def test_count_rows(tmp_path, lists):
+	"""the progress ETA counts combinations of the deduplicated wordlists"""
+	x = RequestInjector(url="http://127.0.0.1/", wordlist=lists, staticargs="", injectkeys=["k1", "k2", "k3"], longest=False, fillvalue="", mode="arg", attacktype="clusterbomb", cache_dir=str(tmp_path / "cache"))
+	assert x.countRows() == 12
+	x = RequestInjector(url="http://127.0.0.1/", wordlist=[lists[1]], staticargs="", injectkeys=[""], longest=False, fillvalue="", wordlist_cache=True, cache_dir=str(tmp_path / "cache"))
+	assert x.countRows() == 2
+	x = RequestInjector(url="http://127.0.0.1/", wordlist=[lists[1]], staticargs="", injectkeys=[""], longest=False, fillvalue="")
+	assert x.countRows() == 4
+
+
+
+def test_arg_template():
+	t = ArgTemplate([" user", "pass "], ["s=1", ""])
+	assert t.fill("w") == "user=w&pass=w&s=1"
+	assert t.render(["a", "b", "c"]) == "user=a&pass=b&s=1"
+	# trident keeps its keys exactly as given
+	assert ArgTemplate([" user"], None, strip=False).render(["a"]) == " user=a"
@@ -0,0 +1,118 @@
+import socket
+import threading
+
+import pytest
+
+from requestinjector import PipelineConnection, PipelineError, RequestInjector
+
+
+
+@pytest.fixture
+def canned():
+	"""returns a function that starts a one-connection server sending the given bytes, and a PipelineConnection to it"""
+	servers = []
+
+	def connect(data, close=True):
+		srv = socket.create_server(("127.0.0.1", 0))
+		servers.append(srv)
+
+		def serve():
+			conn, addr = srv.accept()
+			conn.sendall(data)
+			if close:
+				conn.close()
+			else:
+				servers.append(conn)
+
+		threading.Thread(target=serve, daemon=True).start()
+		return(PipelineConnection("http", "127.0.0.1", srv.getsockname()[1], timeout=3, read_timeout=3))
+
+	yield(connect)
+	for s in servers:
+		s.close()
+
+
+
+def test_content_length(canned):
+	c = canned(b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\nX-Test:  yes \r\n\r\n0123456789")
+	r = c.read(4)
+	assert (r.status_code, r.head, r.size, r.keepalive) == (200, b"0123", 10, True)
+	assert r.headers["x-test"] == "yes"
+	assert c.answered == 1
+	c.close()
+
+
+
+def test_pipelined_responses(canned):
+	"""each response is read to its end so the next one starts at the right byte"""
+	c = canned(b"HTTP/1.1 404 Not Found\r\nContent-Length: 3\r\n\r\nabcHTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nde")
+	first = c.read(0)
+	second = c.read(10)
+	assert (first.status_code, first.head, first.size) == (404, b"", 3)
+	assert (second.status_code, second.head, second.size) == (200, b"de", 2)
+	c.close()
+
+
+
+def test_chunked(canned):
+	c = canned(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5;ext=1\r\nhello\r\n6\r\n world\r\n0\r\nX-Trailer: 1\r\n\r\nHTTP/1.1 204 No Content\r\n\r\n")
+	r = c.read(7)
+	assert (r.head, r.size) == (b"hello w", 11)
+	r = c.read(7)
+	assert (r.status_code, r.size) == (204, 0)
+	c.close()
+
+
+
+def test_interim_response(canned):
+	c = canned(b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 201 Created\r\nContent-Length: 1\r\n\r\nx")
+	r = c.read(1)
+	assert (r.status_code, r.head) == (201, b"x")
+	c.close()
+
+
+
+@pytest.mark.parametrize("data", [
+	b"HTTP/1.1 200 OK\r\nConnection: close\r\nContent-Length: 1\r\n\r\nx",
+	b"HTTP/1.0 200 OK\r\nContent-Length: 1\r\n\r\nx",
+])
+def test_not_keepalive(canned, data):
+	c = canned(data, close=False)
+	assert c.read(1).keepalive is False
+	c.close()
+
+
+
+def test_unframed_body(canned):
+	"""without Content-Length or chunking the body runs to the end of the connection"""
+	c = canned(b"HTTP/1.1 200 OK\r\n\r\n" + b"y" * 100000)
+	r = c.read(5)
+	assert (r.head, r.size, r.keepalive) == (b"yyyyy", 100000, False)
+	c.close()
+
+
+
+@pytest.mark.parametrize("data", [
+	b"garbage\r\n\r\n",
+	b"HTTP/1.1 200 OK\r\nno colon here\r\n\r\n",
+	b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nshort",
+	b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n",
+	b"",
+])
+def test_errors(canned, data):
+	c = canned(data)
+	with pytest.raises(PipelineError):
+		c.read(10)
+	c.close()
+
+
+
+def test_pipeline_engine(server, wordlist):
+	"""the pipeline engine returns the same results as the standard engine"""
+	path, words = wordlist
+	out = {}
+	for engine in ["thread", "pipeline"]:
+		x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, engine=engine)
+		out[engine] = sorted((r.word, r.status_code, r.bytes) for r in x.iterResults())
+	assert out["pipeline"] == out["thread"]
+	assert len(out["pipeline"]) == len(words)
@@ -0,0 +1,33 @@
+import threading
+
+from requestinjector import RequestInjector
+
+
+
+def test_stop_early(start_method, server, wordlist):
+	"""the consumer's threading.Event is passed on to the children, so leaving the loop early stops them"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, processes=2, queue_size=5)
+	for r in x.iterResults(buffer=2):
+		break
+	assert x.cancel.is_set()
+
+
+
+def test_threading_cancel(start_method, server, wordlist, tmp_path):
+	"""a cancel threading.Event set before the scan is honoured by the children rather than failing to pickle"""
+	path, words = wordlist
+	output = tmp_path / "out.txt"
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, processes=2, output_file=str(output))
+	x.cancel = threading.Event()
+	x.cancel.set()
+	x.run()
+	assert output.read_text() == ""
+
+
+
+def test_store(start_method, server, wordlist, tmp_path):
+	"""the --store database stays in the parent, so it never has to be pickled for a child"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, processes=2, store_file=str(tmp_path / "results.db"))
+	assert len(list(x.iterResults())) == len(words)
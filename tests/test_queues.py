@@ -0,0 +1,31 @@
+import queue
+import time
+
+from requestinjector import PathFiller, RequestInjector
+
+
+
+def test_filler_blocks_on_full_queue(wordlist):
+	"""the Filler stops reading the wordlist while the queue is full, and carries on as it is drained"""
+	path, words = wordlist
+	q = queue.Queue(maxsize=5)
+	f = PathFiller(queue=q, wordlist=[path])
+	f.start()
+	time.sleep(0.5)
+	assert q.qsize() == 5
+	assert f.is_alive()
+	taken = []
+	while len(taken) < len(words):
+		taken.append(q.get(timeout=5)[1])
+		q.task_done()
+	f.join(5)
+	assert not f.is_alive()
+	assert taken == words
+
+
+
+def test_bounded_scan(server, wordlist):
+	"""a scan whose queues hold only a few items still requests every word once"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, queue_size=2)
+	assert sorted(r.word for r in x.iterResults(buffer=2)) == sorted(words)
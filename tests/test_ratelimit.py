@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from requestinjector import ConcurrencyController, RateLimiter, RequestInjector, TokenBucket
+
+
+
+def test_token_bucket():
+	"""a full bucket allows a burst of capacity requests, then each later one waits another 1/rate seconds"""
+	b = TokenBucket(10)
+	assert [b.reserve() for i in range(10)] == [0.0] * 10
+	assert b.reserve() == pytest.approx(0.1, abs=0.02)
+	assert b.reserve() == pytest.approx(0.2, abs=0.02)
+
+
+
+def test_host_buckets():
+	"""--host_rate limits each host on its own"""
+	r = RateLimiter(host_rate=5)
+	assert [r.reserve("a") for i in range(5)] == [0.0] * 5
+	assert r.reserve("a") == pytest.approx(0.2, abs=0.02)
+	assert r.reserve("b") == 0.0
+
+
+
+def test_scan_rate(server, wordlist):
+	"""--rate caps the whole scan, whatever the number of threads"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=10, rate=100)
+	started = time.monotonic()
+	assert len(list(x.iterResults())) == len(words)
+	# a burst of 100, then 100 more at 100 per second
+	assert time.monotonic() - started >= 0.9
+
+
+
+def test_decrease():
+	"""429/503, failures and latency above the target halve the limit, at most once per smoothed round trip"""
+	c = ConcurrencyController(8, latency_target=0.5)
+	for status in [429, 503]:
+		c.acquire()
+		c.release(0.1, status)
+	assert c.limit == 4
+	c.last_decrease = 0.0
+	c.acquire()
+	c.release(0.1, None)
+	assert c.limit == 2
+	c = ConcurrencyController(8, latency_target=0.5)
+	c.acquire()
+	c.release(1.0, 200)
+	assert c.limit == 4
+
+
+
+def test_increase():
+	"""the limit grows by one after a full window of healthy responses, up to the maximum"""
+	c = ConcurrencyController(3)
+	c.limit = 2.0
+	for i in range(2):
+		c.acquire()
+		c.release(0.1, 200)
+	assert c.limit == 3
+	for i in range(10):
+		c.acquire()
+		c.release(0.1, 200)
+	assert c.limit == 3
+
+
+
+def test_acquire_blocks():
+	"""no more than limit requests are in flight, the next one waits for a release"""
+	c = ConcurrencyController(2)
+	c.acquire()
+	c.acquire()
+	t = threading.Thread(target=c.acquire)
+	t.start()
+	t.join(0.2)
+	assert t.is_alive()
+	c.release(0.1, 200)
+	t.join(5)
+	assert not t.is_alive()
+	assert c.inflight == 2
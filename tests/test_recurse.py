@@ -0,0 +1,113 @@
+import http.server
+import threading
+from urllib.parse import urlparse
+
+import pytest
+
+from requestinjector import PathWorker, RequestInjector, SeenSet
+
+
+
+class TreeHandler(http.server.BaseHTTPRequestHandler):
+	"""every path whose last segment is "a" or "b" is a directory: without its trailing slash it redirects, with it it answers 200"""
+	protocol_version = "HTTP/1.1"
+
+	def do_HEAD(self):
+		self.answer(b"")
+
+	def do_GET(self):
+		self.answer(b"ok")
+
+	def answer(self, body):
+		path = self.path.split("?")[0]
+		name = path.rstrip("/").rpartition("/")[2]
+		if name not in ["a", "b"]:
+			self.send_response(404)
+		elif path.endswith("/"):
+			self.send_response(200)
+		else:
+			self.send_response(301)
+			self.send_header("Location", path + "/")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		if self.command == "GET":
+			self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.fixture
+def tree_server(tmp_path):
+	"""yields the server URL and a wordlist of two directory names and a missing path"""
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), TreeHandler)
+	httpd.daemon_threads = True
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	path = tmp_path / "words.txt"
+	path.write_text("a\nb\nc\n")
+	yield(f"http://127.0.0.1:{httpd.server_address[1]}/", str(path))
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+def scan(url, path, **kwargs) -> list:
+	"""the paths requested, relative to url"""
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, **kwargs)
+	return(sorted(urlparse(r.url).path.lstrip("/") for r in x.iterResults()))
+
+
+
+def test_seen_set():
+	seen = SeenSet()
+	assert seen.add("http://127.0.0.1/admin")
+	assert not seen.add("http://127.0.0.1/admin")
+	assert seen.add("http://127.0.0.1/admin2")
+	assert len(seen) == 2
+
+
+
+def test_seen_set_threads():
+	"""of many threads adding the same URLs at once, exactly one succeeds for each URL"""
+	seen = SeenSet()
+	added = []
+	def add():
+		added.extend(url for url in (f"http://127.0.0.1/{n}" for n in range(2000)) if seen.add(url))
+	threads = [threading.Thread(target=add) for i in range(8)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	assert len(added) == len(seen) == 2000
+	assert len(set(added)) == 2000
+
+
+
+def test_directory_of():
+	assert PathWorker.directoryOf(None, "http://127.0.0.1/a", 200, "http://127.0.0.1/a/") == "http://127.0.0.1/a/"
+	assert PathWorker.directoryOf(None, "http://127.0.0.1/a/", 403, None) == "http://127.0.0.1/a/"
+	assert PathWorker.directoryOf(None, "http://127.0.0.1/a/", 404, None) is None
+	assert PathWorker.directoryOf(None, "http://127.0.0.1/a", 200, None) is None
+	assert PathWorker.directoryOf(None, "http://127.0.0.1/a", 200, "http://127.0.0.1/login/") is None
+
+
+
+def test_dedup(tree_server, tmp_path):
+	url, path = tree_server
+	repeated = tmp_path / "repeated.txt"
+	repeated.write_text("a\nc\na\n")
+	assert scan(url, str(repeated)) == ["a", "a", "c"]
+	assert scan(url, str(repeated), dedup=True) == ["a", "c"]
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_depth(tree_server, engine):
+	"""each level scans the directories found by the one before with the same wordlist, and stops at --recurse levels"""
+	url, path = tree_server
+	assert scan(url, path, engine=engine) == ["a", "b", "c"]
+	level1 = ["a", "a/a", "a/b", "a/c", "b", "b/a", "b/b", "b/c", "c"]
+	assert scan(url, path, engine=engine, recurse=1) == level1
+	level2 = sorted(level1 + [f"{d}/{w}" for d in ["a/a", "a/b", "b/a", "b/b"] for w in "abc"])
+	assert scan(url, path, engine=engine, recurse=2) == level2
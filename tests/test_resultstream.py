@@ -0,0 +1,43 @@
+import sys
+
+import pytest
+
+from requestinjector import RequestInjector
+
+
+
+def injector(server, path, **kwargs):
+	return(RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, **kwargs))
+
+
+
+def test_results(server, wordlist):
+	path, words = wordlist
+	assert sorted(r.word for r in injector(server, path).iterResults()) == sorted(words)
+
+
+
+@pytest.mark.parametrize("error", [RuntimeError("scan failed"), SystemExit(1)])
+def test_error_raised(server, wordlist, monkeypatch, error):
+	"""an exception ending the background scan is raised to the consumer once the results before it are consumed"""
+	path, words = wordlist
+	x = injector(server, path)
+	def dispatch(store=None):
+		raise error
+	monkeypatch.setattr(x, "dispatch", dispatch)
+	with pytest.raises(type(error)):
+		for r in x.iterResults():
+			pass
+
+
+
+def test_stop_early(server, wordlist):
+	"""leaving the loop early cancels the rest of the scan"""
+	path, words = wordlist
+	x = injector(server, path, queue_size=10)
+	seen = []
+	for r in x.iterResults(buffer=5):
+		seen.append(r)
+		if len(seen) == 3:
+			break
+	assert x.cancel.is_set()
@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+
+import pytest
+
+from requestinjector import RequestInjector
+
+
+
+def scan(server, path, state, output, resume=False, **kwargs) -> RequestInjector:
+	return(RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=2, state=str(state), resume=resume, output_file=str(output), output_format="jsonl", **kwargs))
+
+
+
+def words(output) -> list:
+	return([json.loads(line)["word"] for line in output.read_text().splitlines()])
+
+
+
+def test_resume_loses_no_rows(server, wordlist, tmp_path):
+	"""a scan stopped partway and resumed from its --state file requests every word, without starting again from the top"""
+	path, all_words = wordlist
+	state = tmp_path / "scan.state"
+	first = tmp_path / "first.jsonl"
+	x = scan(server, path, state, first, delay=0.01, queue_size=10)
+	x.cancel = threading.Event()
+	t = threading.Thread(target=x.run)
+	t.start()
+	time.sleep(0.4)
+	x.cancel.set()
+	t.join(30)
+	done = words(first)
+	assert 0 < len(done) < len(all_words)
+	assert state.exists()
+	second = tmp_path / "second.jsonl"
+	scan(server, path, state, second, resume=True).run()
+	rest = words(second)
+	assert set(done) | set(rest) == set(all_words)
+	# only words still in flight when the first scan stopped may be requested twice
+	assert len(done) + len(rest) <= len(all_words) + 10
+
+
+
+def test_resume_other_scan(server, wordlist, tmp_path):
+	"""a state file saved by a different scan is refused"""
+	path, all_words = wordlist
+	state = tmp_path / "scan.state"
+	scan(server, path, state, tmp_path / "first.jsonl").run()
+	other = tmp_path / "other.txt"
+	other.write_text("admin\n")
+	x = scan(server, str(other), state, tmp_path / "second.jsonl", resume=True)
+	with pytest.raises(SystemExit):
+		x.run()
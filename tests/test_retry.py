@@ -0,0 +1,105 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from requestinjector import RequestInjector, RetryScheduler
+
+
+
+def test_delay_bounds():
+	"""half the doubled delay is fixed and half random, capped at RetryScheduler.cap"""
+	r = RetryScheduler(3, backoff=1.0)
+	for attempt in range(10):
+		d = min(r.cap, 2 ** attempt)
+		for i in range(20):
+			assert d / 2 <= r.delay(attempt) <= d
+
+
+
+def test_attempts():
+	r = RetryScheduler(2, backoff=0.0)
+	ticket = r.open(7)
+	assert ticket == [7, 1, True]
+	assert r.schedule("u", "w", ticket, 0)
+	assert r.schedule("u", "w", ticket, 1)
+	assert not r.schedule("u", "w", ticket, 2)
+	assert not r.schedule("u", "w", None, 0)
+	assert ticket[1] == 3
+	assert len(r) == 2
+	assert sorted(job.attempt for job in [r.due(), r.due()]) == [1, 2]
+	assert r.due() is None
+	assert r.wait() is None
+
+
+
+def test_ticket():
+	"""an item is finished by the last of its pending requests"""
+	r = RetryScheduler(1)
+	ticket = r.open(0)
+	r.schedule("u", "w", ticket, 0)
+	assert not r.close(ticket)
+	assert r.close(ticket)
+
+
+
+def test_due_order():
+	r = RetryScheduler(1, backoff=0.2)
+	r.schedule("u", "late", r.open(0), 0)
+	r.heap[0] = (r.heap[0][0] + 10,) + r.heap[0][1:]
+	r.schedule("u", "soon", r.open(1), 0)
+	assert r.due() is None
+	assert 0 < r.wait() <= 0.2
+	time.sleep(r.wait())
+	assert r.due().item == "soon"
+	assert r.due() is None
+	# a cancelled scan takes the rest straight away
+	assert r.due(force=True).item == "late"
+
+
+
+class FlakyHandler(http.server.BaseHTTPRequestHandler):
+	"""drops the connection on the first request for each path, and answers the next ones"""
+	protocol_version = "HTTP/1.1"
+	seen = set()
+	lock = threading.Lock()
+
+	def do_GET(self):
+		with self.lock:
+			first = self.path not in self.seen
+			self.seen.add(self.path)
+		if first:
+			self.close_connection = True
+			return
+		body = b"ok"
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+
+@pytest.fixture
+def flaky_server():
+	FlakyHandler.seen = set()
+	httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+	httpd.daemon_threads = True
+	threading.Thread(target=httpd.serve_forever, daemon=True).start()
+	yield(f"http://127.0.0.1:{httpd.server_address[1]}/")
+	httpd.shutdown()
+	httpd.server_close()
+
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_retried(flaky_server, wordlist, engine):
+	"""every request that failed once succeeds when sent again, and the item is reported once"""
+	path, words = wordlist
+	x = RequestInjector(url=flaky_server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, engine=engine, retry_failed=2, retry_backoff=0.01, warmup=False)
+	results = list(x.iterResults())
+	assert [r.reason for r in results if r.reason is not None] == []
+	assert sorted(r.word for r in results) == sorted(words)
@@ -0,0 +1,22 @@
+from requestinjector import PathWorker, RequestInjector
+
+
+
+def test_connections_reused(counting_server, wordlist):
+	"""each thread keeps one keep-alive connection open instead of opening one per request"""
+	url, httpd = counting_server
+	path, words = wordlist
+	x = RequestInjector(url=url, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4)
+	results = list(x.iterResults())
+	assert len(results) == len(words)
+	assert httpd.connections <= 4
+
+
+
+def test_pool_sizes():
+	"""--pool_connections and --pool_maxsize size each thread's connection pools"""
+	session = PathWorker(pool_connections=3, pool_maxsize=7).makeSession()
+	for scheme in ["http", "https"]:
+		poolmanager = session.get_adapter(f"{scheme}://127.0.0.1/").poolmanager
+		assert poolmanager.connection_pool_kw["maxsize"] == 7
+		assert poolmanager.pools._maxsize == 3
@@ -0,0 +1,32 @@
+from requestinjector import RequestInjector
+
+
+
+def test_two_process_scan(start_method, server, wordlist):
+	"""every word is requested exactly once, by one of the processes, and the results are merged into one stream"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, processes=2)
+	results = list(x.iterResults())
+	assert sorted(r.word for r in results) == sorted(words)
+	assert sorted(r.word for r in results if r.status_code == 200) == ["admin", "admin2"]
+
+
+
+def test_shard_ranges(wordlist):
+	"""the rows are split into contiguous ranges, each starting at the byte offset of its first row"""
+	path, words = wordlist
+	x = RequestInjector(url="http://127.0.0.1/", wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", processes=3)
+	shards = x.shardRanges()
+	assert [rows for rows, offsets in shards] == [(0, 66), (66, 133), (133, None)]
+	with open(path, "rb") as f:
+		data = f.read()
+	for (start, end), offsets in shards:
+		assert data[offsets[0]:].split(b"\n")[0].decode() == words[start]
+
+
+
+def test_shard_ranges_cached(wordlist, tmp_path):
+	"""the compiled cache is indexed by row already, so there is nothing to seek"""
+	path, words = wordlist
+	x = RequestInjector(url="http://127.0.0.1/", wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", processes=2, wordlist_cache=True, cache_dir=str(tmp_path))
+	assert x.shardRanges() == [((0, 100), None), ((100, None), None)]
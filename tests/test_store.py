@@ -0,0 +1,89 @@
+import pytest
+
+from requestinjector import RequestInjector, Result, ResultStore
+
+
+
+def record(store, urls, outcomes, finished=True):
+	"""stores one scan of {word: status} against every URL"""
+	scan = store.begin("path", urls, ["words.txt"])
+	store.add([Result(status_code=sc, bytes=len(w), sizetype="exact", word=w, url=u+w) for u in urls for w, sc in outcomes.items()])
+	store.flush()
+	if finished:
+		with store.db:
+			store.db.execute("UPDATE scans SET finished = 1 WHERE id = ?", (scan,))
+	return(scan)
+
+
+
+@pytest.fixture
+def store(tmp_path):
+	s = ResultStore(str(tmp_path / "results.db"))
+	yield(s)
+	s.db.close()
+
+
+
+def test_priority_order(store):
+	a = ["http://a.test/"]
+	record(store, a, {"admin": 200, "login": 200, "x": 404})
+	record(store, a, {"admin": 200, "login": 404, "x": 404})
+	record(store, a, {"admin": 403, "backup": 200, "login": 404})
+	# admin hit 3/3, backup 1/1, login 1/3, x never
+	assert store.priority(a) == ["admin", "backup", "login"]
+
+
+
+def test_priority_scoped_to_targets(store):
+	record(store, ["http://a.test/"], {"admin": 200})
+	record(store, ["https://b.test/"], {"secret": 200})
+	assert store.priority(["http://a.test/other/"]) == ["admin"]
+	assert store.priority(["https://b.test/"]) == ["secret"]
+	assert store.priority(["http://b.test/"]) == []
+
+
+
+def test_priority_limit(store, monkeypatch):
+	record(store, ["http://a.test/"], {f"w{i}": 200 for i in range(20)})
+	monkeypatch.setattr(ResultStore, "priority_limit", 5)
+	assert len(store.priority(["http://a.test/"])) == 5
+
+
+
+def test_diff(store):
+	u = ["http://a.test/"]
+	old = record(store, u, {"same": 200, "gone": 200, "changed": 404, "grew": 200})
+	store.add([Result(status_code=200, bytes=999, word="grew", url=u[0]+"grew")])
+	new = record(store, u, {"same": 200, "changed": 200, "added": 200, "grew": 200})
+	changes = sorted((c, url) for c, url, *rest in store.diff(old, new))
+	assert changes == [("added", "http://a.test/added"), ("changed", "http://a.test/changed"), ("removed", "http://a.test/gone")]
+	assert store.latest() == (old, new)
+
+
+
+def test_close(tmp_path):
+	path = str(tmp_path / "results.db")
+	s = ResultStore(path)
+	s.begin("path", ["http://a.test/"], ["w"])
+	s.add([Result(status_code=200, word="a", url="http://a.test/a")])
+	s.close(finished=False)
+	s = ResultStore(path)
+	assert s.db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 1
+	assert s.latest() == (None, None)
+	s.db.close()
+
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_scan_stored(server, wordlist, tmp_path, processes):
+	"""a scan, through iterResults() or the Drainer, records every result, and --prioritize puts the hits first next time"""
+	path, words = wordlist
+	db = str(tmp_path / "results.db")
+	kwargs = dict(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, processes=processes, store_file=db)
+	assert len(list(RequestInjector(**kwargs).iterResults())) == len(words)
+	RequestInjector(output_file=str(tmp_path / "out.txt"), **kwargs).run()
+	s = ResultStore(db)
+	assert s.db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2 * len(words)
+	assert s.db.execute("SELECT COUNT(*) FROM scans WHERE finished IS NOT NULL").fetchone()[0] == 2
+	assert s.priority([server]) == ["admin", "admin2"]
+	s.db.close()
@@ -0,0 +1,40 @@
+from requestinjector import PathWorker, RequestInjector
+
+
+
+def test_read_targets(tmp_path):
+	"""-u comes first, then each --targets line, skipping blank lines and comments; each target is expanded once"""
+	targets = tmp_path / "targets.txt"
+	targets.write_text("# hosts\nhttp://b.internal/x\n\nhttp://c.internal/\nhttp://a.internal/\n")
+	x = RequestInjector(url="http://a.internal", wordlist=["words.txt"], staticargs="", injectkeys=[""], longest=False, fillvalue="", targets=str(targets))
+	assert x.url == ["http://a.internal/", "http://b.internal/x/", "http://c.internal/"]
+
+
+
+def test_schedule():
+	"""consecutive items start one host further along, keeping each host's URLs together"""
+	w = PathWorker()
+	w.setUrls(["http://a.internal/", "http://a.internal/x/", "http://b.internal/", "http://c.internal/"])
+	assert w.schedule(0) == ["http://a.internal/", "http://a.internal/x/", "http://b.internal/", "http://c.internal/"]
+	assert w.schedule(1) == ["http://b.internal/", "http://c.internal/", "http://a.internal/", "http://a.internal/x/"]
+	assert w.schedule(2) == ["http://c.internal/", "http://a.internal/", "http://a.internal/x/", "http://b.internal/"]
+	assert w.schedule(3) == w.schedule(0)
+
+
+
+def test_single_host():
+	w = PathWorker()
+	w.setUrls(["http://a.internal/", "http://a.internal/x/"])
+	assert w.schedule(1) == ["http://a.internal/", "http://a.internal/x/"]
+
+
+
+def test_scan_targets(server, counting_server, wordlist, tmp_path):
+	"""one scan requests every word against every target"""
+	path, words = wordlist
+	other, httpd = counting_server
+	targets = tmp_path / "targets.txt"
+	targets.write_text(f"{server}\n{other}\n")
+	x = RequestInjector(url=None, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, targets=str(targets))
+	results = list(x.iterResults())
+	assert sorted(r.url for r in results) == sorted([server + w for w in words] + [other + w for w in words])
@@ -0,0 +1,66 @@
+import pytest
+
+from requestinjector import TimeoutEstimator
+
+
+
+def test_default():
+	t = TimeoutEstimator(default=3.0, minimum=1.0, maximum=10.0)
+	assert t.get("a") == (3.0, 3.0)
+
+
+
+def test_first_sample():
+	"""the first sample sets the variation to half of it, so the timeout starts at three times the sample"""
+	t = TimeoutEstimator(default=3.0, minimum=0.1, maximum=10.0)
+	t.observe("a", "read", 0.5)
+	assert t.timeout("a", "read") == pytest.approx(1.5)
+	# connect falls back to the read estimate until a connect is timed
+	assert t.timeout("a", "connect") == pytest.approx(1.5)
+	t.observe("a", "connect", 0.1)
+	assert t.timeout("a", "connect") == pytest.approx(0.3)
+	assert t.get("b") == (3.0, 3.0)
+
+
+
+def test_smoothing():
+	"""later samples follow RFC 6298: rttvar = 3/4 rttvar + 1/4 |srtt - sample|, srtt = 7/8 srtt + 1/8 sample"""
+	t = TimeoutEstimator(default=3.0, minimum=0.0, maximum=100.0)
+	t.observe("a", "read", 1.0)
+	t.observe("a", "read", 3.0)
+	srtt = 0.875 * 1.0 + 0.125 * 3.0
+	rttvar = 0.75 * 0.5 + 0.25 * 2.0
+	assert t.timeout("a", "read") == pytest.approx(srtt + 4 * rttvar)
+
+
+
+def test_steady_host_converges():
+	t = TimeoutEstimator(default=3.0, minimum=0.0, maximum=10.0)
+	for i in range(200):
+		t.observe("a", "read", 0.2)
+	assert t.timeout("a", "read") == pytest.approx(0.2, abs=1e-3)
+
+
+
+def test_bounds():
+	t = TimeoutEstimator(default=3.0, minimum=1.0, maximum=10.0)
+	t.observe("fast", "read", 0.01)
+	t.observe("slow", "read", 60.0)
+	assert t.timeout("fast", "read") == 1.0
+	assert t.timeout("slow", "read") == 10.0
+
+
+
+def test_backoff():
+	"""each timeout doubles the host's timeouts (up to maximum) until it answers again"""
+	t = TimeoutEstimator(default=1.0, minimum=0.5, maximum=10.0)
+	t.expired("a")
+	assert t.get("a") == (2.0, 2.0)
+	t.expired("a")
+	assert t.get("a") == (4.0, 4.0)
+	for i in range(10):
+		t.expired("a")
+	assert t.get("a") == (10.0, 10.0)
+	assert t.get("b") == (1.0, 1.0)
+	t.observe("a", "read", 0.5)
+	assert t.timeout("a", "read") == pytest.approx(1.5)
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from requestinjector import CompiledWordlist, RequestInjector
+
+
+
+@pytest.fixture
+def source(tmp_path):
+	path = tmp_path / "words.txt"
+	path.write_bytes(b"admin\n  login \n\nadmin\nbackup\r\n\nl\xc3\xa9gal\nlast")
+	return(str(path))
+
+
+
+def test_round_trip(source, tmp_path):
+	"""words are stripped, blank and repeated ones dropped, and read back in order, by index or from any word on"""
+	w = CompiledWordlist(source, cache_dir=str(tmp_path / "cache"))
+	try:
+		assert len(w) == 5
+		assert list(w.iterate()) == ["admin", "login", "backup", "légal", "last"]
+		assert list(w.iterate(3)) == ["légal", "last"]
+		assert w[1] == "login"
+		assert w[-1] == "last"
+		with pytest.raises(IndexError):
+			w[5]
+	finally:
+		w.close()
+
+
+
+def test_no_dedup(source, tmp_path):
+	"""trident's cache keeps every line, so line N of each wordlist still lines up"""
+	w = CompiledWordlist(source, cache_dir=str(tmp_path / "cache"), dedup=False)
+	try:
+		assert list(w.iterate()) == ["admin", "login", "", "admin", "backup", "", "légal", "last"]
+	finally:
+		w.close()
+
+
+
+def test_reused_and_rebuilt(source, tmp_path):
+	"""the cache is compiled once, read again while the source is unchanged (even if only touched), and rebuilt when it changes"""
+	cache_dir = str(tmp_path / "cache")
+	w = CompiledWordlist(source, cache_dir=cache_dir)
+	w.close()
+	built = os.stat(w.cachefile).st_ino
+	os.utime(source, ns=(1, 1))
+	w = CompiledWordlist(source, cache_dir=cache_dir)
+	w.close()
+	assert os.stat(w.cachefile).st_ino == built
+	with open(source, "ab") as f:
+		f.write(b"\nnew")
+	w = CompiledWordlist(source, cache_dir=cache_dir)
+	try:
+		assert os.stat(w.cachefile).st_ino != built
+		assert w[-1] == "new"
+	finally:
+		w.close()
+
+
+
+def test_cached_scan(server, wordlist, tmp_path):
+	"""a --wordlist_cache scan requests the same words as reading the text file"""
+	path, words = wordlist
+	x = RequestInjector(url=server, wordlist=[path], staticargs="", injectkeys=[""], longest=False, fillvalue="", threads=4, wordlist_cache=True, cache_dir=str(tmp_path / "cache"))
+	assert sorted(r.word for r in x.iterResults()) == sorted(words)